@@ -14,6 +14,7 @@ from pathlib import Path
 import os
 from dotenv import load_dotenv
 from django.utils.translation import gettext_lazy as _
+from .sqlite import sqlite_database
 
 # Load environment variables
 load_dotenv()
@@ -76,6 +77,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'monitor.context_processors.streaming',
             ],
         },
     },
@@ -87,13 +89,109 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# 'production': WAL, synchronous=NORMAL, busy timeout, mmap/cache size and persistent
+# connections for the collector writing while the web workers read (see core/sqlite.py).
+# 'development': stock SQLite. Deployments opt in with DB_PROFILE=production
+# (start_server.py sets it unless the environment says otherwise)
+DB_PROFILE = os.environ.get('DB_PROFILE', 'development')
+
 DATABASES = {
+    'default': sqlite_database(BASE_DIR / 'db.sqlite3', DB_PROFILE),
+}
+
+# Optional SQLite file for the monitor app (servers + metrics), so metric writes
+# never lock the auth/session tables (see monitor/routers.py).
+# Needs `python manage.py migrate --database metrics`
+METRICS_DB = os.environ.get('METRICS_DB', '')
+if METRICS_DB:
+    DATABASES['metrics'] = sqlite_database(METRICS_DB, DB_PROFILE)
+    DATABASE_ROUTERS = ['monitor.routers.MetricsRouter']
+
+
+# Cache
+# Shared between all gunicorn workers so the live dashboard samples psutil/DB
+# once per tick instead of once per viewer (see monitor/sampling.py).
+# The file cache stores pickles: keep it in a private directory (created 0700),
+# never in a shared one such as /tmp where another user could plant entries
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', str(BASE_DIR / 'cache')),
     }
 }
 
+# Seconds a live snapshot (metric cards, chart) is reused before sampling again
+MONITOR_SNAPSHOT_TTL = float(os.environ.get('MONITOR_SNAPSHOT_TTL', 2))
+
+# Live pages use the SSE push stream (when served by ASGI) instead of HTMX polling
+MONITOR_STREAMING = os.environ.get('MONITOR_STREAMING', 'True') == 'True'
+
+# Where metrics are read from: 'auto' (/proc on Linux, psutil elsewhere), 'procfs' or 'psutil'
+# (see monitor/collectors.py)
+MONITOR_COLLECTOR_BACKEND = os.environ.get('MONITOR_COLLECTOR_BACKEND', 'auto')
+
+# Where raw SystemMetric samples are stored: 'orm' (the SystemMetric table) or 'tsfile'
+# (append-only per-server segment files under MONITOR_TSFILE_DIR, needs numpy; see monitor/storage.py)
+MONITOR_METRIC_STORE = os.environ.get('MONITOR_METRIC_STORE', 'orm')
+MONITOR_TSFILE_DIR = os.environ.get('MONITOR_TSFILE_DIR', str(BASE_DIR / 'tsdata'))
+
+# Raw samples older than this are sealed into compressed hourly chunks by the compactor
+# (delta-of-delta timestamps + XOR floats, see monitor/gorilla.py). 0 = keep every row
+MONITOR_COMPRESS_AFTER_HOURS = int(os.environ.get('MONITOR_COMPRESS_AFTER_HOURS', 24))
+
+# Minimum seconds between two refreshes of the process table (see monitor/process_snapshot.py)
+MONITOR_PROCESS_REFRESH = float(os.environ.get('MONITOR_PROCESS_REFRESH', 2))
+
+# Minimum seconds between two reads of the network connections (see monitor/connections.py)
+MONITOR_NETWORK_REFRESH = float(os.environ.get('MONITOR_NETWORK_REFRESH', 5))
+
+# Mounted filesystems sampled by the collector (comma separated fstypes, empty = all)
+MONITOR_DISK_FSTYPES = os.environ.get('MONITOR_DISK_FSTYPES', '')
+MONITOR_DISK_EXCLUDE_FSTYPES = os.environ.get('MONITOR_DISK_EXCLUDE_FSTYPES', 'squashfs,tmpfs,devtmpfs,overlay')
+
+# Largest metric batch a remote agent may push, in bytes once decompressed (see monitor/ingest.py)
+MONITOR_INGEST_MAX_BYTES = int(os.environ.get('MONITOR_INGEST_MAX_BYTES', 8 * 1024 * 1024))
+
+# Pull collection (collect_metrics --pull-interval, see monitor/poller.py): default port of the
+# agents (`collect_metrics --serve`) and the token the dashboard presents to them
+MONITOR_AGENT_PORT = int(os.environ.get('MONITOR_AGENT_PORT', 9100))
+MONITOR_AGENT_PULL_TOKEN = os.environ.get('MONITOR_AGENT_PULL_TOKEN', '')
+
+# Thread pools used by the async views (ASGI mode) for blocking work (see monitor/executors.py)
+MONITOR_BLOCKING_THREADS = int(os.environ.get('MONITOR_BLOCKING_THREADS', 8))
+MONITOR_TERMINAL_THREADS = int(os.environ.get('MONITOR_TERMINAL_THREADS', 4))
+
+# Web terminal jobs (see monitor/jobs.py): seconds before a command is killed,
+# bytes of output kept per command, concurrent commands per user and spool directory
+# (private: created 0700, refused if another user owns it or others can access it)
+MONITOR_COMMAND_TIMEOUT = int(os.environ.get('MONITOR_COMMAND_TIMEOUT', 60))
+MONITOR_JOB_OUTPUT_LIMIT = int(os.environ.get('MONITOR_JOB_OUTPUT_LIMIT', 1024 * 1024))
+MONITOR_MAX_JOBS_PER_USER = int(os.environ.get('MONITOR_MAX_JOBS_PER_USER', 5))
+MONITOR_JOB_DIR = os.environ.get('MONITOR_JOB_DIR', str(BASE_DIR / 'jobs'))
+
+# Persistent PTY shells for the web terminal (POSIX, see monitor/shells.py):
+# shells per user, seconds without activity before closing, bytes of scrollback kept
+MONITOR_TERMINAL_PTY = os.environ.get('MONITOR_TERMINAL_PTY', 'True') == 'True'
+MONITOR_SHELL_MAX_PER_USER = int(os.environ.get('MONITOR_SHELL_MAX_PER_USER', 3))
+MONITOR_SHELL_IDLE_TIMEOUT = int(os.environ.get('MONITOR_SHELL_IDLE_TIMEOUT', 900))
+MONITOR_SHELL_SCROLLBACK = int(os.environ.get('MONITOR_SHELL_SCROLLBACK', 1024 * 1024))
+
+# Metric retention per tier in days (0 = keep forever). Raw rows are compacted
+# into 1-minute / 1-hour / 1-day rollups before pruning (see monitor/rollups.py)
+MONITOR_RETENTION_DAYS = {
+    'raw': int(os.environ.get('MONITOR_RETENTION_RAW_DAYS', 2)),
+    'minute': int(os.environ.get('MONITOR_RETENTION_MINUTE_DAYS', 30)),
+    'hour': int(os.environ.get('MONITOR_RETENTION_HOUR_DAYS', 365)),
+    'day': int(os.environ.get('MONITOR_RETENTION_DAY_DAYS', 0)),
+    # Per-interface throughput (InterfaceMetric, see monitor/netio.py)
+    'network': int(os.environ.get('MONITOR_RETENTION_NETWORK_DAYS', 30)),
+    # Mount usage and disk I/O (MountMetric, DiskIOMetric, see monitor/disks.py)
+    'disk': int(os.environ.get('MONITOR_RETENTION_DISK_DAYS', 30)),
+    # Per-core CPU and load averages (CpuMetric, see monitor/cpu.py)
+    'cpu': int(os.environ.get('MONITOR_RETENTION_CPU_DAYS', 7)),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -1,11 +1,60 @@
 from django.contrib import admin
-from .models import Server, SystemMetric
+from .models import Server, SystemMetric, MetricChunk, MetricRollup, NetworkInterface, InterfaceMetric, Mount, MountMetric, BlockDevice, DiskIOMetric, CpuMetric
 
 @admin.register(Server)
 class ServerAdmin(admin.ModelAdmin):
     list_display = ('name', 'ip_address', 'os_info', 'is_active')
 
+# Only the rows of the orm store that are not sealed yet: sealed chunks and the
+# tsfile store are read through /api/metrics/ or the export
 @admin.register(SystemMetric)
 class MetricAdmin(admin.ModelAdmin):
     list_display = ('server', 'cpu_usage', 'ram_usage', 'timestamp')
-    list_filter = ('server', 'timestamp')
\ No newline at end of file
+    list_filter = ('server', 'timestamp')
+
+@admin.register(MetricChunk)
+class MetricChunkAdmin(admin.ModelAdmin):
+    list_display = ('server', 'start', 'end', 'samples')
+    list_filter = ('server',)
+    exclude = ('data',)
+
+@admin.register(MetricRollup)
+class MetricRollupAdmin(admin.ModelAdmin):
+    list_display = ('server', 'resolution', 'bucket', 'samples', 'cpu_avg', 'ram_avg')
+    list_filter = ('server', 'resolution')
+
+@admin.register(NetworkInterface)
+class NetworkInterfaceAdmin(admin.ModelAdmin):
+    list_display = ('server', 'name')
+    list_filter = ('server',)
+
+@admin.register(InterfaceMetric)
+class InterfaceMetricAdmin(admin.ModelAdmin):
+    list_display = ('interface', 'rx_bytes', 'tx_bytes', 'rx_errors', 'rx_drops', 'timestamp')
+    list_filter = ('interface', 'timestamp')
+
+@admin.register(Mount)
+class MountAdmin(admin.ModelAdmin):
+    list_display = ('server', 'path', 'device', 'fstype')
+    list_filter = ('server', 'fstype')
+
+@admin.register(MountMetric)
+class MountMetricAdmin(admin.ModelAdmin):
+    list_display = ('mount', 'percent', 'used', 'total', 'timestamp')
+    list_filter = ('mount', 'timestamp')
+
+@admin.register(BlockDevice)
+class BlockDeviceAdmin(admin.ModelAdmin):
+    list_display = ('server', 'name')
+    list_filter = ('server',)
+
+@admin.register(DiskIOMetric)
+class DiskIOMetricAdmin(admin.ModelAdmin):
+    list_display = ('device', 'read_bytes', 'write_bytes', 'read_iops', 'write_iops', 'busy', 'timestamp')
+    list_filter = ('device', 'timestamp')
+
+@admin.register(CpuMetric)
+class CpuMetricAdmin(admin.ModelAdmin):
+    list_display = ('server', 'load_1', 'load_5', 'load_15', 'iowait', 'steal', 'timestamp')
+    list_filter = ('server', 'timestamp')
+    exclude = ('cores',)
\ No newline at end of file
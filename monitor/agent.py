@@ -0,0 +1,241 @@
+# monitor/agent.py
+"""
+Agent mode of the collector: report samples to a central dashboard.
+
+`collect_metrics --push <url> --token <token>` samples the local host exactly
+like the normal collector, but its buffer sends each batch to the dashboard's
+/api/ingest/ endpoint (see monitor/ingest.py) instead of writing a local
+database. Metric instances are built unsaved, with unsaved parents (interface,
+mount, disk) that only carry the names the dashboard resolves on its side.
+
+`collect_metrics --serve <host:port> --token <token>` is the pull variant: the
+samples wait in memory until the dashboard's collector fetches them with
+GET /metrics (see monitor/poller.py), in the same batch format plus a "seq"
+token. A pulled batch is kept until a later pull acknowledges it
+(GET /metrics?ack=<seq>), so a pull that times out or breaks is sent again.
+"""
+import hmac
+import http.client
+import json
+import logging
+import platform
+import secrets
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from . import ingest
+from .buffer import MetricBuffer
+from .models import BlockDevice, Mount, NetworkInterface
+
+logger = logging.getLogger('monitor')
+
+
+class AgentError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+
+
+class AgentClient:
+    """POSTs compressed batches to the ingest endpoint over one kept-alive connection."""
+
+    def __init__(self, url, token, timeout=10.0):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f"Invalid ingest URL: {url}")
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path or '/'
+        self.headers = {
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/json',
+            'Content-Encoding': 'gzip',
+        }
+        self.timeout = timeout
+        self.conn = None
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def post(self, body):
+        """Sends an already compressed body. Returns the decoded JSON response."""
+        # A kept-alive connection may have been closed by the server while idle:
+        # retry once on a fresh one (a failure on a fresh connection is real)
+        for reused in (self.conn is not None, False):
+            if self.conn is None:
+                self.conn = self.connection_class(self.host, self.port, timeout=self.timeout)
+            try:
+                self.conn.request('POST', self.path, body, self.headers)
+                response = self.conn.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, OSError):
+                self.close()
+                if not reused:
+                    raise
+
+        if response.status >= 400:
+            try:
+                detail = json.loads(data)
+                message = detail.get('error') or detail.get('detail')
+            except (ValueError, AttributeError):
+                message = data[:200].decode(errors='replace')
+            raise AgentError(response.status, message)
+        return json.loads(data) if data else {}
+
+    def send(self, instances, os_info=None):
+        return self.post(ingest.dumps(ingest.encode(instances, os_info)))
+
+
+class PushBuffer(MetricBuffer):
+    """MetricBuffer whose batches go to the dashboard instead of the local DB."""
+
+    def __init__(self, client, **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+        self.os_info = f"{platform.system()} {platform.release()}"
+
+    def write(self, instances):
+        try:
+            result = self.client.send(instances, self.os_info)
+        except AgentError as e:
+            if e.status == 400:
+                # The dashboard will never accept this batch: drop it instead of retrying forever
+                logger.error(f"Ingest rejected {len(instances)} rows, dropped: {e}")
+                return
+            raise
+        if result.get('active') is False:
+            logger.warning("Server is inactive on the dashboard: samples are being discarded")
+
+
+class ServeBuffer(MetricBuffer):
+    """MetricBuffer that keeps every batch until the dashboard acknowledges it (see AgentServer)."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.lock = threading.Lock()
+        self.os_info = f"{platform.system()} {platform.release()}"
+        # Pulled but not acknowledged yet: [(number, instances)], oldest first
+        self.unacked = []
+        self.number = 0
+        # Acks carried over from before a restart name another run: they never match
+        self.run = secrets.token_hex(4)
+
+    def add(self, *instances):
+        with self.lock:
+            super().add(*instances)
+
+    def is_due(self):
+        # Nothing to write: max_pending still caps memory if nobody pulls
+        return False
+
+    def flush(self):
+        # Nothing is written here: samples nobody pulled are lost with the process
+        return 0
+
+    def drain(self, ack=None):
+        """
+        Batch payload of every sample not acknowledged yet. `ack` is the "seq" of
+        the last batch the dashboard stored: only those samples are dropped.
+        """
+        with self.lock:
+            run, _, number = (ack or '').partition('.')
+            if run == self.run and number.isdigit():
+                self.unacked = [batch for batch in self.unacked if batch[0] > int(number)]
+            if self.pending:
+                self.number += 1
+                self.unacked.append((self.number, self.pending))
+                self.pending = []
+
+            # Nobody acknowledges (dashboard down or too old): max_pending still caps memory
+            total = sum(len(batch) for _, batch in self.unacked)
+            while total > self.max_pending and len(self.unacked) > 1:
+                total -= len(self.unacked.pop(0)[1])
+                logger.warning("Pull buffer full: dropped the oldest unacknowledged batch")
+            instances = [obj for _, batch in self.unacked for obj in batch]
+            seq = f'{self.run}.{self.number}'
+
+        payload = ingest.encode(instances, self.os_info)
+        payload['seq'] = seq
+        return payload
+
+
+class _PullHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        path, _, query = self.path.partition('?')
+        if path != '/metrics':
+            return self._reply(404, b'{"error": "not found"}')
+        given = self.headers.get('Authorization', '').encode(errors='replace')
+        if not hmac.compare_digest(given, f'Bearer {self.server.token}'.encode()):
+            return self._reply(401, b'{"error": "invalid token"}')
+        ack = parse_qs(query).get('ack', [None])[0]
+        self._reply(200, ingest.dumps(self.server.source(ack)), encoding='gzip')
+
+    def _reply(self, status, body, encoding=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"Agent server: {self.address_string()} {format % args}")
+
+
+class AgentServer(ThreadingHTTPServer):
+    """
+    Serves GET /metrics?ack=<seq> (Bearer `token`) with the batch returned by
+    `source(ack)`, e.g. ServeBuffer.drain. Runs in a daemon thread next to the collector.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, token, source):
+        if ':' in address[0]:
+            self.address_family = socket.AF_INET6
+        super().__init__(address, _PullHandler)
+        self.token = token
+        self.source = source
+
+    def handle_error(self, request, client_address):
+        # The dashboard gave up (pull timeout): not worth a traceback
+        logger.warning(f"Agent server: pull from {client_address[0]} aborted", exc_info=logger.isEnabledFor(logging.DEBUG))
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, name='agent-server', daemon=True)
+        thread.start()
+        return thread
+
+
+def parse_address(value, default_port):
+    """'0.0.0.0:9100', ':9100', '[::]:9100' or '9100' -> (host, port)."""
+    host, sep, port = value.rpartition(':')
+    if not sep:
+        host, port = '', value
+    host = host.strip('[]') or '0.0.0.0'
+    try:
+        return host, int(port) if port else default_port
+    except ValueError:
+        raise ValueError(f"Invalid listen address: {value}")
+
+
+# Unsaved parents for the collector's per-NIC / per-mount / per-disk rows
+
+def interfaces(names):
+    return {name: NetworkInterface(name=name) for name in names}
+
+
+def devices(names):
+    return {name: BlockDevice(name=name) for name in names}
+
+
+def mounts(entries):
+    return {e['path']: Mount(path=e['path'], device=e['device'][:255], fstype=e['fstype'][:32]) for e in entries}
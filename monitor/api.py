@@ -1,21 +1,212 @@
+import base64
+import datetime
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import viewsets
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotFound, ParseError
+from rest_framework.generics import get_object_or_404
+from rest_framework.pagination import BasePagination
+from rest_framework.parsers import BaseParser
+from rest_framework.permissions import BasePermission
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
 from .models import Server, SystemMetric
 from .serializers import ServerSerializer, MetricSerializer
+from .storage import get_store
+from .timeutils import parse_time
+from . import export
+from . import ingest
 
 # ViewSet: Magically creates routes automatically (GET, POST, etc.)
 class ServerViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Server.objects.all()
     serializer_class = ServerSerializer
 
-class MetricViewSet(viewsets.ReadOnlyModelViewSet):
-    # Default sorting: most recent first
-    queryset = SystemMetric.objects.all().order_by('-timestamp')
+class MetricCursorPagination(BasePagination):
+    # Keyset pagination over the metric store, most recent first: the cursor is
+    # the (timestamp, server, seq) of the last sample sent, so every page is a seek
+    # instead of an OFFSET scan that grows with depth. seq (row id, position in a
+    # chunk or segment) keeps samples sharing a timestamp apart: none is skipped
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+
+    def paginate_store(self, store, server_ids, request):
+        self.request = request
+        page_size = self.get_page_size(request)
+        # One extra sample tells whether there is a next page
+        rows = store.newest(server_ids, self.decode_cursor(request), page_size + 1)
+        if len(rows) > page_size:
+            server_id, timestamp, *_, seq = rows[page_size - 1]
+            self.next_position = (timestamp, server_id, seq)
+        else:
+            self.next_position = None
+        return rows[:page_size]
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            timestamp, server_id, seq = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+            return datetime.datetime.fromisoformat(timestamp), int(server_id), int(seq)
+        except (TypeError, ValueError):
+            raise NotFound('Invalid cursor')
+
+    def encode_cursor(self, position):
+        timestamp, server_id, seq = position
+        return base64.urlsafe_b64encode(f'{timestamp.isoformat()}|{server_id}|{seq}'.encode()).decode()
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+class MetricViewSet(viewsets.GenericViewSet):
+    # Read through the metric store (monitor/storage.py) like the export: the
+    # SystemMetric table or the tsfile segments. Most recent first
     serializer_class = MetricSerializer
-    
-    # Optional: Simple filter to get only 'Localhost' metrics
-    def get_queryset(self):
-        queryset = super().get_queryset()
-        server_name = self.request.query_params.get('server', None)
+    pagination_class = MetricCursorPagination
+
+    def list(self, request):
+        server_ids = None
+        server_name = request.query_params.get('server', None)
         if server_name:
-            queryset = queryset.filter(server__name=server_name)
-        return queryset
\ No newline at end of file
+            # Optional: Simple filter to get only 'Localhost' metrics (resolved to ids once, no JOIN)
+            server_ids = list(Server.objects.filter(name=server_name).values_list('id', flat=True))
+
+        store = get_store()
+        rows = self.paginator.paginate_store(store, server_ids, request)
+        # Every server of the page in one query (no N+1)
+        servers = Server.objects.in_bulk({row[0] for row in rows})
+        # Only SystemMetric rows have an id (their seq): sealed and tsfile samples get null
+        has_ids = store.name == 'orm'
+        metrics = [
+            SystemMetric(id=seq if has_ids and seq > 0 else None, server=servers.get(server_id),
+                         timestamp=timestamp, cpu_usage=cpu, ram_usage=ram, disk_usage=disk, swap_usage=swap)
+            for server_id, timestamp, cpu, ram, disk, swap, seq in rows
+        ]
+        return self.paginator.get_paginated_response(self.get_serializer(metrics, many=True).data)
+
+    def retrieve(self, request, pk=None):
+        # One SystemMetric row. Samples sealed into chunks, or written to tsfile
+        # segments, have no id: the list and the export still return them
+        if get_store().name != 'orm':
+            raise NotFound('Samples have no id with MONITOR_METRIC_STORE=tsfile')
+        metric = get_object_or_404(SystemMetric.objects.select_related('server'), pk=pk)
+        return Response(self.get_serializer(metric).data)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Streams every metric of a time range in constant memory:
+        /api/metrics/export/?server=Localhost&start=<iso|epoch>&end=<iso|epoch>&output=csv|ndjson|arrow|parquet
+        (arrow and parquet need pyarrow)
+        """
+        output = request.query_params.get('output', 'csv')
+        try:
+            export.check_output(output)
+        except export.ExportError as e:
+            return Response({'error': str(e)}, status=400)
+
+        start = end = None
+        if 'start' in request.query_params:
+            start = parse_time(request.query_params['start'])
+        if 'end' in request.query_params:
+            end = parse_time(request.query_params['end'])
+        if ('start' in request.query_params and start is None) or ('end' in request.query_params and end is None):
+            return Response({'error': 'start/end must be ISO 8601 or epoch seconds'}, status=400)
+
+        rows = export.metric_rows(request.query_params.get('server'), start, end)
+        blocks = export.STREAMS[output](rows)
+        if isinstance(request._request, ASGIRequest):
+            blocks = export.aiter_blocks(blocks)
+        response = StreamingHttpResponse(blocks, content_type=export.CONTENT_TYPES[output])
+        filename = f"metrics-{timezone.now():%Y%m%d-%H%M%S}.{output}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+# --- Remote agents (see monitor/ingest.py) ---
+
+class AgentTokenAuthentication(BaseAuthentication):
+    """`Authorization: Bearer <token>` of a Server. request.auth is that Server."""
+
+    def authenticate(self, request):
+        header = get_authorization_header(request).split()
+        if not header or header[0].lower() != b'bearer':
+            return None
+        if len(header) != 2:
+            raise AuthenticationFailed('Invalid Authorization header')
+        server = ingest.authenticate(header[1].decode(errors='replace'))
+        if server is None:
+            raise AuthenticationFailed('Invalid agent token')
+        return (AnonymousUser(), server)
+
+    def authenticate_header(self, request):
+        return 'Bearer'
+
+
+class IsAgent(BasePermission):
+    def has_permission(self, request, view):
+        return isinstance(request.auth, Server)
+
+
+class PayloadTooLarge(APIException):
+    status_code = 413
+    default_detail = 'Batch too large'
+
+
+class BatchParser(BaseParser):
+    """JSON batch, gzip/deflate compressed according to Content-Encoding."""
+    media_type = 'application/json'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        limit = ingest.max_bytes()
+        # Never read more than the limit, compressed or not
+        body = stream.read(limit + 1) if stream is not None else b''
+        try:
+            if len(body) > limit:
+                raise ingest.PayloadTooLarge(f"Batch larger than {limit} bytes")
+            return ingest.loads(body, request.META.get('HTTP_CONTENT_ENCODING', ''))
+        except ingest.PayloadTooLarge as e:
+            raise PayloadTooLarge(str(e))
+        except ingest.IngestError as e:
+            raise ParseError(str(e))
+
+
+class AgentIngestView(APIView):
+    """
+    POST /api/ingest/: one batch of samples from a remote agent, written with
+    one bulk_create per table. Issue tokens with `manage.py agent_token <server>`.
+    """
+    authentication_classes = [AgentTokenAuthentication]
+    permission_classes = [IsAgent]
+    parser_classes = [BatchParser]
+
+    def post(self, request):
+        server = request.auth
+        try:
+            saved = ingest.store(server, request.data)
+        except ingest.IngestError as e:
+            return Response({'error': str(e)}, status=400)
+        return Response({'saved': saved, 'active': server.is_active})
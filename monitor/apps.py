@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete
 
 
 class MonitorConfig(AppConfig):
     name = 'monitor'
+
+    def ready(self):
+        from .models import Server
+        from .storage import server_deleted
+        post_delete.connect(server_deleted, sender=Server, dispatch_uid='monitor_metric_store')
@@ -0,0 +1,92 @@
+# monitor/buffer.py
+"""
+Write-behind buffer for the metrics collector.
+
+Instead of one INSERT (one SQLite transaction + fsync) per sample, samples are
+kept in memory and written with bulk_create() inside a single transaction,
+either every `batch_size` rows or every `flush_interval` seconds. Rows, not
+add() calls: one tick may queue a row per NIC, mount, disk or core.
+"""
+import logging
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.db import router, transaction
+
+from .models import SystemMetric
+from .storage import get_store
+
+logger = logging.getLogger('monitor')
+
+
+class MetricBuffer:
+    """Accumulates unsaved model instances and flushes them in batches."""
+
+    def __init__(self, batch_size=50, flush_interval=30.0, max_pending=None, clock=time.monotonic):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        # If the DB stays unavailable we keep retrying, but never grow without limit
+        self.max_pending = max_pending or self.batch_size * 100
+        self.clock = clock
+        self.pending = []
+        self.last_flush = clock()
+
+    def __len__(self):
+        return len(self.pending)
+
+    def add(self, *instances):
+        """Queues one sample (one or more instances) and flushes if the batch is full or due."""
+        self.pending.extend(instances)
+
+        if len(self.pending) > self.max_pending:
+            dropped = len(self.pending) - self.max_pending
+            del self.pending[:dropped]
+            logger.warning(f"Metric buffer full: dropped {dropped} oldest samples")
+
+        if self.is_due():
+            self.flush()
+
+    def is_due(self):
+        if len(self.pending) >= self.batch_size:
+            return True
+        return bool(self.pending) and self.clock() - self.last_flush >= self.flush_interval
+
+    def flush(self):
+        """Writes every pending instance in one transaction. Returns the number saved."""
+        self.last_flush = self.clock()
+        if not self.pending:
+            return 0
+
+        try:
+            self.write(self.pending)
+        except Exception as e:
+            # Keep the samples: they will be retried on the next flush
+            logger.error(f"Error flushing {len(self.pending)} metrics: {e}")
+            return 0
+
+        saved = len(self.pending)
+        self.pending = []
+        return saved
+
+    def write(self, instances):
+        """Stores one batch (raises to keep it pending)."""
+        bulk_write(instances)
+
+
+def bulk_write(instances):
+    """Saves unsaved instances of any models in one transaction, one bulk_create per table."""
+    by_model = defaultdict(list)
+    for obj in instances:
+        by_model[type(obj)].append(obj)
+
+    with ExitStack() as stack:
+        # One transaction per database the models live in (see monitor/routers.py)
+        for alias in {router.db_for_write(model) for model in by_model}:
+            stack.enter_context(transaction.atomic(using=alias))
+        for model, objs in by_model.items():
+            if model is SystemMetric:
+                # Raw samples go to the configured store (see monitor/storage.py)
+                get_store().write(objs)
+            else:
+                model.objects.bulk_create(objs, batch_size=500)
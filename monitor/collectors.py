@@ -0,0 +1,132 @@
+# monitor/collectors.py
+"""
+Collector backends: where system and process metrics are read from.
+
+    psutil  - portable, one object (and several syscalls) per process
+    procfs  - Linux only: bulk reads of /proc into compact records (monitor/procfs.py)
+
+MONITOR_COLLECTOR_BACKEND picks one ('auto' = procfs when /proc is readable,
+psutil otherwise). Both return the same records, so the rest of the app
+(snapshotter, collector, views) never knows which one is in use.
+"""
+import logging
+import os
+import sys
+
+import psutil
+from django.conf import settings
+
+logger = logging.getLogger('monitor')
+
+
+class ProcSample:
+    """
+    Raw reading of one process. `cpu_time` (user + system seconds) is cumulative:
+    the snapshotter turns it into a percentage from the previous reading.
+    `start` identifies the process instance (detects PID reuse).
+    """
+
+    __slots__ = ('pid', 'name', 'username', 'status', 'cpu_time', 'rss', 'start')
+
+    def __init__(self, pid, name, username, status, cpu_time, rss, start):
+        self.pid = pid
+        self.name = name
+        self.username = username
+        self.status = status
+        self.cpu_time = cpu_time
+        self.rss = rss
+        self.start = start
+
+
+class PsutilBackend:
+    name = 'psutil'
+
+    def __init__(self):
+        # Process objects live across calls: psutil caches their static fields
+        self._procs = {}
+        self._usernames = {}
+
+    def cpu_percent(self):
+        """System-wide CPU % since the previous call (non-blocking)."""
+        return psutil.cpu_percent(interval=None)
+
+    def cpu_breakdown(self):
+        """Per-core CPU %, iowait % and steal % since the previous call (non-blocking)."""
+        cores = psutil.cpu_percent(interval=None, percpu=True)
+        times = psutil.cpu_times_percent(interval=None)
+        # iowait / steal only exist on Linux
+        return {'cores': cores, 'iowait': getattr(times, 'iowait', 0.0), 'steal': getattr(times, 'steal', 0.0)}
+
+    def load_average(self):
+        """1, 5 and 15 minute load averages (emulated by psutil on Windows)."""
+        return psutil.getloadavg()
+
+    def memory(self):
+        """RAM and swap usage in %."""
+        return {'ram': psutil.virtual_memory().percent, 'swap': psutil.swap_memory().percent}
+
+    def total_memory(self):
+        return psutil.virtual_memory().total
+
+    def start_time(self, pid):
+        """ProcSample.start of `pid` as it is now (None if there is no such process)."""
+        try:
+            return psutil.Process(pid).create_time()
+        except psutil.Error:
+            return None
+
+    def processes(self):
+        """Returns a list of ProcSample, one per readable process."""
+        pids = psutil.pids()
+        alive = set(pids)
+        for pid in self._procs.keys() - alive:
+            del self._procs[pid]
+            self._usernames.pop(pid, None)
+
+        samples = []
+        for pid in pids:
+            try:
+                proc = self._procs.get(pid)
+                if proc is None or not proc.is_running():
+                    # New PID (or reused by another process)
+                    proc = self._procs[pid] = psutil.Process(pid)
+                    self._usernames.pop(pid, None)
+                with proc.oneshot():
+                    times = proc.cpu_times()
+                    if pid not in self._usernames:
+                        try:
+                            self._usernames[pid] = proc.username()
+                        except (psutil.AccessDenied, KeyError):
+                            self._usernames[pid] = None
+                    samples.append(ProcSample(
+                        pid, proc.name(), self._usernames[pid], proc.status(),
+                        times.user + times.system, proc.memory_info().rss, proc.create_time(),
+                    ))
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                self._procs.pop(pid, None)
+            except psutil.AccessDenied:
+                continue
+        return samples
+
+
+def procfs_available(root='/proc'):
+    return sys.platform.startswith('linux') and os.access(os.path.join(root, 'stat'), os.R_OK)
+
+
+_backend = None
+
+
+def get_backend():
+    """The configured backend (one instance per process: it keeps CPU baselines)."""
+    global _backend
+    if _backend is None:
+        choice = settings.MONITOR_COLLECTOR_BACKEND
+        if choice == 'procfs' or (choice == 'auto' and procfs_available()):
+            if procfs_available():
+                from .procfs import ProcfsBackend
+                _backend = ProcfsBackend()
+            else:
+                logger.warning("MONITOR_COLLECTOR_BACKEND=procfs but /proc is not readable. Using psutil.")
+        if _backend is None:
+            _backend = PsutilBackend()
+    return _backend
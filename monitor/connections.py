@@ -0,0 +1,186 @@
+# monitor/connections.py
+"""
+Cached snapshot of the network connections, with aggregates.
+
+psutil.net_connections() walks every socket of the host: on a load balancer
+with 50k+ sockets that takes seconds. The snapshotter reads them at most once
+every MONITOR_NETWORK_REFRESH seconds per worker and keeps compact records plus
+precomputed aggregates (counts by state, by local port, by remote host, and the
+processes owning most sockets). The view pages over that snapshot: a page is a
+slice, and each state filter is computed once per snapshot.
+"""
+import logging
+import socket
+import threading
+import time
+from collections import Counter
+
+import psutil
+from django.conf import settings
+
+logger = logging.getLogger('monitor')
+
+# Entries kept in each "top" aggregate
+TOP = 10
+# Filtered views kept per snapshot (one per state in use)
+MAX_VIEWS = 16
+
+STATUS_COLORS = {
+    psutil.CONN_LISTEN: 'success',        # Green
+    psutil.CONN_ESTABLISHED: 'primary',   # Blue
+    psutil.CONN_TIME_WAIT: 'warning',     # Yellow
+}
+
+
+class Connection:
+    """One socket, formatted once per snapshot."""
+
+    __slots__ = ('fd', 'family', 'type', 'laddr', 'raddr', 'status', 'pid')
+
+    def __init__(self, fd, family, type, laddr, raddr, status, pid):
+        self.fd = fd
+        self.family = family
+        self.type = type
+        self.laddr = laddr
+        self.raddr = raddr
+        self.status = status
+        self.pid = pid
+
+    @property
+    def status_color(self):
+        return STATUS_COLORS.get(self.status, 'secondary')
+
+
+class ConnectionPage:
+    __slots__ = ('rows', 'number', 'pages', 'total')
+
+    def __init__(self, rows, number, pages, total):
+        self.rows = rows
+        self.number = number
+        self.pages = pages
+        self.total = total
+
+    @property
+    def previous(self):
+        return self.number - 1 if self.number > 1 else None
+
+    @property
+    def next(self):
+        return self.number + 1 if self.number < self.pages else None
+
+
+def _demo_connections():
+    # Mock Data for Demo Mode (Linux-style)
+    return [
+        Connection(10, 'IPv4', 'TCP', '0.0.0.0:80', '-', 'LISTEN', 850),  # Nginx
+        Connection(11, 'IPv4', 'TCP', '0.0.0.0:443', '-', 'LISTEN', 850),  # Nginx
+        Connection(25, 'IPv4', 'TCP', '127.0.0.1:5432', '-', 'LISTEN', 1205),  # Postgres
+        Connection(30, 'IPv4', 'TCP', '127.0.0.1:6379', '-', 'LISTEN', 1100),  # Redis
+        Connection(45, 'IPv4', 'TCP', '0.0.0.0:22', '-', 'LISTEN', 500),  # SSHd
+        Connection(88, 'IPv4', 'TCP', '192.168.1.15:22', '10.0.0.5:54321', 'ESTABLISHED', 502),  # Incoming SSH
+        Connection(92, 'IPv4', 'TCP', '192.168.1.15:443', '172.217.17.14:58000', 'ESTABLISHED', 851),  # Active Web User (You!)
+        Connection(99, 'IPv4', 'TCP', '127.0.0.1:5432', '127.0.0.1:48200', 'ESTABLISHED', 1205),  # DB Connection
+    ]
+
+
+def _read_connections():
+    connections = []
+    # kind='inet' to only see IP connections (excludes unix file sockets)
+    for conn in psutil.net_connections(kind='inet'):
+        connections.append(Connection(
+            conn.fd,
+            'IPv4' if conn.family == socket.AF_INET else 'IPv6',
+            'TCP' if conn.type == socket.SOCK_STREAM else 'UDP',
+            f"{conn.laddr.ip}:{conn.laddr.port}",
+            f"{conn.raddr.ip}:{conn.raddr.port}" if conn.raddr else "-",
+            conn.status,
+            conn.pid,
+        ))
+    return connections
+
+
+class ConnectionSnapshotter:
+    """Rate limited connection table plus aggregates. Thread safe."""
+
+    def __init__(self, min_interval=None, clock=time.monotonic, reader=None):
+        self.min_interval = min_interval
+        self.clock = clock
+        self.reader = reader
+        self.generation = 0
+        self.taken_at = None
+        self.connections = []
+        self.aggregates = {}
+        self._views = {}       # state -> connections in that state (current snapshot)
+        self._lock = threading.Lock()
+
+    def _interval(self):
+        if self.min_interval is not None:
+            return self.min_interval
+        return settings.MONITOR_NETWORK_REFRESH
+
+    def is_stale(self):
+        return self.taken_at is None or self.clock() - self.taken_at >= self._interval()
+
+    def snapshot(self):
+        """Returns (connections, aggregates), refreshing first if they are too old."""
+        if self.is_stale():
+            with self._lock:
+                # Another thread may have refreshed while we waited for the lock
+                if self.is_stale():
+                    self.refresh()
+        return self.connections, self.aggregates
+
+    def refresh(self):
+        reader = self.reader or (_demo_connections if settings.DEMO_MODE else _read_connections)
+        started = time.perf_counter()
+        connections = reader()
+        # Sort: First those listening (LISTEN), then established
+        connections.sort(key=lambda c: c.status)
+
+        by_state = Counter()
+        by_port = Counter()
+        by_remote = Counter()
+        by_pid = Counter()
+        for conn in connections:
+            by_state[conn.status] += 1
+            by_port[conn.laddr.rpartition(':')[2]] += 1
+            if conn.raddr != '-':
+                by_remote[conn.raddr.rpartition(':')[0]] += 1
+            if conn.pid:
+                by_pid[conn.pid] += 1
+
+        self.aggregates = {
+            'total': len(connections),
+            'by_state': by_state.most_common(),
+            'by_port': by_port.most_common(TOP),
+            'by_remote': by_remote.most_common(TOP),
+            'top_talkers': by_pid.most_common(TOP),
+        }
+        self.connections = connections
+        self._views = {}
+        self.generation += 1
+        self.taken_at = self.clock()
+        logger.debug(f'Connection snapshot: {len(connections)} sockets in {time.perf_counter() - started:.3f}s')
+
+    def page(self, number=1, per_page=50, state=''):
+        """Page `number` (1-based, clamped) of the connections, optionally in one state."""
+        self.snapshot()
+        with self._lock:
+            rows = self.connections
+            if state:
+                view = self._views.get(state)
+                if view is None:
+                    view = [c for c in rows if c.status == state]
+                    if len(self._views) >= MAX_VIEWS:
+                        self._views.clear()
+                    self._views[state] = view
+                rows = view
+
+        pages = max(1, -(-len(rows) // per_page))
+        number = max(1, min(number, pages))
+        start = (number - 1) * per_page
+        return ConnectionPage(rows[start:start + per_page], number, pages, len(rows))
+
+
+# One per worker process
+connection_snapshotter = ConnectionSnapshotter()
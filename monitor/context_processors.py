@@ -0,0 +1,12 @@
+# monitor/context_processors.py
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+
+
+def streaming(request):
+    """
+    `use_stream` tells the templates to listen to the SSE push stream instead of polling.
+    Only possible under ASGI (start_server.py --mode asgi): with sync WSGI workers
+    every open stream would hold a whole worker.
+    """
+    return {'use_stream': settings.MONITOR_STREAMING and isinstance(request, ASGIRequest)}
@@ -0,0 +1,40 @@
+# monitor/counters.py
+"""
+Deltas of cumulative OS counters (network and disk I/O).
+
+psutil reports totals since boot; the collector needs "how much since the
+previous read". CounterDeltas keeps the previous reading per key (NIC, disk)
+and returns the elapsed seconds and per-field deltas for the keys seen in both
+reads. A negative delta (device re-created, counter wrap) drops that key for
+one sample instead of storing a huge bogus rate.
+"""
+import time
+
+
+class CounterDeltas:
+    def __init__(self, reader, fields, clock=time.monotonic):
+        self.reader = reader
+        self.fields = fields
+        self.clock = clock
+        self._previous = {}    # key -> (time, counters)
+
+    def sample(self):
+        """Returns {key: (elapsed seconds, {field: delta})}."""
+        now = self.clock()
+        counters = self.reader() or {}
+        deltas = {}
+        for key, current in counters.items():
+            previous = self._previous.get(key)
+            if previous is None or now <= previous[0]:
+                continue
+            values = {}
+            for field in self.fields:
+                delta = getattr(current, field, 0) - getattr(previous[1], field, 0)
+                if delta < 0:
+                    values = None
+                    break
+                values[field] = delta
+            if values is not None:
+                deltas[key] = (now - previous[0], values)
+        self._previous = {key: (now, current) for key, current in counters.items()}
+        return deltas
@@ -0,0 +1,160 @@
+# monitor/cpu.py
+"""
+Per-core CPU samples: packing, accumulation and the heatmap.
+
+Each core is stored as one unsigned byte in half-percent steps
+(0 = 0%, 200 = 100%), so a sample of N cores is N bytes in CpuMetric.cores.
+The heatmap reads the packed rows for a range, merges them into time buckets
+keeping the busiest value per core (a pegged core must not be averaged away)
+and returns a (buckets x cores) matrix. With NumPy the blobs are decoded in
+one frombuffer() call; without it, bytes are read directly as integers.
+"""
+import datetime
+import math
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import CpuMetric, Server
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+STEPS_PER_PERCENT = 2
+
+
+def pack_cores(percentages):
+    """[12.3, 100.0, ...] -> bytes, one per core."""
+    return bytes(min(255, max(0, round(p * STEPS_PER_PERCENT))) for p in percentages)
+
+
+def unpack_cores(blob):
+    """bytes -> [12.5, 100.0, ...]"""
+    return [b / STEPS_PER_PERCENT for b in bytes(blob)]
+
+
+class CpuAccumulator:
+    """Averages the per-core / iowait / steal ticks between two stored samples."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.cores = []
+        self.iowait = 0.0
+        self.steal = 0.0
+
+    def add(self, breakdown):
+        cores = breakdown['cores']
+        if len(cores) != len(self.cores):
+            # First tick, or CPUs hot-plugged: start again
+            self.reset()
+            self.cores = [0.0] * len(cores)
+        for i, value in enumerate(cores):
+            self.cores[i] += value
+        self.iowait += breakdown['iowait']
+        self.steal += breakdown['steal']
+        self.count += 1
+
+    def pop(self):
+        """The averages since the last pop() ({'cores', 'iowait', 'steal'}), or None."""
+        if not self.count:
+            return None
+        n = self.count
+        result = {
+            'cores': [value / n for value in self.cores],
+            'iowait': round(self.iowait / n, 1),
+            'steal': round(self.steal / n, 1),
+        }
+        self.reset()
+        return result
+
+
+def prune(now=None):
+    """Deletes rows older than MONITOR_RETENTION_DAYS['cpu'] (0 = keep forever)."""
+    days = getattr(settings, 'MONITOR_RETENTION_DAYS', {}).get('cpu', 0)
+    if not days:
+        return 0
+    cutoff = (now or timezone.now()) - datetime.timedelta(days=days)
+    count, _ = CpuMetric.objects.filter(timestamp__lt=cutoff).delete()
+    return count
+
+
+def _demo_rows(start, end, points):
+    step = max((end - start).total_seconds() / max(points, 1), 1)
+    t = start.timestamp()
+    rows = []
+    while t <= end.timestamp() and len(rows) < points:
+        # 8 cores with a pegged one that moves around
+        hot = int(t / 60) % 8
+        cores = [100.0 if i == hot else 20 + 15 * math.sin(t * 0.05 + i) for i in range(8)]
+        rows.append((datetime.datetime.fromtimestamp(t, tz=datetime.timezone.utc),
+                     pack_cores(cores), 1.2, 1.0, 0.8, 2.0, 0.0))
+        t += step
+    return rows
+
+
+def _max_by_bucket(blobs, buckets, cores):
+    # (len(blobs) x cores) -> (len(set(buckets)) x cores), max per bucket
+    if np is not None:
+        matrix = np.frombuffer(b''.join(blobs), dtype=np.uint8).reshape(len(blobs), cores)
+        edges = np.flatnonzero(np.diff(buckets, prepend=-1))
+        return (np.maximum.reduceat(matrix, edges, axis=0) / STEPS_PER_PERCENT).tolist()
+
+    result = []
+    current = None
+    for blob, bucket in zip(blobs, buckets):
+        if bucket != current:
+            current = bucket
+            result.append(bytearray(blob))
+        else:
+            row = result[-1]
+            for i, value in enumerate(blob):
+                if value > row[i]:
+                    row[i] = value
+    return [[v / STEPS_PER_PERCENT for v in row] for row in result]
+
+
+def heatmap(server_name, start, end, max_points):
+    """
+    Per-core usage between `start` and `end` in at most `max_points` time buckets
+    (busiest value per core and bucket), plus the load average and iowait/steal
+    of the last sample of each bucket.
+    """
+    if settings.DEMO_MODE:
+        rows = _demo_rows(start, end, max_points)
+    else:
+        # Resolved to server ids first: no JOIN, the (server, timestamp) index serves the range
+        server_ids = list(Server.objects.filter(name=server_name).values_list('id', flat=True))
+        rows = list(CpuMetric.objects
+                    .filter(server_id__in=server_ids, timestamp__gte=start, timestamp__lte=end)
+                    .order_by('timestamp')
+                    .values_list('timestamp', 'cores', 'load_1', 'load_5', 'load_15', 'iowait', 'steal')
+                    .iterator(chunk_size=2000))
+
+    # Only the latest core count is drawn (rows from before a CPU hot-plug are skipped)
+    cores = len(rows[-1][1]) if rows else 0
+    rows = [row for row in rows if len(row[1]) == cores]
+    if not rows:
+        return {'cores': 0, 'labels': [], 'timestamps': [], 'matrix': [], 'load': [], 'iowait': [], 'steal': []}
+
+    first = rows[0][0].timestamp()
+    width = max((rows[-1][0].timestamp() - first) / max_points, 1e-6)
+    buckets = [min(int((row[0].timestamp() - first) / width), max_points - 1) for row in rows]
+    matrix = _max_by_bucket([bytes(row[1]) for row in rows], buckets, cores)
+
+    # Last row of every bucket for the labels and the scalar series
+    last = [i for i in range(len(rows)) if i + 1 == len(rows) or buckets[i + 1] != buckets[i]]
+    fmt = '%H:%M:%S' if (end - start).total_seconds() <= 86400 else '%d/%m %H:%M'
+    return {
+        'cores': cores,
+        'labels': [rows[i][0].strftime(fmt) for i in last],
+        'timestamps': [int(rows[i][0].timestamp() * 1000) for i in last],  # Epoch milliseconds
+        'matrix': matrix,
+        'load': [[rows[i][2], rows[i][3], rows[i][4]] for i in last],
+        'iowait': [rows[i][5] for i in last],
+        'steal': [rows[i][6] for i in last],
+    }
@@ -0,0 +1,210 @@
+# monitor/disks.py
+"""
+Disk space of every mount and I/O of every disk.
+
+mounts() lists the mounted filesystems worth watching (MONITOR_DISK_FSTYPES /
+MONITOR_DISK_EXCLUDE_FSTYPES) with their usage. IOSampler turns
+disk_io_counters(perdisk=True) into per-second rates, average latency per
+operation and busy %, from the deltas since the previous read.
+
+Mounts and disks are rows (Mount, BlockDevice), so a new volume needs no
+schema change.
+"""
+import datetime
+import math
+import os
+import sys
+import time
+
+import psutil
+from django.conf import settings
+from django.utils import timezone
+
+from .counters import CounterDeltas
+from .lttb import downsample
+from .models import BlockDevice, DiskIOMetric, Mount, MountMetric
+
+IO_COUNTERS = ('read_bytes', 'write_bytes', 'read_count', 'write_count', 'read_time', 'write_time', 'busy_time')
+IO_FIELDS = ('read_bytes', 'write_bytes', 'read_iops', 'write_iops', 'read_latency', 'write_latency', 'busy')
+USAGE_FIELDS = ('percent', 'used', 'total')
+
+# busy_time only exists on these platforms
+HAS_BUSY_TIME = sys.platform.startswith(('linux', 'freebsd'))
+
+# Virtual devices that are not disks
+SKIP_DEVICE_PREFIXES = ('loop', 'ram', 'zram')
+
+
+def _fstype_filter():
+    include = {t.strip() for t in settings.MONITOR_DISK_FSTYPES.split(',') if t.strip()}
+    exclude = {t.strip() for t in settings.MONITOR_DISK_EXCLUDE_FSTYPES.split(',') if t.strip()}
+    return lambda fstype: (not include or fstype in include) and fstype not in exclude
+
+
+def mounts():
+    """[{'path', 'device', 'fstype', 'used', 'total', 'percent'}] for the watched mounts."""
+    if settings.DEMO_MODE:
+        t = time.time()
+        return [
+            {'path': '/', 'device': '/dev/sda1', 'fstype': 'ext4', 'used': 0, 'total': 0,
+             'percent': round(45 + (t % 100) / 20, 1)},
+            {'path': '/data', 'device': '/dev/sdb1', 'fstype': 'xfs', 'used': 0, 'total': 0,
+             'percent': round(72 + 3 * math.sin(t * 0.01), 1)},
+        ]
+
+    watched = _fstype_filter()
+    result = []
+    seen = set()
+    for part in psutil.disk_partitions(all=False):
+        if not watched(part.fstype) or part.mountpoint in seen:
+            continue
+        seen.add(part.mountpoint)
+        try:
+            usage = psutil.disk_usage(part.mountpoint)
+        except (PermissionError, OSError):
+            # Unreadable or vanished (e.g. an empty CD-ROM drive on Windows)
+            continue
+        result.append({
+            'path': part.mountpoint, 'device': part.device, 'fstype': part.fstype,
+            'used': usage.used, 'total': usage.total, 'percent': usage.percent,
+        })
+    return result
+
+
+def _is_disk(name):
+    # Linux also reports every partition (sda1...): only whole disks are in /sys/block
+    if name.startswith(SKIP_DEVICE_PREFIXES):
+        return False
+    if os.path.isdir('/sys/block'):
+        return os.path.exists(f'/sys/block/{name}')
+    return True
+
+
+def _read_io():
+    counters = psutil.disk_io_counters(perdisk=True) or {}
+    return {name: value for name, value in counters.items() if _is_disk(name)}
+
+
+class IOSampler:
+    """Per-disk I/O rates between two reads of disk_io_counters(perdisk=True)."""
+
+    def __init__(self, reader=None, clock=time.monotonic):
+        self.deltas = CounterDeltas(reader or _read_io, IO_COUNTERS, clock)
+
+    def sample(self):
+        """Returns {disk: {field: value}} (see DiskIOMetric)."""
+        rates = {}
+        for name, (elapsed, d) in self.deltas.sample().items():
+            rates[name] = {
+                'read_bytes': round(d['read_bytes'] / elapsed),
+                'write_bytes': round(d['write_bytes'] / elapsed),
+                'read_iops': round(d['read_count'] / elapsed, 2),
+                'write_iops': round(d['write_count'] / elapsed, 2),
+                # read_time / write_time are milliseconds spent on the operations
+                'read_latency': round(d['read_time'] / d['read_count'], 2) if d['read_count'] else None,
+                'write_latency': round(d['write_time'] / d['write_count'], 2) if d['write_count'] else None,
+                # busy_time is milliseconds: ms / (elapsed * 1000) * 100
+                'busy': min(100.0, round(d['busy_time'] / (elapsed * 10), 1)) if HAS_BUSY_TIME else None,
+            }
+        return rates
+
+
+def get_mounts(server, entries):
+    """{path: Mount} for the sampled mounts, created (or updated) on first sight."""
+    existing = {m.path: m for m in Mount.objects.filter(server=server, path__in=[e['path'] for e in entries])}
+    for entry in entries:
+        mount = existing.get(entry['path'])
+        if mount is None or (mount.device, mount.fstype) != (entry['device'], entry['fstype']):
+            existing[entry['path']], _ = Mount.objects.update_or_create(
+                server=server, path=entry['path'],
+                defaults={'device': entry['device'][:255], 'fstype': entry['fstype'][:32]},
+            )
+    return existing
+
+
+def get_devices(server, names):
+    """{name: BlockDevice} for `names`, created on first sight."""
+    existing = {d.name: d for d in BlockDevice.objects.filter(server=server, name__in=names)}
+    for name in set(names) - existing.keys():
+        existing[name], _ = BlockDevice.objects.get_or_create(server=server, name=name)
+    return existing
+
+
+def prune(now=None):
+    """Deletes rows older than MONITOR_RETENTION_DAYS['disk'] (0 = keep forever)."""
+    days = getattr(settings, 'MONITOR_RETENTION_DAYS', {}).get('disk', 0)
+    if not days:
+        return 0
+    cutoff = (now or timezone.now()) - datetime.timedelta(days=days)
+    deleted = 0
+    for model in (MountMetric, DiskIOMetric):
+        count, _ = model.objects.filter(timestamp__lt=cutoff).delete()
+        deleted += count
+    return deleted
+
+
+def list_sources(server_name):
+    """{'mounts': [...paths], 'devices': [...names]} recorded for a server."""
+    if settings.DEMO_MODE:
+        return {'mounts': ['/', '/data'], 'devices': ['sda']}
+    return {
+        'mounts': list(Mount.objects.filter(server__name=server_name).values_list('path', flat=True)),
+        'devices': list(BlockDevice.objects.filter(server__name=server_name).values_list('name', flat=True)),
+    }
+
+
+def _demo_rows(start, end, points, fields):
+    step = max((end - start).total_seconds() / max(points, 1), 1)
+    t = start.timestamp()
+    rows = []
+    while t <= end.timestamp() and len(rows) < points:
+        wave = 1 + math.sin(t * 0.02)
+        values = {
+            'read_bytes': round(2e7 * wave), 'write_bytes': round(8e6 * wave), 'read_iops': round(300 * wave, 2),
+            'write_iops': round(120 * wave, 2), 'read_latency': round(0.5 + wave, 2),
+            'write_latency': round(1 + wave, 2), 'busy': round(20 * wave, 1),
+            'percent': round(60 + 5 * math.sin(t * 0.001), 1), 'used': 0, 'total': 0,
+        }
+        rows.append((datetime.datetime.fromtimestamp(t, tz=datetime.timezone.utc), *(values[f] for f in fields)))
+        t += step
+    return rows
+
+
+def series(server_name, start, end, max_points, device=None, mount=None):
+    """
+    I/O of one disk (`device`) or usage of one mount (`mount`) between `start`
+    and `end`, LTTB downsampled to about `max_points`.
+    """
+    if device is not None:
+        fields, driving = IO_FIELDS, ('read_bytes', 'write_bytes')
+    else:
+        fields, driving = USAGE_FIELDS, ('percent',)
+
+    if settings.DEMO_MODE:
+        rows = _demo_rows(start, end, max_points, fields)
+    else:
+        # Resolved to ids first: no JOIN, the (<source>, timestamp) index serves the range
+        if device is not None:
+            ids = BlockDevice.objects.filter(server__name=server_name, name=device).values_list('id', flat=True)
+            qs = DiskIOMetric.objects.filter(device_id__in=list(ids))
+        else:
+            ids = Mount.objects.filter(server__name=server_name, path=mount).values_list('id', flat=True)
+            qs = MountMetric.objects.filter(mount_id__in=list(ids))
+        rows = list(qs.filter(timestamp__gte=start, timestamp__lte=end)
+                    .order_by('timestamp')
+                    .values_list('timestamp', *fields)
+                    .iterator(chunk_size=2000))
+
+    timestamps = [row[0].timestamp() for row in rows]
+    columns = {field: [row[i + 1] for row in rows] for i, field in enumerate(fields)}
+    keep = downsample(timestamps, [[v or 0 for v in columns[f]] for f in driving], max_points)
+
+    # Show the date as well when the range spans more than one day
+    fmt = '%H:%M:%S' if (end - start).total_seconds() <= 86400 else '%d/%m %H:%M'
+    return {
+        'device': device,
+        'mount': mount,
+        'labels': [rows[i][0].strftime(fmt) for i in keep],
+        'timestamps': [int(timestamps[i] * 1000) for i in keep],  # Epoch milliseconds
+        **{field: [values[i] for i in keep] for field, values in columns.items()},
+    }
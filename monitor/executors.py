@@ -0,0 +1,42 @@
+# monitor/executors.py
+"""
+Bounded thread pools for the async views.
+
+Under ASGI, sync views all share one thread per worker, so a slow call would
+stall every other request. The async views instead hand their blocking work
+(psutil, ORM, subprocesses) to these pools. Terminal commands get their own
+pool, so a long-running command can never starve the dashboard.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+_pools = {}
+
+
+def get_pool(name):
+    """Returns the named pool, created on first use with its configured size."""
+    if name not in _pools:
+        sizes = {
+            'monitor': getattr(settings, 'MONITOR_BLOCKING_THREADS', 8),
+            'terminal': getattr(settings, 'MONITOR_TERMINAL_THREADS', 4),
+        }
+        _pools[name] = ThreadPoolExecutor(max_workers=sizes.get(name, 4), thread_name_prefix=f'{name}-pool')
+    return _pools[name]
+
+
+def _call(func, args, kwargs):
+    try:
+        return func(*args, **kwargs)
+    finally:
+        # Pool threads live outside the request cycle: drop stale/broken DB connections
+        close_old_connections()
+
+
+async def run_blocking(func, *args, pool='monitor', **kwargs):
+    """Awaits `func(*args, **kwargs)` executed in the given bounded pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_pool(pool), functools.partial(_call, func, args, kwargs))
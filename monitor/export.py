@@ -0,0 +1,193 @@
+# monitor/export.py
+"""
+Streaming export of SystemMetric rows (CSV, NDJSON, Arrow IPC, Parquet).
+
+Rows come from the metric store (monitor/storage.py) as tuples in chunks:
+values_list().iterator() over the DB cursor, or slices of the mapped segment
+files, never model instances or a result cache. Server names are
+resolved once up front instead of a JOIN (or a query) per row, and the output
+is written in blocks so a month of samples streams in constant memory. The
+columnar formats build one Arrow record batch (one array per column) per
+chunk of rows; pyarrow is optional and only needed for them.
+
+Under ASGI a synchronous iterator would be read into a list before sending,
+so aiter_blocks() pulls one block at a time instead, always on the same
+(thread-sensitive) thread so the DB cursor stays on its connection.
+"""
+import csv
+import io
+import itertools
+import json
+
+from asgiref.sync import sync_to_async
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = pq = None
+
+from .models import Server
+from .storage import get_store
+
+COLUMNS = ('server', 'timestamp', 'cpu_usage', 'ram_usage', 'disk_usage', 'swap_usage')
+CHUNK_SIZE = 2000
+# Rows per yielded block of output
+BLOCK_ROWS = 500
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet',
+}
+# Columnar formats need pyarrow
+COLUMNAR = ('arrow', 'parquet')
+
+
+class ExportError(Exception):
+    pass
+
+
+def metric_rows(server_name=None, start=None, end=None, chunk_size=CHUNK_SIZE):
+    """Yields (server, timestamp, cpu, ram, disk, swap) tuples in chronological order."""
+    server_ids = None
+    if server_name:
+        server_ids = list(Server.objects.filter(name=server_name).values_list('id', flat=True))
+
+    names = dict(Server.objects.values_list('id', 'name'))
+    # Straight from the metric store (DB cursor or segment files, see monitor/storage.py)
+    for server_id, *values in get_store().rows(server_ids, start, end, chunk_size):
+        yield (names.get(server_id, ''), *values)
+
+
+def _drain(buffer):
+    value = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return value
+
+
+def csv_stream(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for count, (server, timestamp, *values) in enumerate(rows, 1):
+        writer.writerow((server, timestamp.isoformat(), *values))
+        if count % BLOCK_ROWS == 0:
+            yield _drain(buffer)
+    yield _drain(buffer)
+
+
+def ndjson_stream(rows):
+    lines = []
+    for server, timestamp, *values in rows:
+        lines.append(json.dumps(dict(zip(COLUMNS, (server, timestamp.isoformat(), *values)))))
+        if len(lines) == BLOCK_ROWS:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def arrow_schema():
+    return pa.schema([
+        ('server', pa.string()),
+        ('timestamp', pa.timestamp('us', tz='UTC')),
+        ('cpu_usage', pa.float64()),
+        ('ram_usage', pa.float64()),
+        ('disk_usage', pa.float64()),
+        ('swap_usage', pa.float64()),
+    ])
+
+
+def record_batches(rows, chunk_size=CHUNK_SIZE):
+    """Groups the row tuples into Arrow record batches, one column array per field."""
+    schema = arrow_schema()
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        columns = list(zip(*chunk))
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+            schema=schema,
+        )
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file that hands its bytes to the stream after every batch."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _columnar_stream(rows, open_writer):
+    if pa is None:
+        raise ExportError('Arrow/Parquet export requires pyarrow (pip install pyarrow).')
+    sink = _Sink()
+    writer = open_writer(pa.PythonFile(sink, mode='w'), arrow_schema())
+    try:
+        for batch in record_batches(rows):
+            writer.write_batch(batch)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def arrow_stream(rows):
+    """Arrow IPC stream format (read it with pyarrow.ipc.open_stream)."""
+    return _columnar_stream(rows, lambda sink, schema: pa.ipc.new_stream(sink, schema))
+
+
+def parquet_stream(rows):
+    """Parquet, one row group per chunk of rows (zstd compressed)."""
+    return _columnar_stream(rows, lambda sink, schema: pq.ParquetWriter(sink, schema, compression='zstd'))
+
+
+STREAMS = {
+    'csv': csv_stream,
+    'ndjson': ndjson_stream,
+    'arrow': arrow_stream,
+    'parquet': parquet_stream,
+}
+
+
+def check_output(output):
+    """Raises ExportError if `output` is unknown or its dependency is missing."""
+    if output not in STREAMS:
+        raise ExportError(f"output must be one of: {', '.join(STREAMS)}")
+    if output in COLUMNAR and pa is None:
+        raise ExportError('Arrow/Parquet export requires pyarrow (pip install pyarrow).')
+
+
+async def aiter_blocks(blocks):
+    """Async iterator over a sync generator of blocks, for StreamingHttpResponse under ASGI."""
+    next_block = sync_to_async(next, thread_sensitive=True)
+    while True:
+        block = await next_block(blocks, None)
+        if block is None:
+            return
+        yield block
@@ -5,11 +5,12 @@ from .models import Server
 class ServerForm(forms.ModelForm):
     class Meta:
         model = Server
-        fields = ['name', 'ip_address', 'os_info', 'is_active']
+        fields = ['name', 'ip_address', 'agent_port', 'os_info', 'is_active']
         # We can add Bootstrap CSS classes to the inputs
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Ex: Web Server Prod'}),
             'ip_address': forms.TextInput(attrs={'class': 'form-control', 'placeholder': '192.168.1.50'}),
+            'agent_port': forms.NumberInput(attrs={'class': 'form-control', 'placeholder': '9100'}),
             'os_info': forms.TextInput(attrs={'class': 'form-control'}),
             'is_active': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         }
\ No newline at end of file
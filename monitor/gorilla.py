@@ -0,0 +1,204 @@
+# monitor/gorilla.py
+"""
+Compressed chunks of time series (Gorilla, Pelkonen et al., VLDB 2015).
+
+Timestamps are integer milliseconds stored as delta-of-delta: a perfectly
+regular collector tick costs 1 bit, a few milliseconds of jitter 9 to 12.
+Every value column stores the XOR of each float with the previous one: an
+unchanged value (disk, swap, often RAM) costs 1 bit and a changed one only
+its meaningful bits, reusing the previous leading / trailing zero window when
+it fits. None is stored as NaN.
+
+A chunk is a small header followed by one byte-aligned section per column
+(timestamps first), so a reader only decodes the columns it needs.
+"""
+import struct
+
+VERSION = 1
+HEADER = struct.Struct('>BBI')  # version, value columns, samples
+SECTION = struct.Struct('>I')   # byte length of each section
+
+MASK64 = (1 << 64) - 1
+# Delta-of-delta buckets after a '1' bit: (prefix, value bits); anything wider is '1111' + 64 bits
+DOD_BUCKETS = (('10', 7), ('110', 9), ('1110', 12))
+NAN = float('nan')
+
+
+class ChunkError(ValueError):
+    pass
+
+
+class BitWriter:
+    def __init__(self):
+        self.parts = []
+
+    def bits(self, text):
+        self.parts.append(text)
+
+    def write(self, value, width):
+        if width:
+            self.parts.append(format(value, f'0{width}b'))
+
+    def getvalue(self):
+        bits = ''.join(self.parts)
+        if not bits:
+            return b''
+        bits += '0' * (-len(bits) % 8)
+        return int(bits, 2).to_bytes(len(bits) // 8, 'big')
+
+
+class BitReader:
+    """Reads from a '0'/'1' string: slicing and int(..., 2) beat bit shifting in Python."""
+
+    def __init__(self, data):
+        self.text = format(int.from_bytes(data, 'big'), f'0{len(data) * 8}b') if data else ''
+        self.pos = 0
+
+    def bit(self):
+        try:
+            value = self.text[self.pos] == '1'
+        except IndexError:
+            raise ChunkError('Truncated chunk')
+        self.pos += 1
+        return value
+
+    def read(self, width):
+        end = self.pos + width
+        if end > len(self.text):
+            raise ChunkError('Truncated chunk')
+        value = int(self.text[self.pos:end], 2) if width else 0
+        self.pos = end
+        return value
+
+
+def _signed(value):
+    return value - (1 << 64) if value >> 63 else value
+
+
+def _encode_timestamps(timestamps):
+    writer = BitWriter()
+    prev = delta = None
+    for ts in timestamps:
+        if prev is None:
+            writer.write(ts & MASK64, 64)
+            delta = 0
+        else:
+            current = ts - prev
+            dod = current - delta
+            delta = current
+            if dod == 0:
+                writer.bits('0')
+            else:
+                for prefix, width in DOD_BUCKETS:
+                    half = 1 << (width - 1)
+                    if -half <= dod < half:
+                        writer.bits(prefix)
+                        writer.write(dod + half, width)
+                        break
+                else:
+                    writer.bits('1111')
+                    writer.write(dod & MASK64, 64)
+        prev = ts
+    return writer.getvalue()
+
+
+def _decode_timestamps(data, count):
+    reader = BitReader(data)
+    if not count:
+        return []
+    prev = _signed(reader.read(64))
+    timestamps = [prev]
+    delta = 0
+    for _ in range(count - 1):
+        if reader.bit():
+            for _prefix, width in DOD_BUCKETS:
+                if not reader.bit():
+                    delta += reader.read(width) - (1 << (width - 1))
+                    break
+            else:
+                delta += _signed(reader.read(64))
+        prev += delta
+        timestamps.append(prev)
+    return timestamps
+
+
+def _encode_values(values):
+    floats = [NAN if v is None else v for v in values]
+    words = struct.unpack(f'>{len(floats)}Q', struct.pack(f'>{len(floats)}d', *floats))
+    writer = BitWriter()
+    prev = lead = trail = None
+    for word in words:
+        if prev is None:
+            writer.write(word, 64)
+        else:
+            xor = word ^ prev
+            if not xor:
+                writer.bits('0')
+            else:
+                leading = min(64 - xor.bit_length(), 31)  # 5 bits
+                trailing = (xor & -xor).bit_length() - 1
+                if lead is not None and leading >= lead and trailing >= trail:
+                    # Fits the previous window: no need to repeat it
+                    writer.bits('10')
+                else:
+                    lead, trail = leading, trailing
+                    writer.bits('11')
+                    writer.write(lead, 5)
+                    writer.write((64 - lead - trail) & 63, 6)  # 64 meaningful bits are stored as 0
+                writer.write(xor >> trail, 64 - lead - trail)
+        prev = word
+    return writer.getvalue()
+
+
+def _decode_values(data, count):
+    reader = BitReader(data)
+    if not count:
+        return []
+    prev = reader.read(64)
+    words = [prev]
+    lead = trail = 0
+    for _ in range(count - 1):
+        if reader.bit():
+            if reader.bit():
+                lead = reader.read(5)
+                trail = 64 - lead - (reader.read(6) or 64)
+            prev ^= reader.read(64 - lead - trail) << trail
+        words.append(prev)
+    floats = struct.unpack(f'>{count}d', struct.pack(f'>{count}Q', *words))
+    return [None if v != v else v for v in floats]  # NaN -> None
+
+
+def encode(timestamps, *columns):
+    """Chunk of integer timestamps (milliseconds) and float columns of the same length."""
+    count = len(timestamps)
+    if any(len(column) != count for column in columns):
+        raise ChunkError('Every column needs one value per timestamp')
+    sections = [_encode_timestamps(timestamps)] + [_encode_values(column) for column in columns]
+    return b''.join([
+        HEADER.pack(VERSION, len(columns), count),
+        *(SECTION.pack(len(section)) for section in sections),
+        *sections,
+    ])
+
+
+def decode(data, columns=None):
+    """(timestamps, [values of each requested column]); `columns` are indexes, None = all."""
+    data = bytes(data)
+    try:
+        version, width, count = HEADER.unpack_from(data)
+        if version != VERSION:
+            raise ChunkError(f'Unknown chunk version {version}')
+        offset = HEADER.size
+        lengths = [SECTION.unpack_from(data, offset + i * SECTION.size)[0] for i in range(width + 1)]
+    except struct.error:
+        raise ChunkError('Truncated chunk')
+
+    offset += (width + 1) * SECTION.size
+    sections = []
+    for length in lengths:
+        sections.append(data[offset:offset + length])
+        offset += length
+
+    wanted = range(width) if columns is None else columns
+    return (_decode_timestamps(sections[0], count),
+            [_decode_values(sections[i + 1], count) for i in wanted])
@@ -0,0 +1,284 @@
+# monitor/ingest.py
+"""
+Bulk ingestion of metrics pushed by remote agents.
+
+An agent (`collect_metrics --push`, see monitor/agent.py) samples its own host
+and POSTs a batch every flush to /api/ingest/, authenticated by the token of its
+Server row. The batch is gzip-compressed JSON, one list of rows per table:
+
+    {"v": 1, "os_info": "Linux 6.8",
+     "system":  [[ts, cpu, ram, disk, swap], ...],
+     "cpu":     [[ts, load_1, load_5, load_15, iowait, steal, "<base64 cores>"], ...],
+     "network": [[ts, "eth0", rx_bytes, tx_bytes, ...], ...],
+     "mounts":  [[ts, "/data", device, fstype, used, total, percent], ...],
+     "diskio":  [[ts, "sda", read_bytes, write_bytes, ...], ...]}
+
+Agents in serve mode answer the dashboard's pulls (monitor/poller.py) with the
+same batch. `ts` is epoch seconds. Rows are positional (no repeated keys) so a batch
+compresses well and decodes without a serializer per row; the whole batch is
+validated first and written with one bulk_create per table in one transaction.
+"""
+import base64
+import binascii
+import datetime
+import gzip
+import hashlib
+import json
+import math
+import secrets
+import zlib
+
+from django.conf import settings
+from django.db import models, router, transaction
+
+from . import disks, netio
+from .buffer import bulk_write
+from .models import CpuMetric, DiskIOMetric, InterfaceMetric, MountMetric, Server, SystemMetric
+
+VERSION = 1
+
+# Bytes of JSON accepted per batch, once decompressed
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+
+
+class IngestError(Exception):
+    """The batch cannot be stored (message is safe to return to the agent)."""
+
+
+class PayloadTooLarge(IngestError):
+    pass
+
+
+# --- Agent tokens ------------------------------------------------------------
+
+def hash_token(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_token(server):
+    """Creates (or replaces) the agent token of `server`. Only the hash is stored."""
+    token = secrets.token_urlsafe(32)
+    server.agent_token = hash_token(token)
+    server.save(update_fields=['agent_token'])
+    return token
+
+
+def revoke_token(server):
+    server.agent_token = None
+    server.save(update_fields=['agent_token'])
+
+
+def authenticate(token):
+    """The Server owning `token`, or None."""
+    if not token:
+        return None
+    return Server.objects.filter(agent_token=hash_token(token)).first()
+
+
+# --- Wire format -------------------------------------------------------------
+
+def _converter(field):
+    """Wire value -> Python value for a model field (rejects what the DB would)."""
+    if isinstance(field, models.BinaryField):
+        def convert(value):
+            return base64.b64decode(value, validate=True)
+    elif isinstance(field, models.IntegerField):
+        positive = isinstance(field, (models.PositiveIntegerField, models.PositiveBigIntegerField))
+
+        def convert(value):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"{field.name} must be a number")
+            value = int(value)
+            if positive and value < 0:
+                raise ValueError(f"{field.name} must be positive")
+            return value
+    else:
+        def convert(value):
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                raise ValueError(f"{field.name} must be a number")
+            return float(value)
+
+    if not field.null:
+        return convert
+    return lambda value: None if value is None else convert(value)
+
+
+class Kind:
+    """
+    One table of the batch: rows are [ts, *parent keys, *fields].
+    `parent` is the foreign key other than Server (interface, mount, device),
+    identified on the wire by `keys` instead of its id.
+    """
+
+    def __init__(self, name, model, fields, parent=None, keys=(), resolve=None):
+        self.name = name
+        self.model = model
+        self.fields = fields
+        self.parent = parent
+        self.keys = keys
+        self.resolve = resolve
+        self.width = 1 + len(keys) + len(fields)
+        self.converters = [_converter(model._meta.get_field(f)) for f in fields]
+        if parent:
+            parent_model = model._meta.get_field(parent).related_model
+            self.key_lengths = [parent_model._meta.get_field(k).max_length for k in keys]
+        else:
+            self.key_lengths = []
+
+    def encode(self, obj):
+        """Wire row of an (unsaved) model instance."""
+        row = [round(obj.timestamp.timestamp(), 3)]
+        if self.parent:
+            parent = getattr(obj, self.parent)
+            row.extend(getattr(parent, key) for key in self.keys)
+        for field in self.fields:
+            value = getattr(obj, field)
+            if isinstance(value, (bytes, memoryview)):
+                value = base64.b64encode(bytes(value)).decode()
+            row.append(value)
+        return row
+
+    def decode(self, rows):
+        """[(timestamp, parent key, {field: value})], or IngestError naming the bad row."""
+        if not isinstance(rows, list):
+            raise IngestError(f"'{self.name}' must be a list of rows")
+        decoded = []
+        n_keys = len(self.keys)
+        for i, row in enumerate(rows):
+            try:
+                if not isinstance(row, list) or len(row) != self.width:
+                    raise ValueError(f"expected {self.width} columns")
+                timestamp = datetime.datetime.fromtimestamp(row[0], tz=datetime.timezone.utc)
+                key = tuple(row[1:1 + n_keys])
+                if key and not key[0]:
+                    raise ValueError(f"empty {self.keys[0]}")
+                for k, name, length in zip(key, self.keys, self.key_lengths):
+                    if not isinstance(k, str) or len(k) > length:
+                        raise ValueError(f"{name} must be a string of at most {length} characters")
+                values = {
+                    field: convert(value)
+                    for field, convert, value in zip(self.fields, self.converters, row[1 + n_keys:])
+                }
+            except (TypeError, ValueError, OverflowError, OSError, binascii.Error) as e:
+                raise IngestError(f"{self.name}[{i}]: {e}")
+            decoded.append((timestamp, key, values))
+        return decoded
+
+    def build(self, server, decoded):
+        """Unsaved model instances, parents resolved (and created) once per batch."""
+        if not self.parent:
+            return [self.model(server=server, timestamp=ts, **values) for ts, _, values in decoded]
+        parents = self.resolve(server, {key for _, key, _ in decoded})
+        return [
+            self.model(timestamp=ts, **{self.parent: parents[key]}, **values)
+            for ts, key, values in decoded
+        ]
+
+
+def _interfaces(server, keys):
+    found = netio.get_interfaces(server, [name for name, in keys])
+    return {(name,): iface for name, iface in found.items()}
+
+
+def _devices(server, keys):
+    found = disks.get_devices(server, [name for name, in keys])
+    return {(name,): device for name, device in found.items()}
+
+
+def _mounts(server, keys):
+    entries = [{'path': path, 'device': device, 'fstype': fstype} for path, device, fstype in keys]
+    found = disks.get_mounts(server, entries)
+    return {key: found[key[0]] for key in keys}
+
+
+KINDS = (
+    Kind('system', SystemMetric, ('cpu_usage', 'ram_usage', 'disk_usage', 'swap_usage')),
+    Kind('cpu', CpuMetric, ('load_1', 'load_5', 'load_15', 'iowait', 'steal', 'cores')),
+    Kind('network', InterfaceMetric, netio.FIELDS,
+         parent='interface', keys=('name',), resolve=_interfaces),
+    Kind('mounts', MountMetric, ('used', 'total', 'percent'),
+         parent='mount', keys=('path', 'device', 'fstype'), resolve=_mounts),
+    Kind('diskio', DiskIOMetric, disks.IO_FIELDS,
+         parent='device', keys=('name',), resolve=_devices),
+)
+BY_MODEL = {kind.model: kind for kind in KINDS}
+
+
+def encode(instances, os_info=None):
+    """Batch payload of unsaved metric instances (the agent side)."""
+    payload = {'v': VERSION}
+    if os_info:
+        payload['os_info'] = os_info
+    for obj in instances:
+        kind = BY_MODEL[type(obj)]
+        payload.setdefault(kind.name, []).append(kind.encode(obj))
+    return payload
+
+
+def dumps(payload):
+    """Compact, gzip-compressed JSON body of a batch."""
+    body = json.dumps(payload, separators=(',', ':'), allow_nan=False).encode()
+    return gzip.compress(body, compresslevel=6)
+
+
+def _reject_constant(name):
+    raise ValueError(f"{name} is not allowed")
+
+
+def max_bytes():
+    return getattr(settings, 'MONITOR_INGEST_MAX_BYTES', DEFAULT_MAX_BYTES)
+
+
+def loads(body, encoding=''):
+    """Batch payload of a request body (gzip/deflate or plain JSON), size-limited."""
+    limit = max_bytes()
+    encoding = encoding.strip().lower()
+    if encoding in ('gzip', 'deflate'):
+        # wbits=47 accepts both the gzip and the zlib header. max_length stops a
+        # small "zip bomb" body from inflating past the limit in memory
+        inflater = zlib.decompressobj(wbits=47)
+        try:
+            data = inflater.decompress(body, limit + 1)
+        except zlib.error as e:
+            raise IngestError(f"Invalid {encoding} body: {e}")
+        if len(data) > limit or inflater.unconsumed_tail:
+            raise PayloadTooLarge(f"Batch larger than {limit} bytes")
+    elif encoding in ('', 'identity'):
+        data = body
+    else:
+        raise IngestError(f"Unsupported Content-Encoding '{encoding}'")
+
+    if len(data) > limit:
+        raise PayloadTooLarge(f"Batch larger than {limit} bytes")
+    try:
+        payload = json.loads(data, parse_constant=_reject_constant)
+    except ValueError as e:
+        raise IngestError(f"Invalid JSON: {e}")
+    if not isinstance(payload, dict) or payload.get('v') != VERSION:
+        raise IngestError(f"Expected a version {VERSION} batch object")
+    return payload
+
+
+def instances(server, payload):
+    """
+    Unsaved metric instances of a decoded batch for `server` (parents resolved).
+    Empty if the server is disabled: the batch is dropped, like the local
+    collector does. Raises IngestError, before touching the DB, if any row is invalid.
+    """
+    decoded = [(kind, kind.decode(payload.get(kind.name, []))) for kind in KINDS]
+    if not server.is_active:
+        return []
+
+    os_info = payload.get('os_info')
+    if isinstance(os_info, str) and os_info[:255] != server.os_info:
+        server.os_info = os_info[:255]
+        server.save(update_fields=['os_info'])
+    return [obj for kind, rows in decoded if rows for obj in kind.build(server, rows)]
+
+
+def store(server, payload):
+    """Writes a decoded batch for `server` in one transaction. Returns the number of rows saved."""
+    with transaction.atomic(using=router.db_for_write(Server)):
+        objs = instances(server, payload)
+        bulk_write(objs)
+    return len(objs)
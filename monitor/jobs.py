@@ -0,0 +1,288 @@
+# monitor/jobs.py
+"""
+Streaming, cancellable command execution for the web terminal.
+
+Every command runs as a "job" with an id. A reader thread copies its output
+(stdout + stderr) to a spool file as it is produced, so the browser can fetch
+it in chunks while it runs and reattach after a page reload. State lives in
+files under MONITOR_JOB_DIR, so any worker can read or cancel any job:
+
+    <id>.log   raw output (capped at MONITOR_JOB_OUTPUT_LIMIT bytes)
+    <id>.json    metadata: command, owner, pid, status, exit code...
+    <id>.cancel  marker left by cancel_job for the worker running the job
+
+Only the worker running a job writes its metadata (the cancel marker keeps a
+cancel from racing with the final status). The directory holds the output of
+superuser commands and pids that get signalled: it must be private to the
+user running the dashboard (see private_dir). Each job runs in its own process
+group, so timeouts and cancellations kill the shell and everything it started.
+"""
+import json
+import logging
+import os
+import re
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+
+import psutil
+from django.conf import settings
+
+logger = logging.getLogger('monitor')
+
+RUNNING = 'running'
+FINISHED = 'finished'
+CANCELLED = 'cancelled'
+TIMEOUT = 'timeout'
+TRUNCATED = 'truncated'
+# The worker that ran the job died before recording the result
+LOST = 'lost'
+
+CHUNK_SIZE = 4096
+# Finished jobs are kept this long for reattaching, then removed
+KEEP_FINISHED = 24 * 3600
+
+JOB_ID_RE = re.compile(r'^[0-9a-f]{12}$')
+
+IS_POSIX = os.name != 'nt'
+
+
+class JobError(Exception):
+    pass
+
+
+def private_dir(path):
+    """
+    Creates `path` (0700) if needed and returns it. Refuses a directory owned by
+    another user or open to others: they could read the output or plant metadata.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    if IS_POSIX:
+        st = os.stat(path)
+        if st.st_uid != os.getuid() or st.st_mode & 0o077:
+            raise JobError(f'{path} must be owned by this user and not accessible to others (chmod 700)')
+    return path
+
+
+def job_dir():
+    return private_dir(settings.MONITOR_JOB_DIR)
+
+
+def _path(job_id, ext):
+    # Ids come from URLs: never let them escape the job directory
+    if not JOB_ID_RE.match(job_id or ''):
+        raise JobError('Invalid job id')
+    return os.path.join(job_dir(), f'{job_id}.{ext}')
+
+
+def _write_meta(meta):
+    # Atomic replace: readers in other workers never see a half-written file
+    path = _path(meta['id'], 'json')
+    fd, tmp = tempfile.mkstemp(dir=job_dir(), suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp, path)
+
+
+def get_job(job_id):
+    """Metadata of a job, or None if it does not exist."""
+    try:
+        with open(_path(job_id, 'json')) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def list_jobs(owner, status=None):
+    """Jobs of `owner` (newest first), optionally filtered by status."""
+    jobs = []
+    for name in os.listdir(job_dir()):
+        if name.endswith('.json'):
+            meta = get_job(name[:-5])
+            if meta and meta['owner'] == owner and (status is None or meta['status'] == status):
+                jobs.append(meta)
+    return sorted(jobs, key=lambda m: m['started'], reverse=True)
+
+
+def _cleanup():
+    """Removes finished jobs older than KEEP_FINISHED and marks orphaned ones."""
+    now = time.time()
+    cutoff = now - KEEP_FINISHED
+    # No job legitimately runs past its timeout: still "running" means its worker died
+    orphan_cutoff = now - settings.MONITOR_COMMAND_TIMEOUT - 60
+    for name in os.listdir(job_dir()):
+        if not name.endswith('.json'):
+            continue
+        meta = get_job(name[:-5])
+        if meta and meta['status'] == RUNNING and meta['started'] < orphan_cutoff:
+            kill_recorded(meta, signal.SIGKILL)
+            meta.update(status=LOST, finished=now)
+            _write_meta(meta)
+        elif meta and meta['status'] != RUNNING and (meta.get('finished') or 0) < cutoff:
+            for ext in ('json', 'log', 'cancel'):
+                try:
+                    os.remove(_path(meta['id'], ext))
+                except FileNotFoundError:
+                    pass
+
+
+def kill_group(pid, sig):
+    """Sends `sig` to the process group led by `pid` (ignores groups already gone)."""
+    try:
+        if IS_POSIX:
+            os.killpg(pid, sig)
+        else:
+            os.kill(pid, signal.SIGTERM)
+    except (ProcessLookupError, PermissionError, OSError):
+        pass
+
+
+def create_time(pid):
+    """Start time of `pid` as psutil reports it (None if there is no such process)."""
+    try:
+        return psutil.Process(pid).create_time()
+    except psutil.Error:
+        return None
+
+
+def kill_recorded(meta, sig):
+    """
+    kill_group for a process recorded in metadata (job or shell) by another worker:
+    only if meta['created'] still matches, i.e. its pid was not reused meanwhile.
+    """
+    created = meta.get('created')
+    if created is not None and create_time(meta['pid']) == created:
+        kill_group(meta['pid'], sig)
+
+
+def start_job(command, cwd, owner):
+    """Starts `command` in the background and returns its metadata."""
+    _cleanup()
+
+    limit = settings.MONITOR_MAX_JOBS_PER_USER
+    if len(list_jobs(owner, RUNNING)) >= limit:
+        raise JobError(f'Too many running commands (max {limit}). Cancel one first.')
+
+    job_id = uuid.uuid4().hex[:12]
+    # shell=True is dangerous but necessary for a terminal emulator.
+    # We rely on superuser protection.
+    proc = subprocess.Popen(
+        command,
+        shell=True,
+        cwd=cwd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        bufsize=0,
+        start_new_session=IS_POSIX,
+    )
+    meta = {
+        'id': job_id,
+        'command': command,
+        'cwd': cwd,
+        'owner': owner,
+        'pid': proc.pid,
+        # Tells this process apart from a later one reusing the pid (see kill_recorded)
+        'created': create_time(proc.pid),
+        'status': RUNNING,
+        'exit_code': None,
+        'started': time.time(),
+        'finished': None,
+    }
+    _write_meta(meta)
+
+    threading.Thread(target=_pump, args=(meta, proc), daemon=True, name=f'job-{job_id}').start()
+    return meta
+
+
+def _pump(meta, proc):
+    """Copies the output to the spool file until EOF, timeout or byte cap."""
+    timeout = settings.MONITOR_COMMAND_TIMEOUT
+    limit = settings.MONITOR_JOB_OUTPUT_LIMIT
+    status = None
+
+    # The timer kills the whole group: the read below then hits EOF
+    def on_timeout():
+        nonlocal status
+        status = TIMEOUT
+        kill_group(proc.pid, signal.SIGKILL)
+
+    timer = threading.Timer(timeout, on_timeout)
+    timer.daemon = True
+    timer.start()
+
+    written = 0
+    try:
+        fd = os.open(_path(meta['id'], 'log'), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with open(fd, 'wb', buffering=0) as log:
+            while True:
+                chunk = proc.stdout.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if written + len(chunk) > limit:
+                    log.write(chunk[:limit - written])
+                    written = limit
+                    status = status or TRUNCATED
+                    kill_group(proc.pid, signal.SIGKILL)
+                    break
+                log.write(chunk)
+                written += len(chunk)
+    except Exception as e:
+        logger.error(f"Error reading output of job {meta['id']}: {e}")
+    finally:
+        timer.cancel()
+        proc.stdout.close()
+        exit_code = proc.wait()
+
+    # A cancel from another worker only leaves a marker: record it here
+    if os.path.exists(_path(meta['id'], 'cancel')):
+        status = CANCELLED
+    meta.update(status=status or FINISHED, exit_code=exit_code, finished=time.time(), bytes=written)
+    _write_meta(meta)
+
+
+def cancel_job(job_id, owner):
+    """Kills the job's process group (from any worker). Returns the metadata."""
+    meta = get_job(job_id)
+    if meta is None or meta['owner'] != owner:
+        raise JobError('Job not found')
+    if meta['status'] != RUNNING:
+        return meta
+
+    # The metadata belongs to the worker running the job: leave it a marker
+    os.close(os.open(_path(job_id, 'cancel'), os.O_WRONLY | os.O_CREAT, 0o600))
+    kill_recorded(meta, signal.SIGTERM)
+
+    # Give it a moment to exit cleanly, then force it
+    def force():
+        if (get_job(job_id) or {}).get('status') == RUNNING:
+            kill_recorded(meta, signal.SIGKILL)
+
+    timer = threading.Timer(2.0, force)
+    timer.daemon = True
+    timer.start()
+    return meta
+
+
+def read_output(job_id, offset, max_bytes=64 * 1024):
+    """
+    Returns (text, new_offset) with the output produced after `offset`.
+    Never splits a UTF-8 character: an incomplete tail is left for the next read.
+    """
+    try:
+        with open(_path(job_id, 'log'), 'rb') as f:
+            f.seek(offset)
+            data = f.read(max_bytes)
+    except FileNotFoundError:
+        return '', offset
+
+    try:
+        text = data.decode('utf-8')
+    except UnicodeDecodeError as e:
+        if e.reason == 'unexpected end of data':
+            data = data[:e.start]
+        text = data.decode('utf-8', errors='replace')
+    return text, offset + len(data)
@@ -0,0 +1,103 @@
+# monitor/lttb.py
+"""
+Largest-Triangle-Three-Buckets downsampling for the charts.
+
+LTTB keeps the points that best preserve the visual shape of a series (peaks
+and valleys survive, unlike plain averaging or striding). Returns indices so
+several series sharing the same X axis can be sliced consistently.
+
+NumPy is optional: when installed, each bucket is evaluated with vectorized
+array operations; otherwise a pure Python version is used.
+"""
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+def lttb_indices(x, y, threshold):
+    """Indices (sorted) of the `threshold` points LTTB keeps from the (x, y) series."""
+    n = len(x)
+    if threshold >= n:
+        return list(range(n))
+    if threshold < 3:
+        # Not enough room for a triangle: keep the endpoints
+        return [0, n - 1][:max(threshold, 0)]
+    if np is not None:
+        return _lttb_numpy(np.asarray(x, dtype=float), np.asarray(y, dtype=float), threshold)
+    return _lttb_python(x, y, threshold)
+
+
+def _lttb_numpy(x, y, threshold):
+    n = len(x)
+    # Bucket edges for the n-2 inner points (first and last are always kept)
+    every = (n - 2) / (threshold - 2)
+    edges = (np.arange(threshold - 1) * every).astype(int) + 1
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point for the final bucket)
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        # Triangle areas for every candidate of the bucket at once
+        areas = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(areas.argmax())
+        selected[i + 1] = a
+
+    return selected.tolist()
+
+
+def _lttb_python(x, y, threshold):
+    n = len(x)
+    every = (n - 2) / (threshold - 2)
+    selected = [0]
+
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+
+        span = next_end - end or 1
+        avg_x = sum(x[end:next_end]) / span if next_end > end else x[n - 1]
+        avg_y = sum(y[end:next_end]) / span if next_end > end else y[n - 1]
+
+        best, best_area = start, -1.0
+        ax, ay = x[a], y[a]
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (y[j] - ay) - (ax - x[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+
+    selected.append(n - 1)
+    return selected
+
+
+def downsample(x, series, max_points):
+    """
+    Downsamples several series that share `x` to at most `max_points` points.
+
+    Each series gets an equal share of the budget and the selected indices are
+    merged, so a spike in any of them (e.g. RAM while CPU is flat) survives.
+    Returns the list of kept indices in chronological order.
+    """
+    n = len(x)
+    if n <= max_points or not series:
+        return list(range(n))
+
+    share = max(3, max_points // len(series))
+    kept = set()
+    for y in series:
+        kept.update(lttb_indices(x, y, share))
+    return sorted(kept)
@@ -0,0 +1,82 @@
+"""
+Helpers shared by the bench_* management commands.
+
+The leading underscore keeps Django from listing this module as a command.
+"""
+import base64
+import os
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.db import connections
+
+from monitor import ingest
+from monitor.cpu import pack_cores
+
+
+@contextmanager
+def bench_database(verbosity=0, on_disk=False):
+    """
+    Runs the block against a throwaway test database, never the real db.sqlite3.
+    SQLite test databases live in memory unless `on_disk` is set (large datasets,
+    or benchmarks that must reopen connections).
+    """
+    # Every configured database (the monitor app may have its own, see monitor/routers.py)
+    created = []
+    try:
+        for connection in connections.all():
+            old_name = connection.settings_dict['NAME']
+            test_settings = connection.settings_dict.setdefault('TEST', {})
+            old_test_name = test_settings.get('NAME')
+            if on_disk:
+                test_settings['NAME'] = os.path.join(tempfile.mkdtemp(prefix='bench-'), f'{connection.alias}.sqlite3')
+            connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+            created.append((connection, old_name, test_settings, old_test_name))
+        yield
+    finally:
+        for connection, old_name, test_settings, old_test_name in created:
+            connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+            test_settings['NAME'] = old_test_name
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (0 if empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies):
+    """Mean / p50 / p95 / max of a list of latencies in seconds, as milliseconds."""
+    if not latencies:
+        return {'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+    return {
+        'mean': statistics.fmean(latencies) * 1000,
+        'p50': percentile(latencies, 50) * 1000,
+        'p95': percentile(latencies, 95) * 1000,
+        'max': max(latencies) * 1000,
+    }
+
+
+def synthetic_batch(rng, samples, nics=2, cores=8, interval=5):
+    """
+    Agent batch payload (see monitor/ingest.py) of `samples` collector ticks of
+    one host: one system row, one cpu row and one row per NIC each.
+    """
+    now = time.time()
+    payload = {'v': ingest.VERSION, 'os_info': 'Linux bench', 'system': [], 'cpu': [], 'network': []}
+    for i in range(samples):
+        ts = round(now - (samples - i) * interval, 3)
+        payload['system'].append([ts, round(rng.uniform(0, 100), 1), round(rng.uniform(20, 90), 1), 42.0, 1.5])
+        packed = pack_cores([rng.uniform(0, 100) for _ in range(cores)])
+        payload['cpu'].append([ts, 1.2, 0.9, 0.7, 0.3, 0.0, base64.b64encode(packed).decode()])
+        for nic in range(nics):
+            payload['network'].append(
+                [ts, f'eth{nic}', rng.randrange(10 ** 7), rng.randrange(10 ** 6),
+                 rng.randrange(10 ** 4), rng.randrange(10 ** 4), 0.0, 0.0, 0.0, 0.0]
+            )
+    return payload
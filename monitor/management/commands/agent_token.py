@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from monitor import ingest
+from monitor.models import Server
+
+
+class Command(BaseCommand):
+    help = 'Issues (or revokes) the token a remote agent uses to push metrics for a server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('server', help='Server name')
+        parser.add_argument('--create', action='store_true',
+                            help='Create the server if it does not exist')
+        parser.add_argument('--revoke', action='store_true',
+                            help='Remove the token: the agent is rejected from now on')
+
+    def handle(self, *args, **options):
+        name = options['server']
+        servers = list(Server.objects.filter(name=name)[:2])
+        if len(servers) > 1:
+            raise CommandError(f"Several servers are called '{name}': rename one first")
+        if servers:
+            server = servers[0]
+        elif options['create']:
+            server = Server.objects.create(name=name, is_active=True)
+        else:
+            raise CommandError(f"Server '{name}' does not exist (use --create)")
+
+        if options['revoke']:
+            ingest.revoke_token(server)
+            self.stderr.write(f"Agent token of '{name}' revoked")
+            return
+
+        # Only the hash is stored: the token cannot be shown again
+        token = ingest.issue_token(server)
+        self.stderr.write(f"Agent token for '{name}' (replaces any previous one):")
+        self.stdout.write(token)
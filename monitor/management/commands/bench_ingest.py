@@ -0,0 +1,99 @@
+import random
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from monitor import ingest
+from monitor.models import Server
+from ._bench import bench_database, summarize, synthetic_batch
+
+BENCH_PREFIX = 'bench-agent-'
+
+
+class Command(BaseCommand):
+    help = ('Load-tests /api/ingest/ with N simulated agents, in process (the test client, '
+            'no HTTP server) on a throwaway test database')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--agents', default='1,8,32',
+                            help='Comma separated list of concurrent agent counts')
+        parser.add_argument('--samples', type=int, default=60,
+                            help='Collector ticks per pushed batch (one system + one cpu row + one row per NIC)')
+        parser.add_argument('--nics', type=int, default=2, help='Interfaces per simulated host')
+        parser.add_argument('--cores', type=int, default=8, help='Cores per simulated host')
+        parser.add_argument('--duration', type=float, default=5.0,
+                            help='Seconds to run each agent level')
+
+    def handle(self, *args, **options):
+        levels = [int(v) for v in options['agents'].split(',') if v.strip()]
+        if not levels:
+            raise CommandError('--agents needs at least one count')
+        self.options = options
+
+        # On disk: every agent thread opens its own connection to it
+        with bench_database(on_disk=True):
+            servers = [Server.objects.create(name=f'{BENCH_PREFIX}{i}', is_active=True) for i in range(max(levels))]
+            tokens = [ingest.issue_token(server) for server in servers]
+            rows_per_sample = 2 + options['nics']
+            self.stdout.write(
+                f"{'agents':>7} {'batches/s':>10} {'samples/s':>10} {'rows/s':>10} "
+                f"{'p50 ms':>9} {'p95 ms':>9} {'errors':>7}"
+            )
+            for agents in levels:
+                batches, latencies, errors = self.run_level(tokens[:agents], options['duration'])
+                elapsed = options['duration']
+                samples = batches * options['samples']
+                stats = summarize(latencies)
+                self.stdout.write(
+                    f"{agents:>7} {batches / elapsed:>10.1f} {samples / elapsed:>10.0f} "
+                    f"{samples * rows_per_sample / elapsed:>10.0f} {stats['p50']:>9.2f} {stats['p95']:>9.2f} {len(errors):>7}"
+                )
+                if errors:
+                    self.stderr.write(f"  first error: {errors[0]}")
+
+    def batch(self, rng):
+        """One pushed batch: `samples` collector ticks of one host, 5 seconds apart."""
+        opts = self.options
+        return ingest.dumps(synthetic_batch(rng, opts['samples'], opts['nics'], opts['cores']))
+
+    def run_level(self, tokens, duration):
+        """Each agent pushes batches back to back through its own test client (and DB connection)."""
+        batches = 0
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+        url = reverse('agent_ingest')
+        deadline = time.perf_counter() + duration
+
+        def agent(token):
+            nonlocal batches
+            client = Client(HTTP_HOST='localhost', HTTP_AUTHORIZATION=f'Bearer {token}')
+            rng = random.Random()
+            local, failed = [], []
+            try:
+                while time.perf_counter() < deadline:
+                    body = self.batch(rng)
+                    start = time.perf_counter()
+                    response = client.post(url, body, content_type='application/json',
+                                           HTTP_CONTENT_ENCODING='gzip', secure=True)
+                    if response.status_code != 200:
+                        failed.append(f'HTTP {response.status_code}: {response.content[:200]!r}')
+                        continue
+                    local.append(time.perf_counter() - start)
+            finally:
+                connections.close_all()
+            with lock:
+                batches += len(local)
+                latencies.extend(local)
+                errors.extend(failed)
+
+        threads = [threading.Thread(target=agent, args=(token,)) for token in tokens]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return batches, latencies, errors
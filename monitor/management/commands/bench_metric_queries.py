@@ -0,0 +1,100 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from monitor.models import Server, SystemMetric
+from ._bench import bench_database, summarize
+
+INDEX_NAME = 'metric_server_ts_idx'
+BATCH = 50_000
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks per-server latest-N metric lookups and shows their SQLite query plans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000_000, help='Total SystemMetric rows to generate')
+        parser.add_argument('--servers', type=int, default=10, help='Number of servers the rows are spread over')
+        parser.add_argument('--latest', type=int, default=20, help='N in "latest N" (the chart uses 20)')
+        parser.add_argument('--repeat', type=int, default=50, help='Queries timed per variant')
+
+    def handle(self, *args, **options):
+        # On disk: 10M rows do not fit comfortably in memory
+        with bench_database(on_disk=True):
+            self.seed(options['rows'], options['servers'])
+            name = f"server-{options['servers'] // 2}"
+            n = options['latest']
+
+            variants = {
+                # Previous code path: JOIN on the name, full model instances
+                'join by name': lambda: list(
+                    SystemMetric.objects.filter(server__name=name).order_by('-timestamp')[:n]
+                ),
+                # Current code path: server_id resolved once, only the plotted columns
+                'server_id + values_list': lambda: list(
+                    SystemMetric.objects.for_server(name).order_by('-timestamp')
+                    .values_list('timestamp', 'cpu_usage', 'ram_usage')[:n]
+                ),
+            }
+
+            self.stdout.write(self.style.MIGRATE_HEADING('With (server, timestamp) index'))
+            self.run_variants(variants, name, n, options['repeat'])
+
+            connection = connections[router.db_for_write(SystemMetric)]
+            with connection.cursor() as cursor:
+                cursor.execute(f'DROP INDEX "{INDEX_NAME}"')
+            # Reconnect so no statement prepared against the old schema is reused
+            connection.close()
+            self.stdout.write(self.style.MIGRATE_HEADING('Without (server, timestamp) index'))
+            self.run_variants(variants, name, n, options['repeat'])
+
+    def seed(self, rows, servers):
+        """Inserts rows with raw executemany (the ORM would take ages for 10M rows)."""
+        self.stdout.write(f"Generating {rows:,} rows over {servers} servers...")
+        started = time.perf_counter()
+        server_ids = [Server.objects.create(name=f'server-{i}').id for i in range(servers)]
+        now = timezone.now()
+        sql = (f'INSERT INTO "{SystemMetric._meta.db_table}" '
+               f'(server_id, cpu_usage, ram_usage, disk_usage, swap_usage, timestamp) '
+               f'VALUES (%s, %s, %s, %s, %s, %s)')
+
+        def generate(first, last):
+            for i in range(first, last):
+                # Interleaved like real collectors writing at the same time
+                ts = now - timezone.timedelta(seconds=5 * (i // servers))
+                yield (server_ids[i % servers], random.random() * 100, 50.0, 40.0, 5.0, ts.isoformat(' '))
+
+        alias = router.db_for_write(SystemMetric)
+        with connections[alias].cursor() as cursor:
+            for first in range(0, rows, BATCH):
+                # One transaction per batch: autocommit would fsync every single row
+                with transaction.atomic(using=alias):
+                    cursor.executemany(sql, generate(first, min(rows, first + BATCH)))
+            cursor.execute(f'ANALYZE "{SystemMetric._meta.db_table}"')
+        self.stdout.write(f"  done in {time.perf_counter() - started:.1f}s")
+
+    def run_variants(self, variants, name, n, repeat):
+        plans = {
+            'join by name': SystemMetric.objects.filter(server__name=name).order_by('-timestamp')[:n],
+            'server_id + values_list': SystemMetric.objects.for_server(name).order_by('-timestamp')
+            .values_list('timestamp', 'cpu_usage', 'ram_usage')[:n],
+        }
+        for label, func in variants.items():
+            latencies = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                func()
+                latencies.append(time.perf_counter() - start)
+            stats = summarize(latencies)
+            plan = plans[label].explain()
+            # SEARCH = index seek on server_id; SCAN would walk the whole index/table
+            uses_index = f'SEARCH {SystemMetric._meta.db_table} USING INDEX {INDEX_NAME}' in plan
+            self.stdout.write(
+                f"  {label:<26} p50 {stats['p50']:>9.3f} ms  p95 {stats['p95']:>9.3f} ms  "
+                f"index seek: {'yes' if uses_index else 'no'}"
+            )
+            for line in plan.splitlines():
+                self.stdout.write(f"      {line}")
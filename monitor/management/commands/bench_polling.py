@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncRequestFactory, override_settings
+from django.utils import timezone
+
+from monitor import views
+from monitor.models import Server, SystemMetric
+from ._bench import bench_database, summarize
+
+# Isolated cache so the benchmark never touches the real shared snapshots
+BENCH_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-polling'},
+}
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks dashboard polling (metrics + chart) against the number of concurrent viewers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--viewers', default='1,4,16,64',
+                            help='Comma separated list of concurrent viewer counts')
+        parser.add_argument('--duration', type=float, default=3.0,
+                            help='Seconds to run each viewer level')
+
+    def handle(self, *args, **options):
+        levels = [int(v) for v in options['viewers'].split(',') if v.strip()]
+        duration = options['duration']
+
+        with bench_database(), override_settings(CACHES=BENCH_CACHES, DEMO_MODE=False):
+            self.seed()
+            self.stdout.write(f"{'viewers':>8} {'mode':>9} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9}")
+            for viewers in levels:
+                for mode, ttl in (('uncached', 0), ('cached', 2)):
+                    cache.clear()
+                    with override_settings(MONITOR_SNAPSHOT_TTL=ttl):
+                        rate, stats = self.run_level(viewers, duration)
+                    self.stdout.write(
+                        f"{viewers:>8} {mode:>9} {rate:>10.1f} {stats['p50']:>9.2f} {stats['p95']:>9.2f}"
+                    )
+
+    def seed(self):
+        server = Server.objects.create(name='Localhost', ip_address='127.0.0.1')
+        now = timezone.now()
+        SystemMetric.objects.bulk_create([
+            SystemMetric(server=server, cpu_usage=i % 100, ram_usage=50, disk_usage=40, swap_usage=5,
+                         timestamp=now - timezone.timedelta(seconds=5 * i))
+            for i in range(500)
+        ])
+
+    def run_level(self, viewers, duration):
+        """
+        Each viewer alternates metric-card and chart polls until the deadline.
+        The views are async: every viewer is a task of one event loop, as in an
+        ASGI worker, and their blocking work goes to the bounded pool.
+        """
+        return asyncio.run(self.run_viewers(viewers, duration))
+
+    async def run_viewers(self, viewers, duration):
+        factory = AsyncRequestFactory()
+        user = User(username='bench')
+        latencies = []
+        deadline = time.perf_counter() + duration
+
+        # What AuthenticationMiddleware sets: the async login_required awaits auser()
+        async def auser():
+            return user
+
+        async def viewer():
+            endpoints = (views.system_metrics, views.chart_data)
+            i = 0
+            while time.perf_counter() < deadline:
+                request = factory.get('/')
+                request.user, request.auser = user, auser
+                start = time.perf_counter()
+                response = await endpoints[i % 2](request)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    raise CommandError(f"{endpoints[i % 2].__name__} answered {response.status_code}")
+                i += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(viewer() for _ in range(viewers)))
+        elapsed = time.perf_counter() - started
+        return len(latencies) / elapsed, summarize(latencies)
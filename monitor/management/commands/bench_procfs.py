@@ -0,0 +1,110 @@
+import os
+import shutil
+import tempfile
+import time
+
+import psutil
+from django.core.management.base import BaseCommand, CommandError
+
+from monitor.collectors import PsutilBackend
+from monitor.procfs import ProcfsBackend
+from ._bench import summarize
+
+STAT = 'cpu  {busy} 120 {busy} {idle} 300 0 40 0 0 0\ncpu0 1 1 1 1 1 0 0 0 0 0\nbtime 1760000000\n'
+MEMINFO = (
+    'MemTotal:       16384000 kB\nMemFree:         2048000 kB\nMemAvailable:    8192000 kB\n'
+    'Buffers:          204800 kB\nCached:          4096000 kB\nShmem:            102400 kB\n'
+    'Active:          6144000 kB\nInactive:        4096000 kB\nSReclaimable:     409600 kB\n'
+    'SwapTotal:       4096000 kB\nSwapFree:        3072000 kB\n'
+)
+VMSTAT = 'pswpin 10\npswpout 20\n'
+PID_STAT = (
+    '{pid} (worker-{pid} x) S 1 {pid} {pid} 0 -1 4194560 100 0 0 0 '
+    '{utime} {stime} 0 0 20 0 1 0 {start} 104857600 {rss} 18446744073709551615 '
+    '1 1 0 0 0 0 0 0 0 0 0 0 17 0 0 0 0 0 0 0 0 0 0 0 0 0 0\n'
+)
+PID_STATM = '25600 {rss} 300 10 0 500 0\n'
+PID_STATUS = 'Name:\tworker-{pid} x\nState:\tS (sleeping)\nPPid:\t1\nUid:\t{uid}\t{uid}\t{uid}\t{uid}\nGid:\t0\t0\t0\t0\n'
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the procfs and psutil collector backends on synthetic /proc trees'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pids', default='1000,10000,50000',
+                            help='Comma separated list of process counts')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Timed runs per backend and size')
+
+    def handle(self, *args, **options):
+        if not hasattr(psutil, 'PROCFS_PATH'):
+            raise CommandError('psutil can only read a synthetic /proc tree on Linux.')
+        sizes = [int(v) for v in options['pids'].split(',') if v.strip()]
+
+        self.stdout.write(
+            f"{'pids':>7} {'backend':>14} {'mean ms':>9} {'p95 ms':>9} {'us/pid':>8} {'system ms':>10}"
+        )
+        for size in sizes:
+            root = tempfile.mkdtemp(prefix='bench-proc-')
+            try:
+                self.build_tree(root, size)
+                for label, run_table, run_system in self.backends(root):
+                    tables = [self.timed(run_table) for _ in range(options['repeat'])]
+                    system = [self.timed(run_system) for _ in range(options['repeat'])]
+                    stats = summarize(tables)
+                    self.stdout.write(
+                        f"{size:>7} {label:>14} {stats['mean']:>9.1f} {stats['p95']:>9.1f} "
+                        f"{stats['mean'] * 1000 / size:>8.1f} {summarize(system)['mean']:>10.3f}"
+                    )
+            finally:
+                shutil.rmtree(root, ignore_errors=True)
+
+    def backends(self, root):
+        """(label, process table call, system metrics call) for every backend."""
+        procfs = ProcfsBackend(root)
+        yield 'procfs', procfs.processes, lambda: (procfs.cpu_percent(), procfs.memory())
+
+        # psutil reads the same tree through PROCFS_PATH
+        def with_root(func):
+            def run():
+                old, psutil.PROCFS_PATH = psutil.PROCFS_PATH, root
+                try:
+                    return func()
+                finally:
+                    psutil.PROCFS_PATH = old
+            return run
+
+        def system():
+            return psutil.cpu_percent(interval=None), psutil.virtual_memory().percent, psutil.swap_memory().percent
+
+        # Cold: new Process objects every time (the old processes_list), warm: cached across ticks
+        yield 'psutil (cold)', with_root(lambda: PsutilBackend().processes()), with_root(system)
+        warm = PsutilBackend()
+        with_root(warm.processes)()
+        yield 'psutil (warm)', with_root(warm.processes), with_root(system)
+
+    def timed(self, func):
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
+
+    def build_tree(self, root, size):
+        self.stdout.write(f'Building a synthetic /proc with {size} processes...')
+        with open(os.path.join(root, 'stat'), 'w') as f:
+            f.write(STAT.format(busy=size * 10, idle=size * 100))
+        with open(os.path.join(root, 'meminfo'), 'w') as f:
+            f.write(MEMINFO)
+        with open(os.path.join(root, 'vmstat'), 'w') as f:
+            f.write(VMSTAT)
+
+        uid = os.getuid()
+        for pid in range(1, size + 1):
+            path = os.path.join(root, str(pid))
+            os.mkdir(path)
+            rss = 1000 + pid % 5000
+            with open(os.path.join(path, 'stat'), 'w') as f:
+                f.write(PID_STAT.format(pid=pid, utime=pid % 977, stime=pid % 313, start=1000 + pid, rss=rss))
+            with open(os.path.join(path, 'statm'), 'w') as f:
+                f.write(PID_STATM.format(rss=rss))
+            with open(os.path.join(path, 'status'), 'w') as f:
+                f.write(PID_STATUS.format(pid=pid, uid=uid))
@@ -0,0 +1,116 @@
+import random
+import socket
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from monitor.agent import AgentServer
+from monitor.buffer import bulk_write
+from monitor.models import Server, SystemMetric
+from monitor.poller import Poller, targets
+from ._bench import bench_database, synthetic_batch
+
+BENCH_TOKEN = 'bench-pull-token'
+
+
+def _free_port():
+    """A local port nobody listens on (an unreachable agent)."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = ('Benchmarks the pull collector against local stand-in agents '
+            '(healthy, unreachable and slow ones) on a throwaway test database')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--agents', type=int, default=50, help='Healthy stand-in agents')
+        parser.add_argument('--unreachable', type=int, default=5,
+                            help='Servers whose agent port is closed (exercise the backoff)')
+        parser.add_argument('--slow', type=int, default=2,
+                            help='Agents that answer after the pull timeout')
+        parser.add_argument('--latency', type=float, default=0.05,
+                            help='Seconds every stand-in waits before answering (network round trip)')
+        parser.add_argument('--concurrency', default='1,16',
+                            help='Comma separated list of pool sizes to compare')
+        parser.add_argument('--ticks', type=int, default=10, help='Pull ticks per pool size')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds between ticks')
+        parser.add_argument('--timeout', type=float, default=0.5, help='Socket timeout of each pull')
+        parser.add_argument('--samples', type=int, default=12,
+                            help='Collector ticks buffered by each agent between two pulls')
+
+    def handle(self, *args, **options):
+        levels = [int(v) for v in options['concurrency'].split(',') if v.strip()]
+        if not levels:
+            raise CommandError('--concurrency needs at least one pool size')
+        self.options = options
+
+        agents = []
+        try:
+            with bench_database():
+                for i in range(options['agents'] + options['slow']):
+                    slow = i >= options['agents']
+                    agent = AgentServer(('127.0.0.1', 0), BENCH_TOKEN, self.source(slow))
+                    agent.start()
+                    agents.append(agent)
+                    Server.objects.create(name=f"{'slow' if slow else 'agent'}-{i}", ip_address='127.0.0.1',
+                                          agent_port=agent.server_address[1])
+                for i in range(options['unreachable']):
+                    Server.objects.create(name=f'down-{i}', ip_address='127.0.0.1', agent_port=_free_port())
+
+                self.stdout.write(
+                    f"{'pool':>5} {'pulled':>7} {'failed':>7} {'backoff':>8} {'busy':>6} "
+                    f"{'rows':>8} {'write ms':>9} {'ticks late':>11}"
+                )
+                for concurrency in levels:
+                    self.run_level(concurrency)
+        finally:
+            for agent in agents:
+                agent.shutdown()
+                agent.server_close()
+
+    def source(self, slow):
+        rng = random.Random()
+        delay = self.options['timeout'] * 3 if slow else self.options['latency']
+
+        def batch(ack=None):
+            time.sleep(delay)
+            return synthetic_batch(rng, self.options['samples'], interval=1)
+        return batch
+
+    def run_level(self, concurrency):
+        """Runs the collector's pull task `ticks` times, writing each tick's rows in one transaction."""
+        opts = self.options
+        SystemMetric.objects.all().delete()
+        poller = Poller(BENCH_TOKEN, concurrency=concurrency, timeout=opts['timeout'], interval=opts['interval'])
+        write_time = 0.0
+        late = 0
+        next_tick = time.monotonic()
+        try:
+            for _ in range(opts['ticks']):
+                rows = poller.tick(targets())
+                start = time.perf_counter()
+                if rows:
+                    bulk_write(rows)
+                write_time += time.perf_counter() - start
+
+                next_tick += opts['interval']
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    late += 1
+            # Last harvest: pulls started on the final tick
+            time.sleep(opts['timeout'])
+            rows = poller.harvest()
+            if rows:
+                bulk_write(rows)
+        finally:
+            poller.close()
+
+        c = poller.counts
+        self.stdout.write(
+            f"{concurrency:>5} {c['pulled']:>7} {c['failed']:>7} {c['backoff']:>8} {c['busy']:>6} "
+            f"{c['rows']:>8} {write_time / opts['ticks'] * 1000:>9.1f} {late:>11}"
+        )
@@ -0,0 +1,153 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, router, transaction
+from django.db.models import Avg
+from django.utils import timezone
+
+from core.sqlite import PROFILES, sqlite_database
+from monitor.models import Server, SystemMetric
+from ._bench import bench_database, summarize
+
+# Settings keys a profile changes on each DATABASES entry
+PROFILE_KEYS = ('OPTIONS', 'CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')
+
+
+class Command(BaseCommand):
+    help = ('Benchmarks dashboard reads while metrics are being written, for each SQLite '
+            'profile (see core/sqlite.py), on a throwaway on-disk database')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default=','.join(PROFILES),
+                            help='Comma separated list of DB_PROFILE values to compare')
+        parser.add_argument('--rows', type=int, default=100_000, help='SystemMetric rows seeded first')
+        parser.add_argument('--readers', type=int, default=6, help='Concurrent reader threads (web workers)')
+        parser.add_argument('--writers', type=int, default=2,
+                            help='Concurrent writer threads (collector, ingest requests)')
+        parser.add_argument('--batch', type=int, default=200, help='Rows per write transaction')
+        parser.add_argument('--write-interval', type=float, default=0.05,
+                            help='Seconds each writer sleeps between two transactions')
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds to run each profile')
+
+    def handle(self, *args, **options):
+        profiles = [p.strip() for p in options['profiles'].split(',') if p.strip()]
+        unknown = set(profiles) - set(PROFILES)
+        if unknown:
+            raise CommandError(f"Unknown profile(s): {', '.join(sorted(unknown))}")
+        self.options = options
+
+        self.stdout.write(
+            f"{'profile':>11} {'reads/s':>9} {'read p50':>9} {'read p95':>9} {'read max':>9} {'read err':>9} "
+            f"{'rows/s':>9} {'write p95':>10} {'write err':>10}"
+        )
+        for profile in profiles:
+            with self.profile(profile), bench_database(on_disk=True):
+                self.seed(options['rows'])
+                self.report(profile, *self.run_profile(options['duration']))
+
+    @contextmanager
+    def profile(self, name):
+        """Applies a DB_PROFILE to every configured database (new connections pick it up)."""
+        saved = []
+        for connection in connections.all():
+            settings_dict = connection.settings_dict
+            saved.append((settings_dict, {k: settings_dict.get(k) for k in PROFILE_KEYS}))
+            tuned = sqlite_database(settings_dict['NAME'], name)
+            settings_dict['OPTIONS'] = tuned.get('OPTIONS', {})
+            settings_dict['CONN_MAX_AGE'] = tuned.get('CONN_MAX_AGE', 0)
+            settings_dict['CONN_HEALTH_CHECKS'] = tuned.get('CONN_HEALTH_CHECKS', False)
+        connections.close_all()
+        try:
+            yield
+        finally:
+            connections.close_all()
+            for settings_dict, values in saved:
+                settings_dict.update(values)
+
+    def seed(self, rows):
+        self.server = Server.objects.create(name='Localhost', ip_address='127.0.0.1')
+        now = timezone.now()
+        with transaction.atomic(using=router.db_for_write(SystemMetric)):
+            SystemMetric.objects.bulk_create(
+                (SystemMetric(server=self.server, cpu_usage=random.random() * 100, ram_usage=50,
+                              disk_usage=40, swap_usage=5, timestamp=now - timezone.timedelta(seconds=5 * i))
+                 for i in range(rows)),
+                batch_size=5000,
+            )
+
+    def run_profile(self, duration):
+        """Readers poll like the dashboard while writers commit batches like the collector and ingest."""
+        opts = self.options
+        server_id = self.server.id
+        reads, writes = [], []
+        errors = {'read': 0, 'write': 0}
+        written = 0
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def reader():
+            local, failed = [], 0
+            try:
+                while time.perf_counter() < deadline:
+                    since = timezone.now() - timezone.timedelta(hours=1)
+                    start = time.perf_counter()
+                    try:
+                        # Live chart (latest 20) + a 1-hour aggregate
+                        list(SystemMetric.objects.filter(server_id=server_id).order_by('-timestamp')
+                             .values_list('timestamp', 'cpu_usage', 'ram_usage')[:20])
+                        SystemMetric.objects.filter(server_id=server_id, timestamp__gte=since).aggregate(Avg('cpu_usage'))
+                    except OperationalError:
+                        failed += 1
+                        continue
+                    local.append(time.perf_counter() - start)
+            finally:
+                connections.close_all()
+            with lock:
+                reads.extend(local)
+                errors['read'] += failed
+
+        def writer():
+            nonlocal written
+            local, failed, rows = [], 0, 0
+            alias = router.db_for_write(SystemMetric)
+            try:
+                while time.perf_counter() < deadline:
+                    now = timezone.now()
+                    batch = [SystemMetric(server_id=server_id, cpu_usage=random.random() * 100, ram_usage=50,
+                                          disk_usage=40, swap_usage=5, timestamp=now)
+                             for _ in range(opts['batch'])]
+                    start = time.perf_counter()
+                    try:
+                        with transaction.atomic(using=alias):
+                            SystemMetric.objects.bulk_create(batch)
+                    except OperationalError:
+                        failed += 1
+                    else:
+                        local.append(time.perf_counter() - start)
+                        rows += len(batch)
+                    time.sleep(opts['write_interval'])
+            finally:
+                connections.close_all()
+            with lock:
+                writes.extend(local)
+                errors['write'] += failed
+                written += rows
+
+        threads = [threading.Thread(target=reader) for _ in range(opts['readers'])]
+        threads += [threading.Thread(target=writer) for _ in range(opts['writers'])]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return reads, writes, errors, written
+
+    def report(self, profile, reads, writes, errors, written):
+        duration = self.options['duration']
+        r, w = summarize(reads), summarize(writes)
+        self.stdout.write(
+            f"{profile:>11} {len(reads) / duration:>9.0f} {r['p50']:>7.2f}ms {r['p95']:>7.2f}ms {r['max']:>7.1f}ms "
+            f"{errors['read']:>9} {written / duration:>9.0f} {w['p95']:>8.2f}ms {errors['write']:>10}"
+        )
@@ -0,0 +1,123 @@
+import datetime
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from monitor.models import Server, SystemMetric
+from monitor.storage import OrmStore
+from ._bench import bench_database, summarize
+
+# 'chunks' is the orm store once every closed window is sealed (see OrmStore.seal)
+STORES = ('orm', 'chunks', 'tsfile')
+# Chart ranges read back from the history
+WINDOWS = {'1h': 3600, '24h': 86400, '7d': 7 * 86400}
+
+
+class Command(BaseCommand):
+    help = ('Benchmarks the metric stores (see monitor/storage.py): ingestion, bytes per sample and '
+            'range reads over a large history, on a throwaway on-disk database')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stores', default=','.join(STORES), help='Comma separated list of stores to compare')
+        parser.add_argument('--rows', type=int, default=1_000_000,
+                            help='Samples of history written first (5 seconds apart)')
+        parser.add_argument('--batch', type=int, default=500, help='Samples per write (one flush / ingest batch)')
+        parser.add_argument('--repeat', type=int, default=20, help='Reads per range')
+
+    def handle(self, *args, **options):
+        stores = [s.strip() for s in options['stores'].split(',') if s.strip()]
+        unknown = set(stores) - set(STORES)
+        if unknown:
+            raise CommandError(f"Unknown store(s): {', '.join(sorted(unknown))}")
+        self.options = options
+
+        self.stdout.write(
+            f"{'store':>7} {'rows/s':>10} {'bytes/row':>10} {'latest ms':>10} "
+            + ' '.join(f"{name + ' ms':>9}" for name in WINDOWS)
+        )
+        for name in stores:
+            directory = tempfile.mkdtemp(prefix='bench-tsfile-')
+            try:
+                with bench_database(on_disk=True):
+                    if name == 'tsfile':
+                        from monitor.tsfile import TSFileStore
+                        store = TSFileStore(directory)
+                    else:
+                        store = OrmStore()
+                    self.run_store(name, store)
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    def samples(self, server, first, rows, batch):
+        """Collector-like history in batches: jittered 5 s ticks, RAM drifting, disk and swap steady."""
+        rng = random.Random(0)
+        ram = 35.0
+        for offset in range(0, rows, batch):
+            metrics = []
+            for i in range(offset, min(offset + batch, rows)):
+                if rng.random() < 0.2:
+                    ram = round(min(99.0, max(1.0, ram + rng.choice((-0.1, 0.1)))), 1)
+                metrics.append(SystemMetric(
+                    server=server, cpu_usage=round(rng.uniform(0, 100), 1), ram_usage=ram, disk_usage=42.0,
+                    swap_usage=1.5, timestamp=first + datetime.timedelta(seconds=5 * i + rng.uniform(0, 0.02)),
+                ))
+            yield metrics
+
+    def db_bytes(self):
+        connection = connections[router.db_for_write(SystemMetric)]
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA page_count')
+            pages = cursor.fetchone()[0]
+            # Deleted rows leave free pages behind until a VACUUM
+            cursor.execute('PRAGMA freelist_count')
+            pages -= cursor.fetchone()[0]
+            cursor.execute('PRAGMA page_size')
+            return pages * cursor.fetchone()[0]
+
+    def run_store(self, name, store):
+        opts = self.options
+        server = Server.objects.create(name='Localhost', ip_address='127.0.0.1')
+        end = timezone.now()
+        first = end - datetime.timedelta(seconds=5 * opts['rows'])
+        alias = router.db_for_write(SystemMetric)
+
+        before = self.db_bytes()
+        write_time = 0.0
+        for batch in self.samples(server, first, opts['rows'], opts['batch']):
+            start = time.perf_counter()
+            # One transaction per batch, like bulk_write
+            with transaction.atomic(using=alias):
+                store.write(batch)
+            write_time += time.perf_counter() - start
+
+        if name == 'chunks':
+            # Every closed window; the rows/s column still measures ingestion only
+            store.seal(server.id, end)
+
+        if name == 'tsfile':
+            size = sum(os.path.getsize(path) for _, path in store.segments(server.id))
+        else:
+            size = self.db_bytes() - before
+
+        latest = self.timed(lambda: store.latest([server.id], 20))
+        ranges = [self.timed(lambda seconds=seconds: store.series(server.id, end - datetime.timedelta(seconds=seconds), end))
+                  for seconds in WINDOWS.values()]
+        self.stdout.write(
+            f"{name:>7} {opts['rows'] / write_time:>10.0f} {size / opts['rows']:>10.1f} {latest:>10.2f} "
+            + ' '.join(f"{ms:>9.1f}" for ms in ranges)
+        )
+
+    def timed(self, read):
+        """Median of `repeat` calls, in milliseconds."""
+        latencies = []
+        for _ in range(self.options['repeat']):
+            start = time.perf_counter()
+            read()
+            latencies.append(time.perf_counter() - start)
+        return summarize(latencies)['p50']
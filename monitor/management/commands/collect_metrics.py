@@ -1,57 +1,323 @@
-import time
+import os
+import signal
+import platform
 import psutil
 import logging # <--- Import logging
-from django.core.management.base import BaseCommand
+from functools import partial
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
-from monitor.models import Server, SystemMetric
+from monitor.models import Server, SystemMetric, InterfaceMetric, MountMetric, DiskIOMetric, CpuMetric
+from monitor.buffer import MetricBuffer
+from monitor.scheduler import Scheduler
+from monitor import rollups
+from monitor import netio
+from monitor import disks
+from monitor import cpu as cpu_metrics
+from monitor import agent
+from monitor import poller
+from monitor.collectors import get_backend
 
 # Configure the logger
 logger = logging.getLogger('monitor')
 
+
+def _raise_system_exit(signum, frame):
+    # Turn SIGTERM into a normal exit so the 'finally' block flushes the buffer
+    raise SystemExit(0)
+
+
 class Command(BaseCommand):
     help = 'Collects system metrics and saves them to the Database'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Rows kept in memory before writing them in one transaction '
+                                 '(a tick adds one per NIC, mount, disk...)')
+        parser.add_argument('--flush-interval', type=float, default=30.0,
+                            help='Maximum seconds a sample waits in memory before being written')
+
+        # Per-metric sampling intervals (seconds, sub-second allowed)
+        parser.add_argument('--cpu-interval', type=float, default=1.0,
+                            help='Seconds between CPU samples (e.g. 0.25)')
+        parser.add_argument('--memory-interval', type=float, default=5.0,
+                            help='Seconds between RAM/Swap samples')
+        parser.add_argument('--disk-interval', type=float, default=30.0,
+                            help='Seconds between disk usage samples (every watched mount)')
+        parser.add_argument('--diskio-interval', type=float, default=5.0,
+                            help='Seconds between per-disk I/O samples (0 disables)')
+        parser.add_argument('--network-interval', type=float, default=5.0,
+                            help='Seconds between per-interface throughput samples (0 disables)')
+        parser.add_argument('--record-interval', type=float, default=5.0,
+                            help='Seconds between stored SystemMetric rows')
+        parser.add_argument('--compact-interval', type=float, default=60.0,
+                            help='Seconds between rollup compaction / retention passes (0 disables)')
+
+        # Agent mode: push every batch to a central dashboard, or serve it to be pulled (see monitor/agent.py)
+        parser.add_argument('--push', metavar='URL',
+                            help='Send samples to this ingest URL (e.g. https://dashboard/api/ingest/) instead of the local DB')
+        parser.add_argument('--serve', metavar='[HOST:]PORT',
+                            help='Keep samples in memory and serve them on GET /metrics for the dashboard to pull')
+        parser.add_argument('--token', default=os.environ.get('MONITOR_AGENT_TOKEN'),
+                            help='Agent token of this server (--push) or the dashboard pull token (--serve) '
+                                 '(default: $MONITOR_AGENT_TOKEN)')
+        parser.add_argument('--push-timeout', type=float, default=10.0,
+                            help='Seconds to wait for the dashboard on each push')
+
+        # Pull mode (dashboard side): also collect every active server running `--serve` (see monitor/poller.py)
+        parser.add_argument('--pull-interval', type=float, default=0.0,
+                            help='Seconds between pulls from remote agents (0 disables)')
+        parser.add_argument('--pull-concurrency', type=int, default=16,
+                            help='Agents pulled at the same time')
+        parser.add_argument('--pull-timeout', type=float, default=5.0,
+                            help='Socket timeout of each pull, in seconds')
+
     def handle(self, *args, **kwargs):
+        # Checked before anything starts (a bad value would otherwise surface as a
+        # ValueError from the scheduler, after the agent server is already up)
+        for name in ('cpu', 'memory', 'disk', 'record'):
+            if kwargs[f'{name}_interval'] <= 0:
+                raise CommandError(f"--{name}-interval must be greater than 0")
+        for name in ('diskio', 'network', 'compact', 'pull'):
+            if kwargs[f'{name}_interval'] < 0:
+                raise CommandError(f"--{name}-interval must be 0 (disabled) or greater")
+
         # We use logger.info instead of print
         logger.info("Starting metrics collection service...")
 
-        server, created = Server.objects.get_or_create(
-            name='Localhost',
-            defaults={'ip_address': '127.0.0.1', 'is_active': True}
-        )
+        if kwargs['push'] and kwargs['serve']:
+            raise CommandError("--push and --serve cannot be combined")
+        self.agent = bool(kwargs['push'] or kwargs['serve'])
+        self.agent_server = None
+        self.poller = None
+        if self.agent:
+            if not kwargs['token']:
+                raise CommandError("--push / --serve need --token (or MONITOR_AGENT_TOKEN)")
+            # No local database: the dashboard knows which server this is
+            self.server = Server(name=platform.node(), is_active=True)
+            buffer_options = {'batch_size': kwargs['batch_size'], 'flush_interval': kwargs['flush_interval']}
+            if kwargs['push']:
+                try:
+                    client = agent.AgentClient(kwargs['push'], kwargs['token'], timeout=kwargs['push_timeout'])
+                except ValueError as e:
+                    raise CommandError(str(e))
+                self.buffer = agent.PushBuffer(client, **buffer_options)
+                logger.info(f"Agent mode: pushing to {kwargs['push']}")
+            else:
+                self.buffer = agent.ServeBuffer(**buffer_options)
+                try:
+                    address = agent.parse_address(kwargs['serve'], settings.MONITOR_AGENT_PORT)
+                    self.agent_server = agent.AgentServer(address, kwargs['token'], self.buffer.drain)
+                except (ValueError, OSError) as e:
+                    raise CommandError(f"Cannot serve on {kwargs['serve']}: {e}")
+                self.agent_server.start()
+                logger.info(f"Agent mode: serving samples on {address[0]}:{address[1]}")
+            self.get_interfaces, self.get_devices, self.get_mounts = agent.interfaces, agent.devices, agent.mounts
+        else:
+            self.server, created = Server.objects.get_or_create(
+                name='Localhost',
+                defaults={'ip_address': '127.0.0.1', 'is_active': True}
+            )
 
-        # Determine the root path for disk usage based on OS
-        import platform
-        root_path = 'C:\\' if platform.system() == 'Windows' else '/'
-
-        while True:
-            if not server.is_active:
-                logger.warning(f"Server {server.name} is inactive. Skipping cycle.")
-                time.sleep(5)
-                continue
-
-            try:
-                cpu = psutil.cpu_percent(interval=1)
-                ram = psutil.virtual_memory().percent
-                swap = psutil.swap_memory().percent
-                
-                disk_usage_info = psutil.disk_usage(root_path)
-                disk = disk_usage_info.percent
-                
-                SystemMetric.objects.create(
-                    server=server,
-                    cpu_usage=cpu,
-                    ram_usage=ram,
-                    disk_usage=disk,
-                    swap_usage=swap,
-                    timestamp=timezone.now()
+            # Write-behind buffer: one bulk INSERT per batch instead of one per sample
+            self.buffer = MetricBuffer(
+                batch_size=kwargs['batch_size'],
+                flush_interval=kwargs['flush_interval'],
+            )
+            self.get_interfaces = partial(netio.get_interfaces, self.server)
+            self.get_devices = partial(disks.get_devices, self.server)
+            self.get_mounts = partial(disks.get_mounts, self.server)
+
+            if kwargs['pull_interval'] > 0:
+                if not settings.MONITOR_AGENT_PULL_TOKEN:
+                    raise CommandError("--pull-interval needs MONITOR_AGENT_PULL_TOKEN")
+                self.poller = poller.Poller(
+                    settings.MONITOR_AGENT_PULL_TOKEN,
+                    concurrency=kwargs['pull_concurrency'],
+                    timeout=kwargs['pull_timeout'],
+                    interval=kwargs['pull_interval'],
                 )
-                
-                # Debug message (optional, only shows if level=DEBUG)
-                # logger.debug(f"Metrics saved: CPU {cpu}%") 
+                # Rows of every agent pulled in a tick go in one transaction (kept and retried if the DB fails)
+                self.pull_buffer = MetricBuffer(batch_size=1, max_pending=50000)
+
+        # Determine the root path for disk usage based on OS
+        self.root_path = 'C:\\' if platform.system() == 'Windows' else '/'
+
+        # Latest value of each metric (CPU keeps every sample until the next record)
+        self.cpu_samples = []
+        self.latest = {}
+
+        # psutil or /proc depending on MONITOR_COLLECTOR_BACKEND
+        self.backend = get_backend()
+        # Prime the CPU baselines: the first call always returns 0.0
+        self.backend.cpu_percent()
+        self.backend.cpu_breakdown()
+        # Per-core / iowait / steal ticks averaged into each record
+        self.cpu_detail = cpu_metrics.CpuAccumulator()
+        self.sample_memory()
+        self.latest['disk'] = psutil.disk_usage(self.root_path).percent
+
+        # Per-NIC rates come from counter deltas: the first read is only a baseline
+        self.net_rates = netio.RateSampler()
+        self.net_rates.sample()
+        self.interfaces = {}
+        self.disk_io = disks.IOSampler()
+        self.disk_io.sample()
+        self.devices = {}
+        self.mounts = {}
+
+        scheduler = Scheduler()
+        scheduler.every(kwargs['cpu_interval'], 'cpu', self.sample_cpu)
+        scheduler.every(kwargs['memory_interval'], 'memory', self.sample_memory)
+        scheduler.every(kwargs['disk_interval'], 'disk', self.sample_disk)
+        scheduler.every(kwargs['record_interval'], 'record', self.record)
+        if kwargs['network_interval'] > 0:
+            scheduler.every(kwargs['network_interval'], 'network', self.sample_network)
+        if kwargs['diskio_interval'] > 0:
+            scheduler.every(kwargs['diskio_interval'], 'diskio', self.sample_disk_io)
+        scheduler.every(1.0, 'flush', self.flush_if_due)
+        # Agents leave compaction and the inventory to the dashboard
+        if kwargs['compact_interval'] > 0 and not self.agent:
+            scheduler.every(kwargs['compact_interval'], 'compact', self.compact)
+        if not self.agent:
+            # Pick up changes made from the web UI (e.g. server disabled)
+            scheduler.every(30.0, 'inventory', self.refresh_server)
+        if self.poller:
+            scheduler.every(kwargs['pull_interval'], 'pull', self.pull)
+
+        # Flush pending samples when the launcher (or systemd/docker) stops us
+        signal.signal(signal.SIGTERM, _raise_system_exit)
+
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            saved = self.buffer.flush()
+            logger.info(f"Metrics collector stopped. Flushed {saved} pending samples. Ticks: {scheduler.stats()}")
+            if self.poller:
+                self.pull_buffer.flush()
+                self.poller.close()
+                logger.info(f"Pulls: {self.poller.counts}")
+            if self.agent_server:
+                self.agent_server.shutdown()
+
+    def sample_cpu(self):
+        # Non-blocking: usage since the previous call, i.e. over the last tick
+        self.cpu_samples.append(self.backend.cpu_percent())
+        self.cpu_detail.add(self.backend.cpu_breakdown())
+
+    def sample_memory(self):
+        # RAM and swap in one reading (a single /proc/meminfo read with procfs)
+        self.latest.update(self.backend.memory())
+
+    def sample_disk(self):
+        self.latest['disk'] = psutil.disk_usage(self.root_path).percent
+        if not self.server.is_active:
+            return
+
+        # Every watched mount, one row each (see monitor/disks.py)
+        entries = disks.mounts()
+        if not entries:
+            return
+        if any(e['path'] not in self.mounts for e in entries):
+            self.mounts.update(self.get_mounts(entries))
+
+        timestamp = timezone.now()
+        self.buffer.add(*(
+            MountMetric(mount=self.mounts[e['path']], timestamp=timestamp,
+                        used=e['used'], total=e['total'], percent=e['percent'])
+            for e in entries
+        ))
+
+    def sample_disk_io(self):
+        rates = self.disk_io.sample()
+        if not rates or not self.server.is_active:
+            return
+        if rates.keys() - self.devices.keys():
+            self.devices.update(self.get_devices(list(rates)))
+
+        timestamp = timezone.now()
+        self.buffer.add(*(
+            DiskIOMetric(device=self.devices[name], timestamp=timestamp, **values)
+            for name, values in rates.items()
+        ))
+
+    def sample_network(self):
+        rates = self.net_rates.sample()
+        if not rates or not self.server.is_active:
+            return
+        if rates.keys() - self.interfaces.keys():
+            self.interfaces.update(self.get_interfaces(list(rates)))
+
+        timestamp = timezone.now()
+        self.buffer.add(*(
+            InterfaceMetric(interface=self.interfaces[nic], timestamp=timestamp, **values)
+            for nic, values in rates.items()
+        ))
+
+    def record(self):
+        if not self.server.is_active:
+            logger.warning(f"Server {self.server.name} is inactive. Skipping cycle.")
+            self.cpu_samples.clear()
+            self.cpu_detail.reset()
+            return
+
+        # Average of the CPU ticks since the last record (no sample is wasted)
+        if self.cpu_samples:
+            cpu = round(sum(self.cpu_samples) / len(self.cpu_samples), 1)
+            self.cpu_samples.clear()
+        else:
+            cpu = self.backend.cpu_percent()
+
+        timestamp = timezone.now()
+        rows = [SystemMetric(
+            server=self.server,
+            cpu_usage=cpu,
+            ram_usage=self.latest['ram'],
+            disk_usage=self.latest['disk'],
+            swap_usage=self.latest['swap'],
+            timestamp=timestamp
+        )]
+
+        # Per-core detail of the same period, packed into one row
+        detail = self.cpu_detail.pop()
+        if detail is not None:
+            load_1, load_5, load_15 = self.backend.load_average()
+            rows.append(CpuMetric(
+                server=self.server,
+                timestamp=timestamp,
+                load_1=round(load_1, 2), load_5=round(load_5, 2), load_15=round(load_15, 2),
+                iowait=detail['iowait'],
+                steal=detail['steal'],
+                cores=cpu_metrics.pack_cores(detail['cores']),
+            ))
+        self.buffer.add(*rows)
+
+        # Debug message (optional, only shows if level=DEBUG)
+        # logger.debug(f"Metrics saved: CPU {cpu}%")
+
+    def flush_if_due(self):
+        if self.buffer.is_due():
+            self.buffer.flush()
+
+    def compact(self):
+        # Write pending rows first so the rollups include them
+        self.buffer.flush()
+        rollups.compact()
+        rollups.seal()
+        rollups.prune()
+        netio.prune()
+        disks.prune()
+        cpu_metrics.prune()
 
-            except Exception as e:
-                # logger.error automatically saves the error traceback
-                logger.error(f"Error collecting metrics: {e}")
+    def pull(self):
+        rows = self.poller.tick(poller.targets(exclude_id=self.server.id))
+        if rows:
+            self.pull_buffer.add(*rows)
+        else:
+            # Retry a batch the DB refused on a previous tick
+            self.pull_buffer.flush()
 
-            time.sleep(5)
\ No newline at end of file
+    def refresh_server(self):
+        self.server.refresh_from_db(fields=['is_active'])
@@ -0,0 +1,29 @@
+import logging
+from django.core.management.base import BaseCommand
+from monitor import rollups
+
+logger = logging.getLogger('monitor')
+
+
+class Command(BaseCommand):
+    help = ('Compacts SystemMetric rows into 1-minute/1-hour/1-day rollups, seals old rows into '
+            'compressed chunks and applies the retention policy')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-prune', action='store_true',
+                            help='Only build rollups, do not delete old rows')
+
+    def handle(self, *args, **options):
+        written = rollups.compact()
+        for resolution, count in written.items():
+            self.stdout.write(f"{rollups.TIER_NAMES[resolution]:>8}: {count} buckets written")
+
+        samples, chunks = rollups.seal()
+        self.stdout.write(f"{'sealed':>8}: {samples} rows into {chunks} chunks")
+
+        if not options['no_prune']:
+            deleted = rollups.prune()
+            for tier, count in deleted.items():
+                self.stdout.write(f"{tier:>8}: {count} rows pruned")
+
+        logger.info(f"Metrics compaction done: {written}")
@@ -0,0 +1,55 @@
+import logging
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from monitor import export
+from monitor.timeutils import parse_time
+
+logger = logging.getLogger('monitor')
+
+
+class Command(BaseCommand):
+    help = 'Exports SystemMetric rows of a server/time range as CSV, NDJSON, Arrow IPC or Parquet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', help='Server name (default: every server)')
+        parser.add_argument('--start', help='ISO 8601 or epoch seconds')
+        parser.add_argument('--end', help='ISO 8601 or epoch seconds')
+        parser.add_argument('--format', dest='output', choices=list(export.STREAMS), default='parquet',
+                            help='Output format (arrow and parquet need pyarrow)')
+        parser.add_argument('--output', dest='path', default='-',
+                            help='File to write (default: stdout)')
+
+    def handle(self, *args, **options):
+        try:
+            export.check_output(options['output'])
+        except export.ExportError as e:
+            raise CommandError(str(e))
+
+        bounds = {}
+        for name in ('start', 'end'):
+            if options[name]:
+                bounds[name] = parse_time(options[name])
+                if bounds[name] is None:
+                    raise CommandError(f'--{name} must be ISO 8601 or epoch seconds')
+
+        rows = export.metric_rows(options['server'], bounds.get('start'), bounds.get('end'))
+        blocks = export.STREAMS[options['output']](rows)
+        binary = options['output'] in export.COLUMNAR
+
+        if options['path'] == '-':
+            target = sys.stdout.buffer if binary else sys.stdout
+            written = self._write(blocks, target)
+        else:
+            with open(options['path'], 'wb' if binary else 'w', newline='' if not binary else None) as target:
+                written = self._write(blocks, target)
+            self.stderr.write(f"{written} bytes written to {options['path']}")
+
+        logger.info(f"Metrics export ({options['output']}): {written} bytes")
+
+    def _write(self, blocks, target):
+        written = 0
+        for block in blocks:
+            target.write(block)
+            written += len(block)
+        target.flush()
+        return written
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-17 22:53
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0003_remove_systemmetric_disk_free_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='systemmetric',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 6.0.1 on 2026-10-17 22:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0004_alter_systemmetric_timestamp'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.PositiveIntegerField(choices=[(60, '1 minute'), (3600, '1 hour'), (86400, '1 day')], help_text='Tamaño del intervalo en segundos')),
+                ('bucket', models.DateTimeField(help_text='Inicio del intervalo')),
+                ('samples', models.PositiveIntegerField(default=0, help_text='Muestras originales agregadas')),
+                ('cpu_min', models.FloatField()),
+                ('cpu_max', models.FloatField()),
+                ('cpu_avg', models.FloatField()),
+                ('ram_min', models.FloatField()),
+                ('ram_max', models.FloatField()),
+                ('ram_avg', models.FloatField()),
+                ('disk_min', models.FloatField()),
+                ('disk_max', models.FloatField()),
+                ('disk_avg', models.FloatField()),
+                ('swap_min', models.FloatField(blank=True, null=True)),
+                ('swap_max', models.FloatField(blank=True, null=True)),
+                ('swap_avg', models.FloatField(blank=True, null=True)),
+                ('server', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='monitor.server')),
+            ],
+            options={
+                'ordering': ['-bucket'],
+                'constraints': [models.UniqueConstraint(fields=('server', 'resolution', 'bucket'), name='unique_rollup_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-17 22:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0005_metricrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='systemmetric',
+            index=models.Index(fields=['server', 'timestamp'], name='metric_server_ts_idx'),
+        ),
+    ]
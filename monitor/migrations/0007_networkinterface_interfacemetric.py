@@ -0,0 +1,47 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0006_systemmetric_server_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NetworkInterface',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Nombre de la interfaz (ej: eth0)', max_length=64)),
+                ('server', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='interfaces', to='monitor.server')),
+            ],
+            options={
+                'ordering': ['name'],
+                'constraints': [models.UniqueConstraint(fields=('server', 'name'), name='unique_server_interface')],
+            },
+        ),
+        migrations.CreateModel(
+            name='InterfaceMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('rx_bytes', models.PositiveBigIntegerField(help_text='Bytes recibidos por segundo')),
+                ('tx_bytes', models.PositiveBigIntegerField(help_text='Bytes enviados por segundo')),
+                ('rx_packets', models.PositiveIntegerField(help_text='Paquetes recibidos por segundo')),
+                ('tx_packets', models.PositiveIntegerField(help_text='Paquetes enviados por segundo')),
+                ('rx_errors', models.FloatField(default=0)),
+                ('tx_errors', models.FloatField(default=0)),
+                ('rx_drops', models.FloatField(default=0)),
+                ('tx_drops', models.FloatField(default=0)),
+                ('interface', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metrics', to='monitor.networkinterface')),
+            ],
+            options={
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['interface', 'timestamp'], name='ifmetric_iface_ts_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0007_networkinterface_interfacemetric'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlockDevice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64)),
+                ('server', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='block_devices', to='monitor.server')),
+            ],
+            options={
+                'ordering': ['name'],
+                'constraints': [models.UniqueConstraint(fields=('server', 'name'), name='unique_server_block_device')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Mount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(help_text='Punto de montaje (ej: /data)', max_length=255)),
+                ('device', models.CharField(blank=True, max_length=255)),
+                ('fstype', models.CharField(blank=True, max_length=32)),
+                ('server', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mounts', to='monitor.server')),
+            ],
+            options={
+                'ordering': ['path'],
+                'constraints': [models.UniqueConstraint(fields=('server', 'path'), name='unique_server_mount')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DiskIOMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('read_bytes', models.PositiveBigIntegerField(help_text='Bytes leídos por segundo')),
+                ('write_bytes', models.PositiveBigIntegerField(help_text='Bytes escritos por segundo')),
+                ('read_iops', models.FloatField(help_text='Lecturas por segundo')),
+                ('write_iops', models.FloatField(help_text='Escrituras por segundo')),
+                ('read_latency', models.FloatField(blank=True, help_text='ms por lectura', null=True)),
+                ('write_latency', models.FloatField(blank=True, help_text='ms por escritura', null=True)),
+                ('busy', models.FloatField(blank=True, help_text='Tiempo ocupado en %', null=True)),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metrics', to='monitor.blockdevice')),
+            ],
+            options={
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['device', 'timestamp'], name='diskio_device_ts_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MountMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('used', models.PositiveBigIntegerField(help_text='Bytes usados')),
+                ('total', models.PositiveBigIntegerField(help_text='Bytes totales')),
+                ('percent', models.FloatField(help_text='Uso en %')),
+                ('mount', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metrics', to='monitor.mount')),
+            ],
+            options={
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['mount', 'timestamp'], name='mountmetric_mount_ts_idx')],
+            },
+        ),
+    ]
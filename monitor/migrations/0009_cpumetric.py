@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:50
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0008_mount_mountmetric_blockdevice_diskiometric'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CpuMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('load_1', models.FloatField(help_text='Carga media 1 minuto')),
+                ('load_5', models.FloatField(help_text='Carga media 5 minutos')),
+                ('load_15', models.FloatField(help_text='Carga media 15 minutos')),
+                ('iowait', models.FloatField(default=0, help_text='Espera de E/S en %')),
+                ('steal', models.FloatField(default=0, help_text='Tiempo robado por el hipervisor en %')),
+                ('cores', models.BinaryField(help_text='Uso por núcleo, empaquetado')),
+                ('server', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cpu_metrics', to='monitor.server')),
+            ],
+            options={
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['server', 'timestamp'], name='cpumetric_server_ts_idx')],
+            },
+        ),
+    ]
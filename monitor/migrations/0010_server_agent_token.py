@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 00:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0009_cpumetric'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='server',
+            name='agent_token',
+            field=models.CharField(blank=True, editable=False, help_text='Hash del token del agente', max_length=64, null=True, unique=True),
+        ),
+    ]
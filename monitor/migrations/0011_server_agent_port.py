@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-18 00:40
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0010_server_agent_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='server',
+            name='agent_port',
+            field=models.PositiveIntegerField(blank=True, help_text='Puerto del agente', null=True, validators=[django.core.validators.MaxValueValidator(65535)]),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-18 01:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0011_server_agent_port'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField(help_text='Inicio de la ventana')),
+                ('end', models.DateTimeField(help_text='Última muestra de la ventana')),
+                ('samples', models.PositiveIntegerField(help_text='Muestras en el bloque')),
+                ('data', models.BinaryField(help_text='Muestras comprimidas')),
+                ('server', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='monitor.server')),
+            ],
+            options={
+                'ordering': ['-start'],
+                'constraints': [models.UniqueConstraint(fields=('server', 'start'), name='unique_chunk_window')],
+            },
+        ),
+    ]
@@ -1,5 +1,7 @@
 # monitor/models.py
+from django.core.validators import MaxValueValidator
 from django.db import models
+from django.utils import timezone
 
 class Server(models.Model):
     name = models.CharField(max_length=100, help_text="Nombre del servidor (ej: Localhost)")
@@ -7,10 +9,29 @@ class Server(models.Model):
     os_info = models.CharField(max_length=255, blank=True, null=True, help_text="SO y Versión")
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Port of the agent the collector pulls from (empty = MONITOR_AGENT_PORT, see monitor/poller.py)
+    agent_port = models.PositiveIntegerField(blank=True, null=True, validators=[MaxValueValidator(65535)],
+                                             help_text="Puerto del agente")
+    # SHA-256 of the token a remote agent pushes metrics with (see monitor/ingest.py)
+    agent_token = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False,
+                                   help_text="Hash del token del agente")
 
     def __str__(self):
         return f"{self.name} ({self.ip_address})"
 
+class SystemMetricQuerySet(models.QuerySet):
+    def for_server(self, name):
+        """
+        Metrics of the server(s) called `name`.
+        Resolves the name first and filters by server_id (no JOIN), so the
+        (server, timestamp) index can serve both the filter and the ordering.
+        """
+        ids = list(Server.objects.filter(name=name).values_list('id', flat=True))
+        if len(ids) == 1:
+            return self.filter(server_id=ids[0])
+        return self.filter(server_id__in=ids)
+
+
 class SystemMetric(models.Model):
     server = models.ForeignKey(Server, on_delete=models.CASCADE, related_name='metrics')
     
@@ -25,11 +46,220 @@ class SystemMetric(models.Model):
     # Virtual Memory (Swap) usage in %
     swap_usage = models.FloatField(null=True, blank=True, help_text="Uso de Memoria Virtual (Swap) en %")
     
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set by the collector when sampling (not on insert): rows are written in batches
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    objects = SystemMetricQuerySet.as_manager()
 
     class Meta:
         # Default ordering: most recent first
         ordering = ['-timestamp']
+        indexes = [
+            # Per-server "latest N" and range queries (read backwards for -timestamp)
+            models.Index(fields=['server', 'timestamp'], name='metric_server_ts_idx'),
+        ]
+
+    def __str__(self):
+        return f"Metric {self.server.name} - {self.timestamp.strftime('%H:%M:%S')}"
+
+class MetricChunk(models.Model):
+    """
+    Closed window of raw SystemMetric samples of one server, compressed
+    (delta-of-delta timestamps, XOR floats, see monitor/gorilla.py). The
+    compactor seals old rows into chunks; the metric store reads both.
+    """
+    server = models.ForeignKey(Server, on_delete=models.CASCADE, related_name='chunks')
+    start = models.DateTimeField(help_text="Inicio de la ventana")
+    end = models.DateTimeField(help_text="Última muestra de la ventana")
+    samples = models.PositiveIntegerField(help_text="Muestras en el bloque")
+    data = models.BinaryField(help_text="Muestras comprimidas")
+
+    class Meta:
+        ordering = ['-start']
+        constraints = [
+            models.UniqueConstraint(fields=['server', 'start'], name='unique_chunk_window'),
+        ]
+
+    def __str__(self):
+        return f"Chunk {self.server.name} - {self.start:%Y-%m-%d %H:%M} ({self.samples})"
+
+class MetricRollup(models.Model):
+    """Downsampled SystemMetric: min/max/avg per server for 1-minute, 1-hour and 1-day buckets."""
+    MINUTE = 60
+    HOUR = 3600
+    DAY = 86400
+    RESOLUTION_CHOICES = [
+        (MINUTE, '1 minute'),
+        (HOUR, '1 hour'),
+        (DAY, '1 day'),
+    ]
+
+    server = models.ForeignKey(Server, on_delete=models.CASCADE, related_name='rollups')
+    resolution = models.PositiveIntegerField(choices=RESOLUTION_CHOICES, help_text="Tamaño del intervalo en segundos")
+    bucket = models.DateTimeField(help_text="Inicio del intervalo")
+    samples = models.PositiveIntegerField(default=0, help_text="Muestras originales agregadas")
+
+    cpu_min = models.FloatField()
+    cpu_max = models.FloatField()
+    cpu_avg = models.FloatField()
+    ram_min = models.FloatField()
+    ram_max = models.FloatField()
+    ram_avg = models.FloatField()
+    disk_min = models.FloatField()
+    disk_max = models.FloatField()
+    disk_avg = models.FloatField()
+    swap_min = models.FloatField(null=True, blank=True)
+    swap_max = models.FloatField(null=True, blank=True)
+    swap_avg = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-bucket']
+        constraints = [
+            models.UniqueConstraint(fields=['server', 'resolution', 'bucket'], name='unique_rollup_bucket'),
+        ]
+
+    def __str__(self):
+        return f"Rollup {self.server.name} {self.get_resolution_display()} - {self.bucket:%Y-%m-%d %H:%M}"
+
+class NetworkInterface(models.Model):
+    """A NIC of a server. Metrics reference it by id instead of repeating the name."""
+    server = models.ForeignKey(Server, on_delete=models.CASCADE, related_name='interfaces')
+    name = models.CharField(max_length=64, help_text="Nombre de la interfaz (ej: eth0)")
+
+    class Meta:
+        ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=['server', 'name'], name='unique_server_interface'),
+        ]
+
+    def __str__(self):
+        return f"{self.server.name}:{self.name}"
+
+
+class InterfaceMetric(models.Model):
+    """
+    Throughput of one interface, per second, averaged since the previous sample.
+    Byte and packet rates are whole numbers (SQLite stores small integers in
+    1-4 bytes instead of 8 for a REAL); errors and drops keep their fractions.
+    """
+    interface = models.ForeignKey(NetworkInterface, on_delete=models.CASCADE, related_name='metrics')
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    rx_bytes = models.PositiveBigIntegerField(help_text="Bytes recibidos por segundo")
+    tx_bytes = models.PositiveBigIntegerField(help_text="Bytes enviados por segundo")
+    rx_packets = models.PositiveIntegerField(help_text="Paquetes recibidos por segundo")
+    tx_packets = models.PositiveIntegerField(help_text="Paquetes enviados por segundo")
+    rx_errors = models.FloatField(default=0)
+    tx_errors = models.FloatField(default=0)
+    rx_drops = models.FloatField(default=0)
+    tx_drops = models.FloatField(default=0)
+
+    class Meta:
+        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['interface', 'timestamp'], name='ifmetric_iface_ts_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.interface} - {self.timestamp.strftime('%H:%M:%S')}"
+
+
+class Mount(models.Model):
+    """A mounted filesystem of a server (a new mount is a new row, not a new column)."""
+    server = models.ForeignKey(Server, on_delete=models.CASCADE, related_name='mounts')
+    path = models.CharField(max_length=255, help_text="Punto de montaje (ej: /data)")
+    device = models.CharField(max_length=255, blank=True)
+    fstype = models.CharField(max_length=32, blank=True)
+
+    class Meta:
+        ordering = ['path']
+        constraints = [
+            models.UniqueConstraint(fields=['server', 'path'], name='unique_server_mount'),
+        ]
+
+    def __str__(self):
+        return f"{self.server.name}:{self.path}"
+
+
+class MountMetric(models.Model):
+    """Space used on a mount at `timestamp`."""
+    mount = models.ForeignKey(Mount, on_delete=models.CASCADE, related_name='metrics')
+    timestamp = models.DateTimeField(default=timezone.now)
+    used = models.PositiveBigIntegerField(help_text="Bytes usados")
+    total = models.PositiveBigIntegerField(help_text="Bytes totales")
+    percent = models.FloatField(help_text="Uso en %")
+
+    class Meta:
+        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['mount', 'timestamp'], name='mountmetric_mount_ts_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.mount} - {self.timestamp.strftime('%H:%M:%S')}"
+
+
+class BlockDevice(models.Model):
+    """A disk of a server (sda, nvme0n1...), as named by disk_io_counters()."""
+    server = models.ForeignKey(Server, on_delete=models.CASCADE, related_name='block_devices')
+    name = models.CharField(max_length=64)
+
+    class Meta:
+        ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=['server', 'name'], name='unique_server_block_device'),
+        ]
+
+    def __str__(self):
+        return f"{self.server.name}:{self.name}"
+
+
+class DiskIOMetric(models.Model):
+    """
+    I/O of one disk since the previous sample: bytes and operations per second,
+    average latency per operation and % of time busy (Linux/FreeBSD only).
+    """
+    device = models.ForeignKey(BlockDevice, on_delete=models.CASCADE, related_name='metrics')
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    read_bytes = models.PositiveBigIntegerField(help_text="Bytes leídos por segundo")
+    write_bytes = models.PositiveBigIntegerField(help_text="Bytes escritos por segundo")
+    read_iops = models.FloatField(help_text="Lecturas por segundo")
+    write_iops = models.FloatField(help_text="Escrituras por segundo")
+    read_latency = models.FloatField(null=True, blank=True, help_text="ms por lectura")
+    write_latency = models.FloatField(null=True, blank=True, help_text="ms por escritura")
+    busy = models.FloatField(null=True, blank=True, help_text="Tiempo ocupado en %")
+
+    class Meta:
+        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['device', 'timestamp'], name='diskio_device_ts_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.device} - {self.timestamp.strftime('%H:%M:%S')}"
+
+
+class CpuMetric(models.Model):
+    """
+    CPU detail of one sample: load averages, iowait/steal and every core.
+    `cores` is packed (one byte per core, see monitor/cpu.py) instead of one
+    row per core: a 64-core sample is 64 bytes in a single row.
+    """
+    server = models.ForeignKey(Server, on_delete=models.CASCADE, related_name='cpu_metrics')
+    timestamp = models.DateTimeField(default=timezone.now)
+    load_1 = models.FloatField(help_text="Carga media 1 minuto")
+    load_5 = models.FloatField(help_text="Carga media 5 minutos")
+    load_15 = models.FloatField(help_text="Carga media 15 minutos")
+    iowait = models.FloatField(default=0, help_text="Espera de E/S en %")
+    steal = models.FloatField(default=0, help_text="Tiempo robado por el hipervisor en %")
+    cores = models.BinaryField(help_text="Uso por núcleo, empaquetado")
+
+    class Meta:
+        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['server', 'timestamp'], name='cpumetric_server_ts_idx'),
+        ]
 
     def __str__(self):
-        return f"Metric {self.server.name} - {self.timestamp.strftime('%H:%M:%S')}"
\ No newline at end of file
+        return f"CPU {self.server.name} - {self.timestamp.strftime('%H:%M:%S')}"
@@ -0,0 +1,124 @@
+# monitor/netio.py
+"""
+Per-interface network throughput.
+
+The collector reads psutil.net_io_counters(pernic=True) on its own schedule and
+turns the cumulative counters into per-second rates (bytes, packets, errors,
+drops) from the previous reading. Rates are stored per interface in
+InterfaceMetric; series() serves the chart endpoint, LTTB downsampled.
+"""
+import datetime
+import math
+import time
+
+import psutil
+from django.conf import settings
+from django.utils import timezone
+
+from .counters import CounterDeltas
+from .lttb import downsample
+from .models import InterfaceMetric, NetworkInterface
+
+# (stored field, psutil counter)
+COUNTERS = (
+    ('rx_bytes', 'bytes_recv'),
+    ('tx_bytes', 'bytes_sent'),
+    ('rx_packets', 'packets_recv'),
+    ('tx_packets', 'packets_sent'),
+    ('rx_errors', 'errin'),
+    ('tx_errors', 'errout'),
+    ('rx_drops', 'dropin'),
+    ('tx_drops', 'dropout'),
+)
+# Stored as whole numbers (see InterfaceMetric)
+INTEGER_FIELDS = ('rx_bytes', 'tx_bytes', 'rx_packets', 'tx_packets')
+FIELDS = tuple(field for field, _ in COUNTERS)
+
+
+class RateSampler:
+    """Turns cumulative per-NIC counters into per-second rates between two reads."""
+
+    def __init__(self, reader=None, clock=time.monotonic):
+        reader = reader or (lambda: psutil.net_io_counters(pernic=True))
+        self.deltas = CounterDeltas(reader, [counter for _, counter in COUNTERS], clock)
+
+    def sample(self):
+        """Returns {nic: {field: rate}} for every NIC also seen in the previous read."""
+        rates = {}
+        for nic, (elapsed, deltas) in self.deltas.sample().items():
+            rates[nic] = {
+                field: round(deltas[counter] / elapsed) if field in INTEGER_FIELDS else round(deltas[counter] / elapsed, 2)
+                for field, counter in COUNTERS
+            }
+        return rates
+
+
+def get_interfaces(server, names):
+    """{name: NetworkInterface} for `names`, created on first sight."""
+    existing = {i.name: i for i in NetworkInterface.objects.filter(server=server, name__in=names)}
+    for name in set(names) - existing.keys():
+        existing[name], _ = NetworkInterface.objects.get_or_create(server=server, name=name)
+    return existing
+
+
+def prune(now=None):
+    """Deletes rows older than MONITOR_RETENTION_DAYS['network'] (0 = keep forever)."""
+    days = getattr(settings, 'MONITOR_RETENTION_DAYS', {}).get('network', 0)
+    if not days:
+        return 0
+    cutoff = (now or timezone.now()) - datetime.timedelta(days=days)
+    count, _ = InterfaceMetric.objects.filter(timestamp__lt=cutoff).delete()
+    return count
+
+
+def _demo_series(start, end, points):
+    step = max((end - start).total_seconds() / max(points, 1), 1)
+    t = start.timestamp()
+    rows = []
+    while t <= end.timestamp() and len(rows) < points:
+        rx = 5e6 + 4e6 * math.sin(t * 0.05)
+        tx = 1e6 + 8e5 * math.cos(t * 0.03)
+        rows.append((datetime.datetime.fromtimestamp(t, tz=datetime.timezone.utc),
+                     round(rx), round(tx), round(rx / 1200), round(tx / 900), 0.0, 0.0, 0.0, 0.0))
+        t += step
+    return rows
+
+
+def list_interfaces(server_name):
+    if settings.DEMO_MODE:
+        return ['eth0']
+    return list(NetworkInterface.objects
+                .filter(server__name=server_name)
+                .values_list('name', flat=True))
+
+
+def series(server_name, interface, start, end, max_points):
+    """
+    Rates of one interface between `start` and `end`, LTTB downsampled to
+    about `max_points` (bytes and packets drive the point selection).
+    """
+    if settings.DEMO_MODE:
+        rows = _demo_series(start, end, max_points)
+    else:
+        # Resolved to interface ids first: no JOIN, the (interface, timestamp) index serves the range
+        interface_ids = list(NetworkInterface.objects
+                             .filter(server__name=server_name, name=interface)
+                             .values_list('id', flat=True))
+        rows = list(InterfaceMetric.objects
+                    .filter(interface_id__in=interface_ids, timestamp__gte=start, timestamp__lte=end)
+                    .order_by('timestamp')
+                    .values_list('timestamp', *FIELDS)
+                    .iterator(chunk_size=2000))
+
+    timestamps = [row[0].timestamp() for row in rows]
+    columns = {field: [row[i + 1] for row in rows] for i, field in enumerate(FIELDS)}
+    keep = downsample(timestamps, [columns['rx_bytes'], columns['tx_bytes']], max_points)
+
+    # Show the date as well when the range spans more than one day
+    fmt = '%H:%M:%S' if (end - start).total_seconds() <= 86400 else '%d/%m %H:%M'
+    return {
+        'interface': interface,
+        'labels': [rows[i][0].strftime(fmt) for i in keep],
+        'timestamps': [int(timestamps[i] * 1000) for i in keep],  # Epoch milliseconds
+        **{field: [values[i] for i in keep] for field, values in columns.items()},
+    }
@@ -0,0 +1,167 @@
+# monitor/poller.py
+"""
+Pull collection from remote agents.
+
+With `collect_metrics --pull-interval N`, the collector also fetches the samples
+of every active Server that runs an agent in serve mode (GET /metrics on
+ip_address:agent_port, see monitor/agent.py). Fetches run in a bounded thread
+pool and never block the collector's scheduler: each tick harvests the pulls
+that finished since the previous one, writes all their rows in one transaction,
+then starts the pulls that are due. Every request has a socket timeout, and a
+host that fails is retried with exponential backoff instead of every tick.
+
+Each pull acknowledges the "seq" of the last batch harvested from that host
+(?ack=<seq>): the agent keeps a batch until then, so a pull that failed
+midway loses nothing (a batch whose ack never arrived may be sent twice).
+"""
+import http.client
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.conf import settings
+
+from . import ingest
+from .models import Server
+
+logger = logging.getLogger('monitor')
+
+DEFAULT_PORT = 9100
+
+
+class PullError(Exception):
+    pass
+
+
+# What makes a pull fail (and the host back off) instead of stopping the collector
+PULL_ERRORS = (OSError, http.client.HTTPException, ingest.IngestError, PullError)
+
+
+class HostState:
+    """Consecutive failures of one host and when to try it again."""
+
+    __slots__ = ('failures', 'retry_at', 'error')
+
+    def __init__(self):
+        self.failures = 0
+        self.retry_at = 0.0
+        self.error = ''
+
+
+def targets(exclude_id=None):
+    """
+    Servers to pull: active, with an address, and not push agents (those have
+    a token and report by themselves). `exclude_id` is the local server.
+    """
+    servers = Server.objects.filter(is_active=True, ip_address__isnull=False, agent_token__isnull=True)
+    if exclude_id is not None:
+        servers = servers.exclude(id=exclude_id)
+    return list(servers)
+
+
+class Poller:
+    def __init__(self, token, concurrency=16, timeout=5.0, interval=10.0, max_backoff=300.0,
+                 port=None, fetch=None, clock=time.monotonic):
+        self.token = token
+        self.timeout = timeout
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.port = port or getattr(settings, 'MONITOR_AGENT_PORT', DEFAULT_PORT)
+        self.fetch = fetch or self.fetch_http
+        self.clock = clock
+        self.pool = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix='monitor-pull')
+        # server id -> (server, future) of the pulls still running
+        self.in_flight = {}
+        self.hosts = {}
+        # server id -> "seq" of the last batch harvested from it (sent back as ?ack=)
+        self.acks = {}
+        self.counts = {'pulled': 0, 'failed': 0, 'backoff': 0, 'busy': 0, 'rows': 0}
+
+    def fetch_http(self, server, ack=None):
+        """Batch payload of one agent (runs in a pool thread: no DB access here)."""
+        port = server.agent_port or self.port
+        conn = http.client.HTTPConnection(server.ip_address, port, timeout=self.timeout)
+        path = '/metrics?' + urlencode({'ack': ack}) if ack else '/metrics'
+        try:
+            conn.request('GET', path, headers={
+                'Authorization': f'Bearer {self.token}',
+                'Accept-Encoding': 'gzip',
+            })
+            response = conn.getresponse()
+            body = response.read(ingest.max_bytes() + 1)
+            if response.status != 200:
+                raise PullError(f"HTTP {response.status}")
+            if len(body) > ingest.max_bytes():
+                raise PullError("Batch too large")
+            return ingest.loads(body, response.getheader('Content-Encoding', ''))
+        finally:
+            conn.close()
+
+    def tick(self, servers):
+        """Unsaved rows of the pulls finished since the last tick; starts the due ones."""
+        rows = self.harvest()
+        self.submit(servers)
+        return rows
+
+    def submit(self, servers):
+        now = self.clock()
+        for server in servers:
+            if server.id in self.in_flight:
+                # Still waiting on the previous pull (slow host): never queue two
+                self.counts['busy'] += 1
+                continue
+            state = self.hosts.get(server.id)
+            if state is not None and state.retry_at > now:
+                self.counts['backoff'] += 1
+                continue
+            self.in_flight[server.id] = (server, self.pool.submit(self.fetch, server, self.acks.get(server.id)))
+
+    def harvest(self):
+        rows = []
+        for server_id, (server, future) in list(self.in_flight.items()):
+            if not future.done():
+                continue
+            del self.in_flight[server_id]
+            try:
+                payload = future.result()
+            except PULL_ERRORS as e:
+                self.failed(server, e)
+                continue
+            # Acked on the next pull: the rows are ours now (the collector's buffer
+            # retries failed writes), or invalid and dropped like a rejected push
+            if isinstance(payload.get('seq'), str):
+                self.acks[server.id] = payload['seq']
+            try:
+                # Parents (interfaces, mounts...) are resolved here, in the collector thread
+                objs = ingest.instances(server, payload)
+            except PULL_ERRORS as e:
+                self.failed(server, e)
+                continue
+            self.succeeded(server)
+            rows.extend(objs)
+        self.counts['rows'] += len(rows)
+        return rows
+
+    def failed(self, server, error):
+        state = self.hosts.setdefault(server.id, HostState())
+        state.failures += 1
+        state.error = str(error)
+        # interval * 2, * 4, * 8... capped, with jitter so dead hosts do not retry in lockstep
+        delay = min(self.max_backoff, self.interval * 2 ** state.failures) * random.uniform(0.9, 1.1)
+        state.retry_at = self.clock() + delay
+        self.counts['failed'] += 1
+        if state.failures == 1:
+            logger.warning(f"Pull from {server.name} failed: {error}. Backing off")
+        else:
+            logger.debug(f"Pull from {server.name} failed {state.failures} times, next try in {delay:.0f}s")
+
+    def succeeded(self, server):
+        self.counts['pulled'] += 1
+        state = self.hosts.pop(server.id, None)
+        if state is not None:
+            logger.info(f"Pull from {server.name} recovered after {state.failures} failure(s)")
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,179 @@
+# monitor/process_actions.py
+"""
+Bulk process actions: one signal for many processes.
+
+The target set is resolved first (explicit PIDs, explorer filters, or a parent
+and its whole tree), every process gets the signal in one pass, and then a
+single psutil.wait_procs() call waits for all of them. Survivors of a
+terminating signal are escalated to SIGKILL when the timeout expires.
+
+The server itself and its ancestors (the launcher, the gunicorn master) are
+never signalled. Targets carry the start time they were selected with (from
+the process snapshot): a PID that now belongs to another process is skipped.
+"""
+import logging
+import os
+import signal
+
+import psutil
+
+from .collectors import get_backend
+from .process_snapshot import snapshotter
+
+logger = logging.getLogger('monitor')
+
+# Signals that can be sent from the UI/API (name without the SIG prefix)
+SIGNALS = ('TERM', 'KILL', 'INT', 'HUP', 'QUIT', 'STOP', 'CONT', 'USR1', 'USR2')
+# Signals expected to end the process: these are waited for (and escalated)
+TERMINATING = ('TERM', 'KILL', 'INT', 'HUP', 'QUIT')
+
+MAX_TARGETS = 5000
+MAX_TIMEOUT = 30
+
+# Per-PID results
+TERMINATED = 'terminated'
+KILLED = 'killed'          # Survived the signal, ended by the SIGKILL escalation
+SIGNALLED = 'signalled'    # Non-terminating signal delivered
+ALIVE = 'alive'            # Still running after the timeout (no escalation)
+GONE = 'gone'
+DENIED = 'denied'
+PROTECTED = 'protected'
+UNSUPPORTED = 'unsupported'
+
+
+class ActionError(ValueError):
+    pass
+
+
+def resolve_signal(name):
+    """'TERM' / 'SIGTERM' / '15' -> (name, signal number) if supported here."""
+    name = (name or 'TERM').strip().upper()
+    if name.isdigit():
+        try:
+            name = signal.Signals(int(name)).name
+        except ValueError:
+            raise ActionError(f'Unknown signal: {name}')
+    name = name.removeprefix('SIG')
+    number = getattr(signal, f'SIG{name}', None)
+    if name not in SIGNALS or number is None:
+        raise ActionError(f"Signal must be one of: {', '.join(s for s in SIGNALS if hasattr(signal, 'SIG' + s))}")
+    return name, number
+
+
+def protected_pids():
+    """This worker and its ancestors."""
+    pids = {os.getpid()}
+    try:
+        pids.update(p.pid for p in psutil.Process().parents())
+    except psutil.Error:
+        pass
+    return pids
+
+
+def select_targets(pids=(), search='', username='', parent=None):
+    """
+    {pid: start time} to act on, by PID. Explicit `pids` win; otherwise the
+    explorer filters (name substring or PID, exact owner) and/or `parent` with
+    all its descendants. At least one selector is required. Start times are
+    the snapshot's (what the user saw) or, for PIDs it does not know yet, the
+    current ones; None if unknown (not checked).
+    """
+    if pids:
+        targets = set(pids)
+    else:
+        if not (search.strip() or username.strip() or parent is not None):
+            raise ActionError('Select processes by PID, name, user or parent.')
+        targets = None
+        if search.strip() or username.strip():
+            targets = {p.pid for p in snapshotter.find(search, username)}
+        if parent is not None:
+            try:
+                tree = {parent} | {p.pid for p in psutil.Process(parent).children(recursive=True)}
+            except psutil.NoSuchProcess:
+                tree = set()
+            except psutil.AccessDenied:
+                raise ActionError(f'Cannot read the children of PID {parent}.')
+            targets = tree if targets is None else targets & tree
+
+    if len(targets) > MAX_TARGETS:
+        raise ActionError(f'Too many processes selected ({len(targets)} > {MAX_TARGETS}).')
+    records = snapshotter.snapshot()
+    backend = get_backend()
+    starts = {}
+    for pid in sorted(targets):
+        record = records.get(pid)
+        starts[pid] = record.create_time if record is not None else backend.start_time(pid)
+    return starts
+
+
+def signal_processes(targets, sig_name='TERM', timeout=3, escalate=True):
+    """
+    Sends the signal to every PID of `targets` ({pid: start time}, see
+    select_targets), waits up to `timeout` seconds for the terminating ones and
+    SIGKILLs the survivors if `escalate`. Returns {pid: result}.
+    """
+    sig_name, sig = resolve_signal(sig_name)
+    backend = get_backend()
+    timeout = max(0, min(float(timeout), MAX_TIMEOUT))
+    protected = protected_pids()
+    results = {}
+    signalled = []
+
+    # 1. One pass: send everything before waiting for anything
+    for pid, start in targets.items():
+        if pid in protected:
+            results[pid] = PROTECTED
+            continue
+        try:
+            # From here psutil refuses to signal another process reusing the PID;
+            # the start time covers a reuse since the selection
+            proc = psutil.Process(pid)
+            if start is not None and backend.start_time(pid) != start:
+                results[pid] = GONE
+                continue
+            proc.send_signal(sig)
+        except psutil.NoSuchProcess:
+            results[pid] = GONE
+        except psutil.AccessDenied:
+            results[pid] = DENIED
+        except ValueError:
+            # The platform cannot deliver this signal (Windows)
+            results[pid] = UNSUPPORTED
+        else:
+            signalled.append(proc)
+            results[pid] = SIGNALLED
+
+    if sig_name not in TERMINATING or not signalled:
+        return results
+
+    # 2. One wait for all of them
+    gone, alive = psutil.wait_procs(signalled, timeout=timeout)
+    for proc in gone:
+        results[proc.pid] = TERMINATED
+
+    # 3. Escalation
+    if alive and escalate and sig_name != 'KILL':
+        for proc in alive:
+            try:
+                proc.kill()
+            except psutil.NoSuchProcess:
+                pass
+            except psutil.AccessDenied:
+                results[proc.pid] = DENIED
+        gone, alive = psutil.wait_procs([p for p in alive if results[p.pid] != DENIED], timeout=1)
+        for proc in gone:
+            results[proc.pid] = KILLED
+    for proc in alive:
+        if results[proc.pid] != DENIED:
+            results[proc.pid] = ALIVE
+
+    logger.info(f'Bulk SIG{sig_name} to {len(targets)} processes: {summarize(results)}')
+    return results
+
+
+def summarize(results):
+    """{pid: result} -> {result: count}"""
+    summary = {}
+    for result in results.values():
+        summary[result] = summary.get(result, 0) + 1
+    return summary
@@ -0,0 +1,268 @@
+# monitor/process_snapshot.py
+"""
+Long-lived, incremental snapshot of the process table.
+
+CPU usage only exists relative to a previous reading of the same process, so
+building fresh psutil.Process objects on every request reports 0.0% for
+everybody. The snapshotter keeps the previous CPU time of every PID across
+ticks (and the psutil backend keeps its Process objects, see
+monitor/collectors.py): each refresh diffs the PID list (new / exited /
+changed) and gets real CPU deltas since the previous tick.
+
+Refreshes are lazy and rate limited (MONITOR_PROCESS_REFRESH seconds): every
+viewer and stream frame in between is served from the last snapshot, and the
+top-K lists are computed with a heap once per snapshot.
+
+The process explorer (page()) sorts a filtered view once per snapshot and then
+serves every page of it with a bisect on a keyset cursor: O(page) per request,
+and a cursor stays valid across refreshes (it holds the sort key of the last
+row seen, not a position).
+"""
+import base64
+import bisect
+import heapq
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from .collectors import get_backend
+
+logger = logging.getLogger('monitor')
+
+SORT_KEYS = {
+    'cpu': lambda p: p.cpu_percent,
+    'mem': lambda p: p.memory_percent,
+}
+
+# Explorer sort keys: (key function, descending by default). The PID breaks ties,
+# so every row has a unique key and a cursor always points between two rows.
+PAGE_SORTS = {
+    'cpu': (lambda p: (p.cpu_percent, p.pid), True),
+    'mem': (lambda p: (p.memory_percent, p.pid), True),
+    'pid': (lambda p: (p.pid,), False),
+    'name': (lambda p: ((p.name or '').lower(), p.pid), False),
+}
+
+# Sorted views kept per snapshot (one per sort/filter combination in use)
+MAX_VIEWS = 32
+
+
+class CursorError(ValueError):
+    pass
+
+
+def encode_cursor(sort, descending, key):
+    raw = json.dumps([sort, descending, list(key)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort, descending):
+    """The sort key a cursor points after. Raises CursorError if it is not for this sort."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_sort, cursor_desc, key = json.loads(raw)
+    except (ValueError, TypeError):
+        raise CursorError('Invalid cursor.')
+    if cursor_sort != sort or cursor_desc != descending or not isinstance(key, list):
+        raise CursorError('The cursor belongs to another sort order.')
+    return tuple(key)
+
+
+class ProcessPage:
+    """One page of the explorer. `next_cursor` is None on the last page."""
+
+    __slots__ = ('rows', 'next_cursor', 'total', 'generation')
+
+    def __init__(self, rows, next_cursor, total, generation):
+        self.rows = rows
+        self.next_cursor = next_cursor
+        self.total = total
+        self.generation = generation
+
+
+class ProcessInfo:
+    """One row of the process table. `version` is the generation it last changed in."""
+
+    __slots__ = ('pid', 'name', 'username', 'status', 'cpu_percent', 'memory_percent', 'create_time', 'version')
+
+    def __init__(self, pid, name, username, status, cpu_percent, memory_percent, create_time, version):
+        self.pid = pid
+        self.name = name
+        self.username = username
+        self.status = status
+        self.cpu_percent = cpu_percent
+        self.memory_percent = memory_percent
+        self.create_time = create_time
+        self.version = version
+
+    def dynamic(self):
+        # The fields a refresh can change
+        return (self.status, self.cpu_percent, self.memory_percent)
+
+
+class ProcessSnapshotter:
+    """Keeps psutil.Process objects across refreshes. Thread safe."""
+
+    def __init__(self, min_interval=None, clock=time.monotonic, backend=None):
+        self.min_interval = min_interval
+        self.backend = backend
+        self.clock = clock
+        self.generation = 0
+        self.taken_at = None
+        self.records = {}      # pid -> ProcessInfo (replaced as a whole on each refresh)
+        self.last_diff = {'new': 0, 'exited': 0, 'changed': 0}
+        self._cpu = {}         # pid -> (start, cpu_time) of the previous refresh
+        self._top = {}         # (sort key, k) -> cached top-K of the current generation
+        self._views = {}       # (sort, search, username) -> (rows, keys) of the current generation
+        self._lock = threading.Lock()
+
+    def _interval(self):
+        if self.min_interval is not None:
+            return self.min_interval
+        return settings.MONITOR_PROCESS_REFRESH
+
+    def is_stale(self):
+        return self.taken_at is None or self.clock() - self.taken_at >= self._interval()
+
+    def snapshot(self):
+        """Returns {pid: ProcessInfo}, refreshing first if the last one is too old."""
+        if self.is_stale():
+            with self._lock:
+                # Another thread may have refreshed while we waited for the lock
+                if self.is_stale():
+                    self.refresh()
+        return self.records
+
+    def refresh(self):
+        backend = self.backend or get_backend()
+        generation = self.generation + 1
+        samples = backend.processes()
+        now = self.clock()
+        elapsed = now - self.taken_at if self.taken_at is not None else None
+        total_memory = backend.total_memory() or 1
+
+        records = {}
+        cpu_base = {}
+        new = changed = 0
+        for sample in samples:
+            pid = sample.pid
+            base = self._cpu.get(pid)
+            previous = self.records.get(pid)
+            if base is None or base[0] != sample.start:
+                # New process (or PID reused by another one): the real value comes next tick
+                cpu = 0.0
+                previous = None
+                new += 1
+            else:
+                cpu = round(max(0.0, sample.cpu_time - base[1]) * 100 / elapsed, 1) if elapsed else 0.0
+            cpu_base[pid] = (sample.start, sample.cpu_time)
+
+            info = ProcessInfo(
+                pid, sample.name, sample.username, sample.status,
+                cpu, round(sample.rss * 100 / total_memory, 1), sample.start, generation,
+            )
+            if previous is not None:
+                if previous.dynamic() == info.dynamic():
+                    info.version = previous.version
+                else:
+                    changed += 1
+            records[pid] = info
+
+        exited = len(self._cpu.keys() - cpu_base.keys())
+        self._cpu = cpu_base
+        self.records = records
+        self._top = {}
+        self._views = {}
+        self.generation = generation
+        self.taken_at = now
+        self.last_diff = {'new': new, 'exited': exited, 'changed': changed}
+        logger.debug(f'Process snapshot #{generation}: {len(records)} processes, {self.last_diff}')
+
+    def top(self, k=10, key='cpu'):
+        """The k processes with the highest `key` ('cpu' or 'mem'), via heapq."""
+        self.snapshot()
+        # Under the lock: the cache always belongs to the current records
+        with self._lock:
+            cache_key = (key, k)
+            top = self._top.get(cache_key)
+            if top is None:
+                top = heapq.nlargest(k, self.records.values(), key=SORT_KEYS[key])
+                self._top[cache_key] = top
+            return top
+
+    def _view(self, sort, search, username):
+        # Filtered rows sorted ascending by key, plus the keys for bisect. Caller holds the lock.
+        view_key = (sort, search, username)
+        view = self._views.get(view_key)
+        if view is None:
+            key = PAGE_SORTS[sort][0]
+            rows = self.records.values()
+            if search:
+                rows = [p for p in rows if search in (p.name or '').lower() or search == str(p.pid)]
+            if username:
+                rows = [p for p in rows if (p.username or '').lower() == username]
+            rows = sorted(rows, key=key)
+            view = (rows, [key(p) for p in rows])
+            if len(self._views) >= MAX_VIEWS:
+                self._views.clear()
+            self._views[view_key] = view
+        return view
+
+    def find(self, search='', username=''):
+        """Every process matching the explorer filters, by PID."""
+        search = search.strip().lower()
+        username = username.strip().lower()
+        self.snapshot()
+        with self._lock:
+            return list(self._view('pid', search, username)[0])
+
+    def page(self, sort='cpu', descending=None, search='', username='', cursor=None, limit=50):
+        """
+        Rows after `cursor` (from a previous page's next_cursor) for this sort and
+        filters. `search` is a case-insensitive substring of the name (or an exact
+        PID), `username` an exact owner. Raises CursorError / KeyError (unknown sort).
+        """
+        default_desc = PAGE_SORTS[sort][1]
+        descending = default_desc if descending is None else descending
+        search = search.strip().lower()
+        username = username.strip().lower()
+        after = decode_cursor(cursor, sort, descending) if cursor else None
+
+        self.snapshot()
+        with self._lock:
+            rows, keys = self._view(sort, search, username)
+            generation = self.generation
+
+        try:
+            if after is None:
+                position = len(rows) if descending else 0
+            elif descending:
+                position = bisect.bisect_left(keys, after)
+            else:
+                position = bisect.bisect_right(keys, after)
+        except TypeError:
+            # Key of the wrong shape (hand-made cursor)
+            raise CursorError('Invalid cursor.')
+
+        if descending:
+            end = position
+            start = max(0, end - limit)
+            page = rows[start:end][::-1]
+            more = start > 0
+        else:
+            start = position
+            end = start + limit
+            page = rows[start:end]
+            more = end < len(rows)
+
+        next_cursor = None
+        if more and page:
+            next_cursor = encode_cursor(sort, descending, PAGE_SORTS[sort][0](page[-1]))
+        return ProcessPage(page, next_cursor, len(rows), generation)
+
+
+# One per worker process
+snapshotter = ProcessSnapshotter()
@@ -0,0 +1,175 @@
+# monitor/procfs.py
+"""
+Linux /proc reader backend.
+
+Reads /proc/stat, /proc/meminfo and every /proc/[pid]/stat directly: one
+open+read per process (plus one stat() for the owner) into ProcSample records,
+instead of psutil's object per process and several files per field. `root`
+can point to any directory with the same layout (used by bench_procfs).
+"""
+import os
+import pwd
+
+from .collectors import ProcSample
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+# /proc/[pid]/stat state letters, named like psutil does
+STATUSES = {
+    'R': 'running', 'S': 'sleeping', 'D': 'disk-sleep', 'T': 'stopped', 't': 'tracing-stop',
+    'Z': 'zombie', 'X': 'dead', 'x': 'dead', 'K': 'wake-kill', 'W': 'waking', 'I': 'idle', 'P': 'parked',
+}
+
+
+class CpuTimes:
+    """Cumulative system CPU time (clock ticks) from the first line of /proc/stat."""
+
+    __slots__ = ('busy', 'total')
+
+    def __init__(self, busy, total):
+        self.busy = busy
+        self.total = total
+
+
+def read_cpu_times(root='/proc'):
+    with open(os.path.join(root, 'stat'), 'rb') as f:
+        fields = [int(v) for v in f.readline().split()[1:]]
+    # user nice system idle iowait irq softirq steal [guest guest_nice]
+    # guest time is already included in user/nice, so it is not added twice
+    total = sum(fields[:8])
+    idle = fields[3] + (fields[4] if len(fields) > 4 else 0)
+    return CpuTimes(total - idle, total)
+
+
+def read_cpu_lines(root='/proc'):
+    """[(cpu name, [ticks...])] for the aggregate 'cpu' line and every 'cpuN' line."""
+    lines = []
+    with open(os.path.join(root, 'stat'), 'rb') as f:
+        for line in f:
+            if not line.startswith(b'cpu'):
+                break
+            parts = line.split()
+            lines.append((parts[0].decode(), [int(v) for v in parts[1:]]))
+    return lines
+
+
+def read_meminfo(root='/proc'):
+    """/proc/meminfo as {field: bytes}."""
+    info = {}
+    with open(os.path.join(root, 'meminfo'), 'rb') as f:
+        for line in f:
+            key, _, value = line.partition(b':')
+            parts = value.split()
+            if parts:
+                info[key.decode()] = int(parts[0]) * 1024
+    return info
+
+
+def _parse_stat(data):
+    # The command name is between parentheses and may contain spaces or ')'
+    head, _, rest = data.rpartition(b')')
+    name = head.partition(b'(')[2].decode(errors='replace')
+    fields = rest.split()
+    # fields[0] is field 3 of proc(5): state, ..., utime=14, stime=15, starttime=22, rss=24
+    return name, fields[0].decode(), int(fields[11]) + int(fields[12]), int(fields[19]), int(fields[21])
+
+
+class ProcfsBackend:
+    name = 'procfs'
+
+    def __init__(self, root='/proc'):
+        self.root = root
+        self._last_cpu = None
+        self._last_cores = {}
+        self._users = {}
+
+    def cpu_percent(self):
+        """System-wide CPU % since the previous call (0.0 on the first one, like psutil)."""
+        times = read_cpu_times(self.root)
+        last, self._last_cpu = self._last_cpu, times
+        if last is None or times.total <= last.total:
+            return 0.0
+        return round(100 * (times.busy - last.busy) / (times.total - last.total), 1)
+
+    def cpu_breakdown(self):
+        """Per-core CPU %, iowait % and steal % since the previous call, from one read of /proc/stat."""
+        lines = read_cpu_lines(self.root)
+        last, self._last_cores = self._last_cores, dict(lines)
+        cores = []
+        iowait = steal = 0.0
+        for name, ticks in lines:
+            previous = last.get(name)
+            deltas = [a - b for a, b in zip(ticks, previous)] if previous else []
+            # user nice system idle iowait irq softirq steal (guest already counted in user)
+            total = sum(deltas[:8])
+            if name == 'cpu':
+                if total > 0:
+                    iowait = round(100 * deltas[4] / total, 1) if len(deltas) > 4 else 0.0
+                    steal = round(100 * deltas[7] / total, 1) if len(deltas) > 7 else 0.0
+                continue
+            idle = deltas[3] + (deltas[4] if len(deltas) > 4 else 0) if deltas else 0
+            cores.append(round(100 * (total - idle) / total, 1) if total > 0 else 0.0)
+        return {'cores': cores, 'iowait': iowait, 'steal': steal}
+
+    def load_average(self):
+        with open(os.path.join(self.root, 'loadavg'), 'rb') as f:
+            return tuple(float(v) for v in f.read().split()[:3])
+
+    def memory(self):
+        """RAM and swap usage in %, from one read of /proc/meminfo."""
+        info = read_meminfo(self.root)
+        total = info.get('MemTotal', 0)
+        available = info.get('MemAvailable', info.get('MemFree', 0))
+        swap_total = info.get('SwapTotal', 0)
+        swap_used = swap_total - info.get('SwapFree', 0)
+        return {
+            'ram': round(100 * (total - available) / total, 1) if total else 0.0,
+            'swap': round(100 * swap_used / swap_total, 1) if swap_total else 0.0,
+        }
+
+    def total_memory(self):
+        return read_meminfo(self.root).get('MemTotal', 0)
+
+    def _username(self, uid):
+        # uid -> name lookups are cached: a host has few users and many processes
+        name = self._users.get(uid)
+        if name is None:
+            try:
+                name = pwd.getpwuid(uid).pw_name
+            except KeyError:
+                name = str(uid)
+            self._users[uid] = name
+        return name
+
+    def start_time(self, pid):
+        """ProcSample.start of `pid` as it is now (None if there is no such process)."""
+        try:
+            with open(f'{self.root}/{int(pid)}/stat', 'rb') as f:
+                return _parse_stat(f.read())[3]
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def processes(self):
+        """Returns a list of ProcSample, one per readable /proc/[pid]."""
+        samples = []
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if not entry.name.isdigit():
+                    continue
+                try:
+                    with open(f'{entry.path}/stat', 'rb') as f:
+                        data = f.read()
+                    uid = entry.stat().st_uid
+                except OSError:
+                    # Exited between the listing and the read, or not ours to read
+                    continue
+                try:
+                    name, state, ticks, start, rss_pages = _parse_stat(data)
+                except (ValueError, IndexError):
+                    continue
+                samples.append(ProcSample(
+                    int(entry.name), name, self._username(uid), STATUSES.get(state, state),
+                    ticks / CLOCK_TICKS, rss_pages * PAGE_SIZE, start,
+                ))
+        return samples
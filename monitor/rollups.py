@@ -0,0 +1,224 @@
+# monitor/rollups.py
+"""
+Downsampling and retention for SystemMetric samples.
+
+Raw rows are compacted incrementally into 1-minute buckets, minutes into hours
+and hours into days (min / max / avg per metric). Once a period is covered by
+the next tier, old rows are pruned according to MONITOR_RETENTION_DAYS, and
+raw rows kept long enough are sealed into compressed chunks (seal()).
+Chart endpoints call series(), which picks the cheapest tier for the range.
+"""
+import datetime
+
+from django.conf import settings
+from django.db.models import F, Max, Min, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour, TruncMinute
+from django.utils import timezone
+
+from .models import MetricRollup, Server
+from .storage import METRICS, get_store
+
+RAW = 0  # "resolution" of the raw samples (metric store, see monitor/storage.py)
+TIER_NAMES = {RAW: 'raw', MetricRollup.MINUTE: 'minute', MetricRollup.HOUR: 'hour', MetricRollup.DAY: 'day'}
+
+# Each tier is built from the one below it: (resolution, trunc function, source resolution)
+TIERS = [
+    (MetricRollup.MINUTE, TruncMinute, RAW),
+    (MetricRollup.HOUR, TruncHour, MetricRollup.MINUTE),
+    (MetricRollup.DAY, TruncDay, MetricRollup.HOUR),
+]
+
+# Buffered writes can land in buckets that were already compacted,
+# so every pass re-aggregates this window before the last bucket.
+LOOKBACK = datetime.timedelta(minutes=10)
+
+# Charts switch to a coarser tier when the range would exceed this many points
+MAX_CHART_POINTS = 1500
+
+# Approximate spacing of raw rows (collector --record-interval)
+RAW_STEP = 5
+
+
+def retention(resolution):
+    """Retention of a tier as a timedelta, or None to keep it forever."""
+    days = getattr(settings, 'MONITOR_RETENTION_DAYS', {}).get(TIER_NAMES[resolution], 0)
+    return datetime.timedelta(days=days) if days else None
+
+
+def floor_time(dt, resolution):
+    """Start of the `resolution`-seconds bucket that contains `dt` (UTC aligned)."""
+    seconds = int(dt.timestamp()) // resolution * resolution
+    return datetime.datetime.fromtimestamp(seconds, tz=datetime.timezone.utc)
+
+
+def watermark(server, resolution):
+    """Start of the most recent bucket stored for a tier (None if empty)."""
+    return (MetricRollup.objects
+            .filter(server=server, resolution=resolution)
+            .aggregate(last=Max('bucket'))['last'])
+
+
+def _aggregate(server, resolution, trunc, source, since):
+    """GROUP BY bucket over the source tier, done by the database (or the metric store for raw)."""
+    if source == RAW:
+        for bucket, values in get_store().buckets(server.id, resolution, since):
+            yield MetricRollup(server=server, resolution=resolution, bucket=bucket, **values)
+        return
+
+    qs = MetricRollup.objects.filter(server=server, resolution=source)
+    if since:
+        qs = qs.filter(bucket__gte=since)
+    qs = qs.annotate(b=trunc('bucket', tzinfo=datetime.timezone.utc)).values('b')
+    # Averages of averages must be weighted by the number of samples
+    aggregates = {
+        'samples': Sum('samples'),
+        'swap_samples': Sum('samples', filter=Q(swap_avg__isnull=False)),
+    }
+    for metric in METRICS:
+        aggregates[f'{metric}_min'] = Min(f'{metric}_min')
+        aggregates[f'{metric}_max'] = Max(f'{metric}_max')
+        aggregates[f'{metric}_avg'] = Sum(F(f'{metric}_avg') * F('samples'))
+
+    # Aliases must not clash with the MetricRollup field names
+    aliases = {f'agg_{name}': expression for name, expression in aggregates.items()}
+
+    for row in qs.annotate(**aliases).order_by('b'):
+        values = {name: row[f'agg_{name}'] for name in aggregates}
+        for metric in METRICS:
+            weight = values['swap_samples'] if metric == 'swap' else values['samples']
+            total = values[f'{metric}_avg']
+            values[f'{metric}_avg'] = total / weight if weight and total is not None else None
+        values.pop('swap_samples')
+        yield MetricRollup(server=server, resolution=resolution, bucket=row['b'], **values)
+
+
+def compact(servers=None):
+    """
+    Incrementally fills the rollup tiers. Returns {resolution: buckets written}.
+
+    Only the window since each tier's last bucket (minus LOOKBACK) is
+    re-aggregated, so the cost of a pass does not grow with the table size.
+    """
+    servers = Server.objects.all() if servers is None else servers
+    update_fields = ['samples'] + [f'{m}_{agg}' for m in METRICS for agg in ('min', 'max', 'avg')]
+    written = {resolution: 0 for resolution, _, _ in TIERS}
+
+    for server in servers:
+        for resolution, trunc, source in TIERS:
+            last = watermark(server, resolution)
+            since = floor_time(last - LOOKBACK, resolution) if last else None
+
+            rollups = list(_aggregate(server, resolution, trunc, source, since))
+            if not rollups:
+                continue
+
+            # Upsert: the most recent buckets are usually partial and get recomputed
+            MetricRollup.objects.bulk_create(
+                rollups,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['server', 'resolution', 'bucket'],
+                update_fields=update_fields,
+            )
+            written[resolution] += len(rollups)
+
+    return written
+
+
+def prune(servers=None, now=None):
+    """
+    Deletes rows older than each tier's retention. Returns {tier name: rows deleted}.
+
+    A row is only deleted once the next tier has already aggregated its period,
+    so pruning never loses data that was not compacted yet.
+    """
+    servers = Server.objects.all() if servers is None else servers
+    now = now or timezone.now()
+    deleted = {name: 0 for name in TIER_NAMES.values()}
+
+    # (tier to prune, tier that must cover it first)
+    chain = [(RAW, MetricRollup.MINUTE), (MetricRollup.MINUTE, MetricRollup.HOUR),
+             (MetricRollup.HOUR, MetricRollup.DAY), (MetricRollup.DAY, None)]
+
+    for server in servers:
+        for resolution, covered_by in chain:
+            keep = retention(resolution)
+            if keep is None:
+                continue
+            cutoff = now - keep
+
+            if covered_by is not None:
+                last = watermark(server, covered_by)
+                if last is None:
+                    continue
+                cutoff = min(cutoff, last - LOOKBACK)
+
+            if resolution == RAW:
+                count = get_store().prune(server.id, cutoff)
+            else:
+                count, _ = MetricRollup.objects.filter(server=server, resolution=resolution,
+                                                       bucket__lt=cutoff).delete()
+            deleted[TIER_NAMES[resolution]] += count
+
+    return deleted
+
+
+def seal(servers=None, now=None):
+    """
+    Compresses raw samples older than MONITOR_COMPRESS_AFTER_HOURS into closed
+    chunk windows (see OrmStore.seal). Returns (samples, chunks) written.
+
+    Only periods the minute tier already covers are sealed: compaction reads
+    raw rows, never chunks.
+    """
+    hours = getattr(settings, 'MONITOR_COMPRESS_AFTER_HOURS', 0)
+    if not hours:
+        return 0, 0
+    servers = Server.objects.all() if servers is None else servers
+    now = now or timezone.now()
+    store = get_store()
+    sealed = chunks = 0
+
+    for server in servers:
+        last = watermark(server, MetricRollup.MINUTE)
+        if last is None:
+            continue
+        samples, written = store.seal(server.id, min(now - datetime.timedelta(hours=hours), last - LOOKBACK))
+        sealed += samples
+        chunks += written
+
+    return sealed, chunks
+
+
+def pick_resolution(start, end, now=None, max_points=MAX_CHART_POINTS):
+    """Finest tier that still has data for `start` and returns at most `max_points` rows."""
+    now = now or timezone.now()
+    span = (end - start).total_seconds()
+
+    for resolution in (RAW, MetricRollup.MINUTE, MetricRollup.HOUR):
+        keep = retention(resolution)
+        if keep is not None and start < now - keep:
+            continue  # Already pruned from this tier
+        if span / (resolution or RAW_STEP) <= max_points:
+            return resolution
+    return MetricRollup.DAY
+
+
+def series(server, start, end, resolution=None, max_points=MAX_CHART_POINTS):
+    """
+    Returns (resolution, rows) for a chart, rows being (timestamp, cpu, ram) tuples
+    in chronological order. Rollup tiers report the bucket average.
+    """
+    if resolution is None:
+        resolution = pick_resolution(start, end, max_points=max_points)
+
+    if resolution == RAW:
+        return resolution, get_store().series(server.id, start, end)
+
+    rows = (MetricRollup.objects
+            .filter(server=server, resolution=resolution, bucket__gte=floor_time(start, resolution),
+                    bucket__lte=end)
+            .order_by('bucket')
+            .values_list('bucket', 'cpu_avg', 'ram_avg'))
+    # Streamed from the cursor in chunks: no model instances, no result cache
+    return resolution, list(rows.iterator(chunk_size=2000))
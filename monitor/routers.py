@@ -0,0 +1,35 @@
+# monitor/routers.py
+"""
+Optional split of the database (METRICS_DB in settings.py).
+
+The monitor app (the server inventory and every metric table) lives in its own
+SQLite file, so the collector's writes never wait on, nor block, the auth and
+session tables the web workers write on each login. The whole app moves
+together: metrics keep real foreign keys to their Server rows.
+"""
+
+METRICS_DB = 'metrics'
+
+
+class MetricsRouter:
+    app_label = 'monitor'
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == self.app_label:
+            return METRICS_DB
+        return None
+
+    def db_for_write(self, model, **hints):
+        return self.db_for_read(model, **hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if obj1._meta.app_label == self.app_label and obj2._meta.app_label == self.app_label:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if app_label == self.app_label:
+            return db == METRICS_DB
+        if db == METRICS_DB:
+            return False
+        return None
@@ -0,0 +1,187 @@
+# monitor/sampling.py
+"""
+Shared snapshot cache for the live dashboard.
+
+Every open tab polls the metric cards and the chart every 2 seconds. Instead of
+calling psutil / querying SQLite once per request, the first request of each
+tick produces a snapshot and stores it in the Django cache (shared by all the
+gunicorn workers). Everybody else reads that snapshot until the TTL expires.
+"""
+import datetime
+import math
+import platform
+import time
+from urllib.parse import quote
+
+import psutil
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Server
+from .collectors import get_backend
+from . import disks
+from .lttb import downsample
+from .rollups import TIER_NAMES, series
+from .storage import get_store
+
+# Root path for disk usage depending on the OS
+DISK_PATH = 'C:\\' if platform.system() == 'Windows' else '/'
+
+# Number of points shown in the live chart
+CHART_POINTS = 20
+
+# Default / maximum number of points returned for a time range
+MAX_POINTS = 500
+MAX_POINTS_LIMIT = 5000
+
+# Rows read from the DB per returned point before LTTB downsampling
+LTTB_SOURCE_FACTOR = 50
+
+
+def get_ttl():
+    """Seconds a snapshot stays fresh (read on each call so it can be overridden)."""
+    return getattr(settings, 'MONITOR_SNAPSHOT_TTL', 2)
+
+
+def cached_snapshot(key, producer, ttl=None):
+    """
+    Returns the cached value for `key`, refreshing it about once per TTL.
+
+    The worker that takes the lock runs `producer`; the others keep serving the
+    previous (stale) copy instead of piling up on psutil or the database. The
+    lock is only as strict as the backend's add(): atomic on Redis / Memcached,
+    a check-then-set on the file cache, where two workers may occasionally
+    both refresh (harmless: one extra sample).
+    """
+    ttl = get_ttl() if ttl is None else ttl
+    if ttl <= 0:
+        return producer()
+
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock_key = f'{key}:lock'
+    stale_key = f'{key}:stale'
+
+    # cache.add() succeeds for the first caller (see above): that one refreshes
+    if cache.add(lock_key, 1, timeout=max(ttl, 1)):
+        try:
+            value = producer()
+            cache.set(key, value, timeout=ttl)
+            cache.set(stale_key, value, timeout=None)
+        finally:
+            cache.delete(lock_key)
+        return value
+
+    # Someone else is refreshing: serve the last known snapshot if we have one
+    value = cache.get(stale_key)
+    if value is not None:
+        return value
+    return producer()
+
+
+def sample_system():
+    """Reads CPU, RAM, Swap and Disk usage, plus every mount (or simulates them in Demo Mode)."""
+    if settings.DEMO_MODE:
+        # Simulate organic behavior with sine waves
+        t = time.time()
+        return {
+            # CPU: 40% base + 20% oscillation (Range: 20-60%)
+            'cpu': round(40 + 20 * math.sin(t * 0.5), 1),
+            # RAM: 50% base + 5% oscillation
+            'ram': round(50 + 5 * math.cos(t * 0.2), 1),
+            # Swap: Low usage
+            'swap': round(10 + 2 * math.sin(t * 0.1), 1),
+            # Disk: Slow filling effect (slowly increases then resets)
+            'disk': round(45 + (t % 100) / 20, 1),
+            'mounts': disks.mounts(),
+        }
+
+    # psutil or /proc depending on MONITOR_COLLECTOR_BACKEND (see monitor/collectors.py)
+    backend = get_backend()
+    return {
+        'cpu': backend.cpu_percent(),  # Non-blocking: usage since the previous call
+        **backend.memory(),
+        'disk': psutil.disk_usage(DISK_PATH).percent,
+        # Every watched mount (data volumes are often separate filesystems)
+        'mounts': disks.mounts(),
+    }
+
+
+def sample_chart(server_name='Localhost', points=CHART_POINTS):
+    """Builds the chart series (labels, cpu, ram) for the last `points` metrics."""
+    labels = []
+    data_cpu = []
+    data_ram = []
+
+    if settings.DEMO_MODE:
+        now = time.time()
+        for i in range(points):
+            t = now - (points - i) * 5  # 5 seconds intervals
+            labels.append(time.strftime('%H:%M:%S', time.localtime(t)))
+            data_cpu.append(round(40 + 20 * math.sin(t * 0.5), 1))
+            data_ram.append(round(50 + 5 * math.cos(t * 0.2), 1))
+    else:
+        # Only the 3 columns we plot, oldest first (left to right)
+        server_ids = list(Server.objects.filter(name=server_name).values_list('id', flat=True))
+        for timestamp, cpu, ram in get_store().latest(server_ids, points):
+            labels.append(timestamp.strftime('%H:%M:%S'))
+            data_cpu.append(cpu)
+            data_ram.append(ram)
+
+    return {'labels': labels, 'cpu': data_cpu, 'ram': data_ram}
+
+
+def sample_chart_range(server_name, start, end, max_points=MAX_POINTS):
+    """
+    Chart series between `start` and `end`, downsampled to about `max_points`.
+
+    The rollup tier is chosen so LTTB gets enough detail to work with (up to
+    LTTB_SOURCE_FACTOR points per output point) without reading the whole
+    raw table for long ranges.
+    """
+    if settings.DEMO_MODE:
+        return sample_chart(server_name)
+
+    server = Server.objects.filter(name=server_name).first()
+    if server is None:
+        resolution, rows = 0, []
+    else:
+        resolution, rows = series(server, start, end, max_points=max_points * LTTB_SOURCE_FACTOR)
+
+    timestamps = [ts.timestamp() for ts, _, _ in rows]
+    cpu = [value for _, value, _ in rows]
+    ram = [value for _, _, value in rows]
+    keep = downsample(timestamps, [cpu, ram], max_points)
+
+    # Show the date as well when the range spans more than one day
+    fmt = '%H:%M:%S' if (end - start).total_seconds() <= 86400 else '%d/%m %H:%M'
+    return {
+        'labels': [rows[i][0].strftime(fmt) for i in keep],
+        'timestamps': [int(timestamps[i] * 1000) for i in keep],  # Epoch milliseconds
+        'cpu': [cpu[i] for i in keep],
+        'ram': [ram[i] for i in keep],
+        'resolution': TIER_NAMES[resolution],
+    }
+
+
+def system_snapshot():
+    """Current system usage, shared by every viewer for one TTL."""
+    return cached_snapshot('monitor:system', sample_system)
+
+
+def chart_snapshot(server_name='Localhost', seconds=None, max_points=MAX_POINTS):
+    """
+    Chart series for `server_name`, shared by every viewer for one TTL.
+    Without `seconds` it returns the latest points, otherwise the last `seconds`.
+    """
+    if seconds is None:
+        return cached_snapshot(f'monitor:chart:{quote(server_name)}', lambda: sample_chart(server_name))
+
+    def producer():
+        end = timezone.now()
+        return sample_chart_range(server_name, end - datetime.timedelta(seconds=seconds), end, max_points)
+
+    return cached_snapshot(f'monitor:chart:{quote(server_name)}:{seconds}:{max_points}', producer)
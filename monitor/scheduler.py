@@ -0,0 +1,106 @@
+# monitor/scheduler.py
+"""
+Drift-free periodic scheduler for the metrics collector.
+
+Each task runs on a fixed grid of the monotonic clock (next = previous + interval),
+so the time spent sampling or writing to the DB never accumulates as drift.
+The grid is aligned to wall-clock multiples of the interval, which makes
+timestamps from different servers line up. Ticks that could not run on time
+are skipped (not replayed in a burst) and counted as missed.
+"""
+import logging
+import math
+import time
+
+logger = logging.getLogger('monitor')
+
+
+class Task:
+    """A function called every `interval` seconds."""
+
+    __slots__ = ('name', 'interval', 'func', 'next_run', 'runs', 'missed')
+
+    def __init__(self, name, interval, func, next_run):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.next_run = next_run
+        self.runs = 0
+        self.missed = 0
+
+    def __repr__(self):
+        return f"<Task {self.name} every {self.interval}s>"
+
+
+class Scheduler:
+    def __init__(self, clock=time.monotonic, wall_clock=time.time, sleep=time.sleep):
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.sleep = sleep
+        self.tasks = []
+        self.running = False
+
+    def every(self, interval, name, func):
+        """Registers `func` to run every `interval` seconds (sub-second allowed)."""
+        if interval <= 0:
+            raise ValueError(f"Interval for '{name}' must be positive")
+
+        # Align the first run to the next wall-clock multiple of the interval
+        offset = interval - (self.wall_clock() % interval)
+        task = Task(name, interval, func, self.clock() + offset)
+        self.tasks.append(task)
+        return task
+
+    def run_pending(self):
+        """Runs every task that is due. Returns the number of tasks executed."""
+        now = self.clock()
+        executed = 0
+
+        for task in sorted(self.tasks, key=lambda t: t.next_run):
+            if task.next_run > now:
+                continue
+
+            try:
+                task.func()
+            except Exception as e:
+                logger.error(f"Scheduled task '{task.name}' failed: {e}")
+            task.runs += 1
+            executed += 1
+
+            # Stay on the grid. If we are late by one or more whole periods,
+            # skip those ticks and report them instead of running them back to back.
+            task.next_run += task.interval
+            now = self.clock()
+            if task.next_run <= now:
+                missed = math.floor((now - task.next_run) / task.interval) + 1
+                task.next_run += missed * task.interval
+                task.missed += missed
+                logger.warning(
+                    f"Task '{task.name}' missed {missed} tick(s) "
+                    f"({task.missed} total, interval {task.interval}s)"
+                )
+
+        return executed
+
+    def seconds_until_next(self):
+        if not self.tasks:
+            return None
+        return max(0.0, min(t.next_run for t in self.tasks) - self.clock())
+
+    def run_forever(self):
+        """Blocks running tasks until stop() is called (or an exception escapes)."""
+        self.running = True
+        while self.running:
+            delay = self.seconds_until_next()
+            if delay is None:
+                break
+            if delay > 0:
+                self.sleep(delay)
+            self.run_pending()
+
+    def stop(self):
+        self.running = False
+
+    def stats(self):
+        """Runs and missed ticks per task, e.g. for logging on shutdown."""
+        return {t.name: {'interval': t.interval, 'runs': t.runs, 'missed': t.missed} for t in self.tasks}
@@ -4,12 +4,14 @@ from .models import Server, SystemMetric
 # Translate SystemMetric model to JSON
 class MetricSerializer(serializers.ModelSerializer):
     # We can add computed or formatted fields if we want
+    # (the servers of a page are fetched once in MetricViewSet: no query per row)
     server_name = serializers.ReadOnlyField(source='server.name')
     timestamp_formatted = serializers.SerializerMethodField()
 
     class Meta:
         model = SystemMetric
         # Define which fields we want to expose
+        # (id is null for samples sealed into chunks or kept in segment files)
         fields = ['id', 'server_name', 'cpu_usage', 'ram_usage', 'disk_usage', 'swap_usage', 'timestamp', 'timestamp_formatted']
 
     def get_timestamp_formatted(self, obj):
@@ -19,4 +21,5 @@ class MetricSerializer(serializers.ModelSerializer):
 class ServerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Server
-        fields = '__all__'
\ No newline at end of file
+        # The agent token hash never leaves the server
+        exclude = ['agent_token']
\ No newline at end of file
@@ -0,0 +1,476 @@
+# monitor/shells.py
+"""
+Persistent PTY shell sessions for the web terminal (POSIX only).
+
+Instead of one process per command, each browser session gets a long-lived
+shell attached to a pseudo-terminal: `cd`, environment variables, aliases,
+virtualenvs and interactive tools (top, vim, less...) all work, and a command
+costs one keystroke round-trip instead of a process start.
+
+The worker that opens a shell runs a pump thread that owns the PTY. Everything
+else goes through files under MONITOR_JOB_DIR/shells, so any worker can serve
+any session:
+
+    <id>.json       metadata: owner, session, pid, status...
+    <id>.in         FIFO with framed input (keystrokes / window resizes)
+    <id>.<n>.out    output segments; offsets are absolute byte counts, old
+                    segments are dropped past MONITOR_SHELL_SCROLLBACK
+    <id>.active     touched on every input: its mtime drives the idle timeout
+
+The directory and every file in it are private to the dashboard user (the
+transcripts may be root shells).
+
+SSE streams wait for new output through OutputWatcher: one thread per worker
+checks every watched shell, so an idle terminal holds no pool thread.
+"""
+import asyncio
+import errno
+import json
+import logging
+import os
+import select
+import signal
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+from .jobs import IS_POSIX, JOB_ID_RE, JobError, create_time, job_dir, kill_group, kill_recorded, private_dir
+
+if IS_POSIX:
+    import fcntl
+    import termios
+
+logger = logging.getLogger('monitor')
+
+RUNNING = 'running'
+CLOSED = 'closed'
+IDLE = 'idle'
+
+SEGMENT_SIZE = 256 * 1024
+READ_SIZE = 64 * 1024
+# Closed sessions are kept this long (final output), then removed
+KEEP_CLOSED = 3600
+
+# Input frames: 1 byte kind + 2 bytes length + payload. A frame never exceeds
+# PIPE_BUF, so writes from several workers cannot interleave inside the FIFO
+FRAME_HEADER = struct.Struct('!cH')
+MAX_FRAME = 4096 - FRAME_HEADER.size
+DATA = b'd'
+RESIZE = b'r'
+
+# Exec'd in front of the shell: makes the PTY (its stdin) the controlling terminal of
+# the new session. A preexec_fn would do the same but is unsafe in threaded workers
+CTTY_HELPER = (
+    'import fcntl, os, sys, termios; '
+    'fcntl.ioctl(0, termios.TIOCSCTTY, 0); '
+    'os.execvp(sys.argv[1], sys.argv[1:])'
+)
+
+
+class ShellError(Exception):
+    pass
+
+
+def available():
+    """PTY sessions need POSIX, and stay off in DEMO_MODE (commands are simulated)."""
+    return IS_POSIX and settings.MONITOR_TERMINAL_PTY and not settings.DEMO_MODE
+
+
+def shell_dir():
+    # Transcripts of root shells: private, like the job directory (see jobs.private_dir)
+    try:
+        return private_dir(os.path.join(job_dir(), 'shells'))
+    except JobError as e:
+        raise ShellError(str(e))
+
+
+def _path(shell_id, ext):
+    # Ids come from URLs: never let them escape the shell directory
+    if not JOB_ID_RE.match(shell_id or ''):
+        raise ShellError('Invalid shell id')
+    return os.path.join(shell_dir(), f'{shell_id}.{ext}')
+
+
+def _segment(shell_id, index):
+    return _path(shell_id, f'{index}.out')
+
+
+def _create(path):
+    """Opens `path` for appending (unbuffered), created readable by this user only."""
+    return open(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600), 'wb', buffering=0)
+
+
+def _write_meta(meta):
+    fd, tmp = tempfile.mkstemp(dir=shell_dir(), suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp, _path(meta['id'], 'json'))
+
+
+def get_shell(shell_id):
+    """Metadata of a shell, or None if it does not exist."""
+    try:
+        with open(_path(shell_id, 'json')) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def list_shells(owner, status=None):
+    shells = []
+    for name in os.listdir(shell_dir()):
+        if name.endswith('.json'):
+            meta = get_shell(name[:-5])
+            if meta and meta['owner'] == owner and (status is None or meta['status'] == status):
+                shells.append(meta)
+    return shells
+
+
+def touch(shell_id):
+    """Marks the session as used (postpones the idle timeout)."""
+    try:
+        os.utime(_path(shell_id, 'active'))
+    except FileNotFoundError:
+        pass
+
+
+class OutputWatcher:
+    """Wakes the SSE streams of this worker when their shell has new output or stops running."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.waiters = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    async def wait(self, shell_id, offset, timeout):
+        """True once there is output after `offset` or the shell closed, False on timeout."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self.lock:
+            self.waiters[future] = (shell_id, offset, loop)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True, name='shell-watcher')
+                self.thread.start()
+        self.wakeup.set()
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self.lock:
+                self.waiters.pop(future, None)
+
+    def _run(self):
+        while True:
+            with self.lock:
+                waiters = list(self.waiters.items())
+            if not waiters:
+                self.wakeup.wait()
+                self.wakeup.clear()
+                continue
+            for future, (shell_id, offset, loop) in waiters:
+                if future.done():
+                    continue
+                try:
+                    ready = _has_news(shell_id, offset)
+                except Exception:
+                    ready = True  # Let the stream read it and report the error
+                if ready:
+                    try:
+                        loop.call_soon_threadsafe(_resolve, future)
+                    except RuntimeError:  # Event loop already closed
+                        pass
+            time.sleep(self.interval)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(True)
+
+
+def _has_news(shell_id, offset):
+    index, pos = divmod(offset, SEGMENT_SIZE)
+    try:
+        if os.stat(_segment(shell_id, index)).st_size > pos:
+            return True
+    except FileNotFoundError:
+        pass
+    # A newer segment: the current one is full (or was dropped from the scrollback)
+    if os.path.exists(_segment(shell_id, index + 1)):
+        return True
+    return (get_shell(shell_id) or {}).get('status') != RUNNING
+
+
+output_watcher = OutputWatcher()
+
+
+def _cleanup():
+    """Removes the files of sessions closed more than KEEP_CLOSED ago."""
+    cutoff = time.time() - KEEP_CLOSED
+    for name in os.listdir(shell_dir()):
+        if not name.endswith('.json'):
+            continue
+        meta = get_shell(name[:-5])
+        if meta and meta['status'] != RUNNING and (meta.get('closed') or 0) < cutoff:
+            prefix = f"{meta['id']}."
+            for other in os.listdir(shell_dir()):
+                if other.startswith(prefix):
+                    try:
+                        os.remove(os.path.join(shell_dir(), other))
+                    except FileNotFoundError:
+                        pass
+
+
+def _is_alive(meta):
+    """A live session always has its pump reading the FIFO: opening it for writing proves it."""
+    try:
+        fd = os.open(_path(meta['id'], 'in'), os.O_WRONLY | os.O_NONBLOCK)
+    except OSError:
+        # ENXIO (no reader) or FIFO already removed: the owning worker is gone
+        return False
+    os.close(fd)
+    return True
+
+
+def open_shell(owner, session_key, cwd, rows=32, cols=120):
+    """
+    Returns the running shell of this Django session, or starts a new one.
+    Raises ShellError when the user already has MONITOR_SHELL_MAX_PER_USER shells.
+    """
+    _cleanup()
+
+    running = []
+    for meta in list_shells(owner, RUNNING):
+        if not _is_alive(meta):
+            meta.update(status=CLOSED, closed=time.time())
+            _write_meta(meta)
+        elif meta['session'] == session_key:
+            touch(meta['id'])
+            return meta
+        else:
+            running.append(meta)
+
+    limit = settings.MONITOR_SHELL_MAX_PER_USER
+    if len(running) >= limit:
+        raise ShellError(f'Too many open shells (max {limit}). Close one in another browser first.')
+
+    shell_id = uuid.uuid4().hex[:12]
+    master, slave = os.openpty()
+    _set_size(master, rows, cols)
+
+    env = dict(os.environ, TERM='xterm-256color')
+    shell = os.environ.get('SHELL') or ('/bin/bash' if os.path.exists('/bin/bash') else '/bin/sh')
+    try:
+        proc = subprocess.Popen(
+            [sys.executable, '-c', CTTY_HELPER, shell],
+            cwd=cwd if os.path.isdir(cwd) else os.path.expanduser('~'),
+            env=env,
+            stdin=slave,
+            stdout=slave,
+            stderr=slave,
+            # New session with the PTY as controlling terminal: job control and Ctrl+C work
+            start_new_session=True,
+        )
+    except Exception:
+        os.close(master)
+        raise
+    finally:
+        os.close(slave)
+
+    os.mkfifo(_path(shell_id, 'in'), 0o600)
+    _create(_path(shell_id, 'active')).close()
+    meta = {
+        'id': shell_id,
+        'owner': owner,
+        'session': session_key,
+        'pid': proc.pid,
+        # Checked before signalling the group from another worker (see close_shell)
+        'created': create_time(proc.pid),
+        'status': RUNNING,
+        'started': time.time(),
+        'closed': None,
+    }
+    _write_meta(meta)
+
+    # The FIFO is opened before returning, so the session is "alive" right away
+    fifo = os.open(_path(shell_id, 'in'), os.O_RDWR | os.O_NONBLOCK)
+    threading.Thread(target=_pump, args=(meta, proc, master, fifo), daemon=True, name=f'shell-{shell_id}').start()
+    return meta
+
+
+def _set_size(master, rows, cols):
+    # The kernel sends SIGWINCH to the foreground job, so full-screen tools redraw
+    fcntl.ioctl(master, termios.TIOCSWINSZ, struct.pack('HHHH', rows, cols, 0, 0))
+
+
+def _pump(meta, proc, master, fifo):
+    """Owns the PTY: output -> segment files, FIFO frames -> PTY, idle timeout."""
+    shell_id = meta['id']
+    idle_timeout = settings.MONITOR_SHELL_IDLE_TIMEOUT
+    keep_segments = max(1, -(-settings.MONITOR_SHELL_SCROLLBACK // SEGMENT_SIZE))
+
+    index, pos = 0, 0
+    out = _create(_segment(shell_id, index))
+    pending = b''
+    status = CLOSED
+    last_check = time.monotonic()
+
+    try:
+        while True:
+            readable, _, _ = select.select([master, fifo], [], [], 1.0)
+
+            if master in readable:
+                try:
+                    data = os.read(master, READ_SIZE)
+                except OSError:
+                    # EIO: every process holding the terminal has exited
+                    data = b''
+                if not data:
+                    break
+                while data:
+                    room = SEGMENT_SIZE - pos
+                    out.write(data[:room])
+                    pos += min(room, len(data))
+                    data = data[room:]
+                    if pos == SEGMENT_SIZE:
+                        out.close()
+                        index, pos = index + 1, 0
+                        out = _create(_segment(shell_id, index))
+                        try:
+                            os.remove(_segment(shell_id, index - keep_segments - 1))
+                        except FileNotFoundError:
+                            pass
+
+            if fifo in readable:
+                try:
+                    pending += os.read(fifo, READ_SIZE)
+                except BlockingIOError:
+                    pass
+                pending = _apply_frames(pending, master)
+
+            now = time.monotonic()
+            if idle_timeout and now - last_check >= 1.0:
+                last_check = now
+                try:
+                    idle = time.time() - os.stat(_path(shell_id, 'active')).st_mtime
+                except FileNotFoundError:
+                    idle = 0
+                if idle > idle_timeout:
+                    logger.info(f'Closing idle shell {shell_id} ({int(idle)}s without activity)')
+                    status = IDLE
+                    break
+    except Exception as e:
+        logger.error(f'Shell {shell_id} pump failed: {e}')
+    finally:
+        out.close()
+        os.close(fifo)
+        os.close(master)
+        kill_group(proc.pid, signal.SIGHUP)
+        try:
+            proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            kill_group(proc.pid, signal.SIGKILL)
+            proc.wait()
+        try:
+            os.remove(_path(shell_id, 'in'))
+        except FileNotFoundError:
+            pass
+
+    current = get_shell(shell_id) or meta
+    current.update(status=status, closed=time.time(), exit_code=proc.returncode)
+    _write_meta(current)
+
+
+def _apply_frames(buffer, master):
+    """Applies every complete frame in `buffer`; returns the incomplete rest."""
+    while len(buffer) >= FRAME_HEADER.size:
+        kind, length = FRAME_HEADER.unpack_from(buffer)
+        end = FRAME_HEADER.size + length
+        if len(buffer) < end:
+            break
+        payload, buffer = buffer[FRAME_HEADER.size:end], buffer[end:]
+        if kind == DATA:
+            os.write(master, payload)
+        elif kind == RESIZE and length == 4:
+            _set_size(master, *struct.unpack('!HH', payload))
+    return buffer
+
+
+def _send(shell_id, kind, payload):
+    try:
+        fd = os.open(_path(shell_id, 'in'), os.O_WRONLY | os.O_NONBLOCK)
+    except OSError:
+        raise ShellError('Shell is closed')
+    try:
+        for start in range(0, max(len(payload), 1), MAX_FRAME):
+            chunk = payload[start:start + MAX_FRAME]
+            os.write(fd, FRAME_HEADER.pack(kind, len(chunk)) + chunk)
+    except OSError as e:
+        if e.errno == errno.EAGAIN:
+            raise ShellError('Shell is not reading its input')
+        raise
+    finally:
+        os.close(fd)
+    touch(shell_id)
+
+
+def _owned(shell_id, owner):
+    meta = get_shell(shell_id)
+    if meta is None or meta['owner'] != owner:
+        raise ShellError('Shell not found')
+    return meta
+
+
+def write_input(shell_id, owner, data):
+    """Sends keystrokes (str) to the shell."""
+    _owned(shell_id, owner)
+    _send(shell_id, DATA, data.encode('utf-8'))
+
+
+def resize(shell_id, owner, rows, cols):
+    _owned(shell_id, owner)
+    _send(shell_id, RESIZE, struct.pack('!HH', rows, cols))
+
+
+def close_shell(shell_id, owner):
+    """Hangs up the shell (from any worker); its pump records the final status."""
+    meta = _owned(shell_id, owner)
+    if meta['status'] == RUNNING:
+        kill_recorded(meta, signal.SIGHUP)
+    return meta
+
+
+def read_output(shell_id, offset, max_bytes=READ_SIZE):
+    """
+    Returns (data, new_offset) with raw terminal bytes produced after `offset`.
+    If that output is no longer kept, reading resumes at the oldest kept segment.
+    """
+    index, pos = divmod(offset, SEGMENT_SIZE)
+    path = _segment(shell_id, index)
+    if not os.path.exists(path):
+        prefix = f'{shell_id}.'
+        kept = sorted(
+            int(name[len(prefix):-4]) for name in os.listdir(shell_dir())
+            if name.startswith(prefix) and name.endswith('.out')
+        )
+        newer = [i for i in kept if i > index]
+        if not newer:
+            return b'', offset
+        index, pos = newer[0], 0
+        path = _segment(shell_id, index)
+
+    try:
+        with open(path, 'rb') as f:
+            f.seek(pos)
+            data = f.read(max_bytes)
+    except FileNotFoundError:
+        return b'', offset
+    return data, index * SEGMENT_SIZE + pos + len(data)
@@ -0,0 +1,259 @@
+# monitor/storage.py
+"""
+Metric stores: where raw SystemMetric samples are kept.
+
+    orm     - the SystemMetric table (one row and one index entry per sample)
+    tsfile  - append-only per-server segment files of fixed-width records,
+              read back through numpy.memmap (monitor/tsfile.py, needs numpy)
+
+MONITOR_METRIC_STORE picks one. The collector and ingest write through
+bulk_write (monitor/buffer.py); the charts, rollups, retention and export read
+through the store, so they never know which one is in use. Servers, rollups
+and the per-NIC / per-disk / per-core tables always stay in the database.
+
+The orm store also seals old rows into compressed MetricChunk windows
+(monitor/gorilla.py, see rollups.seal()); its readers merge both.
+"""
+import datetime
+import heapq
+import itertools
+from operator import attrgetter, itemgetter
+
+from django.core.exceptions import ImproperlyConfigured
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Avg, Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour, TruncMinute
+
+from . import gorilla
+from .models import MetricChunk, SystemMetric
+
+METRICS = ('cpu', 'ram', 'disk', 'swap')
+FIELDS = {'cpu': 'cpu_usage', 'ram': 'ram_usage', 'disk': 'disk_usage', 'swap': 'swap_usage'}
+
+TRUNC = {60: TruncMinute, 3600: TruncHour, 86400: TruncDay}
+
+# Period of one MetricChunk (UTC aligned, so chunks of every server line up)
+CHUNK_SECONDS = 3600
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _millis(dt):
+    return (dt - EPOCH) // datetime.timedelta(milliseconds=1)
+
+
+def _window(dt):
+    """Start of the chunk window that contains `dt`."""
+    return EPOCH + datetime.timedelta(seconds=(dt - EPOCH) // datetime.timedelta(seconds=CHUNK_SECONDS) * CHUNK_SECONDS)
+
+
+def chunk_rows(chunk, columns=None):
+    """(timestamp, *values) of a MetricChunk; `columns` are indexes into METRICS (None = all)."""
+    timestamps, values = gorilla.decode(chunk.data, columns)
+    return list(zip((EPOCH + datetime.timedelta(milliseconds=ms) for ms in timestamps), *values))
+
+
+class OrmStore:
+    """Samples as SystemMetric rows (the (server, timestamp) index serves every read)."""
+
+    name = 'orm'
+
+    def _for_servers(self, server_ids):
+        if server_ids is None:
+            return SystemMetric.objects.all()
+        if len(server_ids) == 1:
+            return SystemMetric.objects.filter(server_id=server_ids[0])
+        return SystemMetric.objects.filter(server_id__in=server_ids)
+
+    def _chunks(self, server_ids, start=None, end=None):
+        qs = MetricChunk.objects.all() if server_ids is None else MetricChunk.objects.filter(server_id__in=server_ids)
+        if start is not None:
+            qs = qs.filter(end__gte=start)
+        if end is not None:
+            qs = qs.filter(start__lte=end)
+        return qs
+
+    def write(self, metrics):
+        SystemMetric.objects.bulk_create(metrics, batch_size=500)
+
+    def latest(self, server_ids, count):
+        """Last `count` (timestamp, cpu, ram) of the servers, oldest first."""
+        rows = (self._for_servers(server_ids)
+                .order_by('-timestamp')
+                .values_list('timestamp', 'cpu_usage', 'ram_usage')[:count])
+        rows = list(rows)[::-1]
+        missing = count - len(rows)
+        if missing <= 0:
+            return rows
+
+        # Not enough rows left uncompressed: continue into the newest chunks
+        older, last_start = [], None
+        for chunk in self._chunks(server_ids).order_by('-start').iterator(chunk_size=10):
+            if len(older) >= missing and chunk.start < last_start:
+                break
+            older.extend(chunk_rows(chunk, (0, 1)))
+            last_start = chunk.start
+        return sorted(older + rows, key=itemgetter(0))[-count:]
+
+    def series(self, server_id, start, end):
+        """(timestamp, cpu, ram) between `start` and `end`, oldest first."""
+        rows = (self._for_servers([server_id])
+                .filter(timestamp__gte=start, timestamp__lte=end)
+                .order_by('timestamp')
+                .values_list('timestamp', 'cpu_usage', 'ram_usage'))
+        # Streamed from the cursor in chunks: no model instances, no result cache
+        rows = list(rows.iterator(chunk_size=2000))
+
+        chunks = list(self._chunks([server_id], start, end).order_by('start'))
+        if chunks:
+            # Only the two columns the chart needs are decoded
+            rows.extend(row for chunk in chunks for row in chunk_rows(chunk, (0, 1)) if start <= row[0] <= end)
+            rows.sort(key=itemgetter(0))
+        return rows
+
+    def rows(self, server_ids=None, start=None, end=None, chunk_size=2000):
+        """Yields (server_id, timestamp, cpu, ram, disk, swap) in chronological order."""
+        qs = self._for_servers(server_ids)
+        if start is not None:
+            qs = qs.filter(timestamp__gte=start)
+        if end is not None:
+            qs = qs.filter(timestamp__lte=end)
+        rows = (qs.order_by('timestamp', 'id')
+                .values_list('server_id', 'timestamp', 'cpu_usage', 'ram_usage', 'disk_usage', 'swap_usage')
+                .iterator(chunk_size=chunk_size))
+
+        chunks = self._chunks(server_ids, start, end).order_by('start', 'server_id')
+        if not chunks.exists():
+            return rows
+        return heapq.merge(rows, self._chunk_stream(chunks, start, end), key=itemgetter(1))
+
+    def newest(self, server_ids, before, count):
+        """
+        The `count` newest (server_id, timestamp, cpu, ram, disk, swap, seq), newest first,
+        after the (timestamp, server_id, seq) position `before` in that order (None = from the top).
+        `seq` tells apart samples of one server with the same timestamp (ingest does not
+        deduplicate): the row id, or minus the 1-based position of a sealed sample in its chunk.
+        """
+        qs = self._for_servers(server_ids)
+        chunks = self._chunks(server_ids)
+        if before is not None:
+            timestamp, server_id, seq = before
+            qs = qs.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, server_id__lt=server_id)
+                           | Q(timestamp=timestamp, server_id=server_id, id__lt=seq))
+            chunks = chunks.filter(start__lte=timestamp)
+        rows = list(qs.order_by('-timestamp', '-server_id', '-id')
+                    .values_list('server_id', 'timestamp', 'cpu_usage', 'ram_usage', 'disk_usage', 'swap_usage', 'id')
+                    [:count])
+
+        # Continue into the sealed windows, newest first, until they are all older than the page
+        def key(row):
+            return row[1], row[0], row[6]
+        for chunk in chunks.order_by('-start').iterator(chunk_size=10):
+            if len(rows) >= count and chunk.start + datetime.timedelta(seconds=CHUNK_SECONDS) <= rows[-1][1]:
+                break
+            samples = ((chunk.server_id, *sample, -1 - i) for i, sample in enumerate(chunk_rows(chunk)))
+            rows.extend(row for row in samples if before is None or key(row) < before)
+            rows.sort(key=key, reverse=True)
+            del rows[count:]
+        return rows
+
+    def _chunk_stream(self, chunks, start, end):
+        # Windows are aligned: the chunks of one start hold the same period, before every later one
+        for _, group in itertools.groupby(chunks.iterator(chunk_size=50), key=attrgetter('start')):
+            window = [(chunk.server_id, *row) for chunk in group for row in chunk_rows(chunk)
+                      if (start is None or row[0] >= start) and (end is None or row[0] <= end)]
+            window.sort(key=itemgetter(1))
+            yield from window
+
+    def buckets(self, server_id, resolution, since=None):
+        """
+        Yields (bucket start, aggregates) per `resolution`-seconds bucket, aggregates
+        being samples and {metric}_min / _max / _avg (GROUP BY done by the database).
+        Only rows are read: windows are sealed once the rollups cover them.
+        """
+        qs = self._for_servers([server_id])
+        if since:
+            qs = qs.filter(timestamp__gte=since)
+        qs = qs.annotate(b=TRUNC[resolution]('timestamp', tzinfo=datetime.timezone.utc)).values('b')
+        aggregates = {'samples': Count('id')}
+        for metric, field in FIELDS.items():
+            aggregates[f'{metric}_min'] = Min(field)
+            aggregates[f'{metric}_max'] = Max(field)
+            aggregates[f'{metric}_avg'] = Avg(field)
+
+        # Aliases must not clash with the MetricRollup field names
+        aliases = {f'agg_{name}': expression for name, expression in aggregates.items()}
+        for row in qs.annotate(**aliases).order_by('b'):
+            yield row['b'], {name: row[f'agg_{name}'] for name in aggregates}
+
+    def prune(self, server_id, cutoff):
+        """Deletes the samples older than `cutoff` (whole chunks only). Returns how many were deleted."""
+        count, _ = self._for_servers([server_id]).filter(timestamp__lt=cutoff).delete()
+        chunks = self._chunks([server_id]).filter(end__lt=cutoff)
+        count += chunks.aggregate(samples=Sum('samples'))['samples'] or 0
+        chunks.delete()
+        return count
+
+    def seal(self, server_id, before):
+        """
+        Compresses the rows of every closed CHUNK_SECONDS window before `before`
+        into one MetricChunk (merged with the window's chunk if rows arrived late)
+        and deletes them. Returns (samples, chunks) written.
+        """
+        before = _window(before)
+        rows = self._for_servers([server_id]).filter(timestamp__lt=before)
+        alias = router.db_for_write(MetricChunk)
+        sealed = written = 0
+
+        oldest = rows.order_by('timestamp').values_list('timestamp', flat=True).first()
+        while oldest is not None:
+            start = _window(oldest)
+            end = start + datetime.timedelta(seconds=CHUNK_SECONDS)
+            # One short transaction per window: the collector keeps writing meanwhile
+            with transaction.atomic(using=alias):
+                window = list(rows.filter(timestamp__gte=start, timestamp__lt=end)
+                              .order_by('timestamp', 'id')
+                              .values_list('id', 'timestamp', 'cpu_usage', 'ram_usage', 'disk_usage', 'swap_usage'))
+                samples = [row[1:] for row in window]
+                existing = MetricChunk.objects.filter(server_id=server_id, start=start).first()
+                if existing is not None:
+                    samples = sorted(chunk_rows(existing) + samples, key=itemgetter(0))
+
+                timestamps, *columns = zip(*samples)
+                MetricChunk.objects.update_or_create(server_id=server_id, start=start, defaults={
+                    'end': timestamps[-1],
+                    'samples': len(samples),
+                    'data': gorilla.encode([_millis(ts) for ts in timestamps], *map(list, columns)),
+                })
+                rows.filter(timestamp__gte=start, timestamp__lt=end, id__lte=max(row[0] for row in window)).delete()
+            sealed += len(window)
+            written += 1
+            oldest = rows.filter(timestamp__gte=end).order_by('timestamp').values_list('timestamp', flat=True).first()
+        return sealed, written
+
+    def drop(self, server_id):
+        # Rows and chunks go with the Server (on_delete=CASCADE)
+        pass
+
+
+_store = None
+
+
+def get_store():
+    """The configured store (one instance per process)."""
+    global _store
+    if _store is None:
+        choice = getattr(settings, 'MONITOR_METRIC_STORE', 'orm')
+        if choice == 'orm':
+            _store = OrmStore()
+        elif choice == 'tsfile':
+            from .tsfile import TSFileStore
+            _store = TSFileStore(settings.MONITOR_TSFILE_DIR)
+        else:
+            raise ImproperlyConfigured(f"MONITOR_METRIC_STORE must be 'orm' or 'tsfile', not '{choice}'")
+    return _store
+
+
+def server_deleted(sender, instance, **kwargs):
+    """post_delete of Server: the samples of a file store are not covered by the CASCADE."""
+    get_store().drop(instance.pk)
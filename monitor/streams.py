@@ -0,0 +1,137 @@
+# monitor/streams.py
+"""
+Server-Sent Events fan-out for the live pages (ASGI only).
+
+Each topic (metrics, chart, processes...) has ONE producer task per worker
+that renders a frame every few seconds while somebody is listening. The frame
+is pushed to every subscribed tab, so the per-viewer cost is writing one
+already-serialized message instead of a full Django request cycle.
+"""
+import asyncio
+import logging
+
+from django.utils import translation
+
+from .executors import run_blocking
+
+logger = logging.getLogger('monitor')
+
+# Seconds without frames before sending an SSE comment (keeps proxies from closing the connection)
+HEARTBEAT = 15
+
+
+def format_event(topic, data):
+    """Encodes one SSE message. Multi-line payloads need one 'data:' line each."""
+    lines = ''.join(f'data: {line}\n' for line in (data.splitlines() or ['']))
+    return f'event: {topic}\n{lines}\n'
+
+
+class Subscriber:
+    """One open tab. Keeps only the newest frame per topic (slow clients skip frames)."""
+
+    def __init__(self):
+        self.latest = {}
+        self.ready = asyncio.Event()
+
+    def push(self, topic, frame):
+        self.latest[topic] = frame
+        self.ready.set()
+
+    async def next_frames(self, timeout):
+        """Waits for new frames. Returns {topic: frame} ({} on timeout)."""
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return {}
+        self.ready.clear()
+        frames, self.latest = self.latest, {}
+        return frames
+
+
+class Channel:
+    """Produces the frames of one topic (in one language) while it has subscribers."""
+
+    def __init__(self, topic, interval, producer, language):
+        self.topic = topic
+        self.interval = interval
+        self.producer = producer
+        self.language = language
+        self.subscribers = set()
+        self.last_frame = None
+        self.task = None
+
+    def add(self, subscriber):
+        self.subscribers.add(subscriber)
+        # New tabs get the current frame right away instead of waiting a tick
+        if self.last_frame is not None:
+            subscriber.push(self.topic, self.last_frame)
+        if self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self.run())
+
+    def remove(self, subscriber):
+        self.subscribers.discard(subscriber)
+        if not self.subscribers and self.task is not None:
+            self.task.cancel()
+            self.task = None
+            self.last_frame = None
+
+    def render(self):
+        # Partials are rendered once for everybody, in the subscribers' language
+        with translation.override(self.language):
+            return self.producer()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while self.subscribers:
+            started = loop.time()
+            try:
+                # Producers touch psutil / the ORM: run them outside the event loop
+                frame = await run_blocking(self.render)
+            except Exception as e:
+                logger.error(f"Stream producer '{self.topic}' failed: {e}")
+                frame = None
+
+            # Unchanged frames are not sent again
+            if frame is not None and frame != self.last_frame:
+                self.last_frame = frame
+                for subscriber in list(self.subscribers):
+                    subscriber.push(self.topic, frame)
+
+            await asyncio.sleep(max(0.0, self.interval - (loop.time() - started)))
+
+
+class StreamHub:
+    """Registry of channels: {topic: (interval, producer)}."""
+
+    def __init__(self, topics):
+        self.topics = topics
+        self.channels = {}
+
+    def channel(self, topic, language):
+        # Keyed by event loop too: channel tasks cannot outlive the loop they run on
+        key = (topic, language, id(asyncio.get_running_loop()))
+        if key not in self.channels:
+            interval, producer = self.topics[topic]
+            self.channels[key] = Channel(topic, interval, producer, language)
+        return self.channels[key]
+
+    async def stream(self, topics, language):
+        """Async generator of SSE messages for one client. Unsubscribes on disconnect."""
+        subscriber = Subscriber()
+        channels = [self.channel(topic, language) for topic in topics]
+        for channel in channels:
+            channel.add(subscriber)
+
+        try:
+            # Ask the browser to wait 5s before reconnecting if the stream drops
+            yield 'retry: 5000\n\n'
+            while True:
+                frames = await subscriber.next_frames(HEARTBEAT)
+                if not frames:
+                    yield ': ping\n\n'
+                    continue
+                for topic, frame in frames.items():
+                    yield format_event(topic, frame)
+        finally:
+            for channel in channels:
+                channel.remove(subscriber)
@@ -1,3 +1,854 @@
-from django.test import TestCase
+import datetime
+import gzip
+import json
+import math
+import os
+import struct
+import subprocess
+import tempfile
+import time
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from . import gorilla, ingest, jobs, lttb, process_actions, shells
+from .agent import AgentServer, ServeBuffer
+from .buffer import MetricBuffer
+from .collectors import ProcSample, PsutilBackend, procfs_available
+from .models import MetricChunk, Server, SystemMetric
+from .poller import Poller, PullError
+from .process_snapshot import PAGE_SORTS, CursorError, ProcessSnapshotter, encode_cursor
+from .storage import EPOCH, OrmStore, chunk_rows
+from .tsfile import TSFileStore
+from .views import _chart_payload, _range_params
+
+
+def _words(values):
+    return [struct.unpack('>Q', struct.pack('>d', v))[0] for v in values]
+
+
+class ListBuffer(MetricBuffer):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = []
+
+    def write(self, instances):
+        self.batches.append(list(instances))
+
+
+class MetricBufferTests(SimpleTestCase):
+    def test_batch_size_counts_rows(self):
+        clock = [0.0]
+        buffer = ListBuffer(batch_size=5, flush_interval=30, clock=lambda: clock[0])
+        buffer.add(1, 2)
+        buffer.add(3)
+        self.assertEqual(buffer.batches, [])
+        # One tick with a row per NIC fills the batch
+        buffer.add(4, 5, 6)
+        self.assertEqual(buffer.batches, [[1, 2, 3, 4, 5, 6]])
+        self.assertEqual(len(buffer), 0)
+
+    def test_flush_interval(self):
+        clock = [0.0]
+        buffer = ListBuffer(batch_size=100, flush_interval=30, clock=lambda: clock[0])
+        buffer.add(1)
+        clock[0] = 29.9
+        self.assertFalse(buffer.is_due())
+        clock[0] = 30
+        buffer.add(2)
+        self.assertEqual(buffer.batches, [[1, 2]])
+
+    def test_failed_write_is_kept_and_capped(self):
+        class FailingBuffer(MetricBuffer):
+            def write(self, instances):
+                raise OSError('database is locked')
+
+        buffer = FailingBuffer(batch_size=2, max_pending=5)
+        with self.assertLogs('monitor', 'WARNING'):
+            for i in range(8):
+                buffer.add(i)
+        # The oldest rows go first
+        self.assertEqual(buffer.pending, [3, 4, 5, 6, 7])
+
+
+class CollectMetricsOptionsTests(SimpleTestCase):
+    def test_intervals_are_validated(self):
+        for option, value in (('cpu_interval', 0), ('record_interval', -5), ('network_interval', -1)):
+            with self.subTest(option=option), self.assertRaisesMessage(CommandError, 'interval must be'):
+                call_command('collect_metrics', **{option: value})
+
+
+class LttbTests(SimpleTestCase):
+    def setUp(self):
+        self.x = list(range(1000))
+        # Flat series with one spike and one dip
+        self.y = [10.0] * 1000
+        self.y[321], self.y[777] = 95.0, 0.0
+
+    def test_small_thresholds(self):
+        self.assertEqual(lttb.lttb_indices(self.x[:5], self.y[:5], 5), [0, 1, 2, 3, 4])
+        self.assertEqual(lttb.lttb_indices(self.x[:5], self.y[:5], 50), [0, 1, 2, 3, 4])
+        self.assertEqual(lttb.lttb_indices(self.x, self.y, 2), [0, 999])
+        self.assertEqual(lttb.lttb_indices(self.x, self.y, 1), [0])
+        self.assertEqual(lttb.lttb_indices(self.x, self.y, 0), [])
+        self.assertEqual(lttb.lttb_indices([], [], 10), [])
+
+    def test_keeps_endpoints_and_extremes(self):
+        for name, function in (('numpy', lttb.lttb_indices), ('python', lttb._lttb_python)):
+            with self.subTest(name):
+                kept = function(self.x, self.y, 50)
+                self.assertEqual(len(kept), 50)
+                self.assertEqual((kept[0], kept[-1]), (0, 999))
+                self.assertEqual(kept, sorted(set(kept)))
+                self.assertIn(321, kept)
+                self.assertIn(777, kept)
+
+    @skipIf(lttb.np is None, 'numpy is not installed')
+    def test_numpy_and_python_agree(self):
+        y = [(i * 7919) % 101 / 3 for i in range(777)]
+        x = [i * 5.0 + (i % 3) * 0.01 for i in range(777)]
+        self.assertEqual(lttb._lttb_numpy(lttb.np.asarray(x), lttb.np.asarray(y), 40),
+                         lttb._lttb_python(x, y, 40))
+
+    def test_downsample_merges_series(self):
+        flat = [50.0] * 1000
+        kept = lttb.downsample(self.x, [flat, self.y], 40)
+        # The spike of the second series survives even though the first is flat
+        self.assertIn(321, kept)
+        self.assertLessEqual(len(kept), 40)
+        self.assertEqual(lttb.downsample(self.x[:30], [flat[:30]], 40), list(range(30)))
+
+
+class RangeParamsTests(SimpleTestCase):
+    def test_defaults(self):
+        server, start, end, max_points = _range_params({})
+        self.assertEqual(server, 'Localhost')
+        self.assertEqual(end - start, datetime.timedelta(hours=1))
+        self.assertEqual(max_points, 500)
+        self.assertEqual(_range_params({}, default_points=120)[3], 120)
+
+    def test_explicit_range(self):
+        query = {'server': 'web', 'start': '2026-01-01T00:00:00Z', 'end': '1767229200', 'max_points': '100000'}
+        server, start, end, max_points = _range_params(query)
+        self.assertEqual(server, 'web')
+        self.assertEqual(start, datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc))
+        self.assertEqual(end - start, datetime.timedelta(hours=1))
+        self.assertEqual(max_points, 5000)  # Clamped to MAX_POINTS_LIMIT
+        self.assertEqual(_range_params({'max_points': '1'})[3], 3)
+        # range counts back from end
+        _, start, end, _ = _range_params({'end': '1767229200', 'range': '60'})
+        self.assertEqual(end - start, datetime.timedelta(minutes=1))
+
+    def test_invalid_input(self):
+        for query, message in (
+            ({'max_points': 'many'}, 'must be integers'),
+            ({'range': '1.5'}, 'must be integers'),
+            ({'range': '0'}, 'positive'),
+            ({'range': '-60'}, 'positive'),
+            ({'start': 'yesterday'}, 'ISO 8601'),
+            ({'end': ''}, 'ISO 8601'),
+            ({'start': '1767229200', 'end': '1767229200'}, 'before end'),
+            ({'start': '2026-01-02T00:00:00Z', 'end': '2026-01-01T00:00:00Z'}, 'before end'),
+        ):
+            with self.subTest(query=query), self.assertRaisesMessage(ValueError, message):
+                _range_params(query)
+
+    def test_chart_endpoint_returns_400(self):
+        payload, status = _chart_payload({'range': 'abc'})
+        self.assertEqual(status, 400)
+        self.assertEqual(payload, {'error': 'max_points and range must be integers'})
+
+
+@skipUnless(jobs.IS_POSIX, 'job directories are only checked on POSIX')
+class JobDirTestCase(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = os.path.join(tmp.name, 'jobs')
+        settings = override_settings(MONITOR_JOB_DIR=self.dir, MONITOR_COMMAND_TIMEOUT=10)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def assertPrivate(self, directory):
+        self.assertEqual(os.stat(directory).st_mode & 0o777, 0o700)
+        for entry in os.scandir(directory):
+            if entry.is_file():
+                self.assertEqual(entry.stat().st_mode & 0o777, 0o600, entry.name)
+
+
+class JobTests(JobDirTestCase):
+
+    def wait(self, job_id):
+        for _ in range(100):
+            meta = jobs.get_job(job_id)
+            if meta['status'] != jobs.RUNNING:
+                return meta
+            time.sleep(0.05)
+        self.fail('job still running')
+
+    def test_files_are_private(self):
+        meta = self.wait(jobs.start_job('echo hello', self.dir, 'admin')['id'])
+        self.assertEqual((meta['status'], meta['exit_code']), (jobs.FINISHED, 0))
+        self.assertEqual(jobs.read_output(meta['id'], 0), ('hello\n', 6))
+        self.assertPrivate(self.dir)
+
+    def test_shared_directory_is_refused(self):
+        jobs.job_dir()
+        os.chmod(self.dir, 0o755)
+        with self.assertRaisesMessage(jobs.JobError, 'chmod 700'):
+            jobs.job_dir()
+
+    def test_cancel(self):
+        meta = jobs.start_job('echo started; sleep 30', self.dir, 'admin')
+        with self.assertRaises(jobs.JobError):
+            jobs.cancel_job(meta['id'], 'someone else')
+        jobs.cancel_job(meta['id'], 'admin')
+        self.assertEqual(self.wait(meta['id'])['status'], jobs.CANCELLED)
+
+    def test_reused_pid_is_not_signalled(self):
+        meta = jobs.start_job('sleep 30', self.dir, 'admin')
+        self.addCleanup(jobs.kill_recorded, meta, jobs.signal.SIGKILL)
+        # Metadata naming the same pid with another start time: a different process
+        jobs.kill_recorded(dict(meta, created=meta['created'] - 1), jobs.signal.SIGKILL)
+        time.sleep(0.2)
+        self.assertEqual(jobs.get_job(meta['id'])['status'], jobs.RUNNING)
+        jobs.kill_recorded(meta, jobs.signal.SIGKILL)
+        self.assertEqual(self.wait(meta['id'])['status'], jobs.FINISHED)
+
+    def test_invalid_ids(self):
+        for job_id in ('../../etc/passwd', '', 'ABCDEF123456', None):
+            with self.assertRaises(jobs.JobError):
+                jobs.read_output(job_id, 0)
+
+
+class ShellTests(JobDirTestCase):
+    def read_until(self, shell_id, text):
+        output, offset = b'', 0
+        for _ in range(100):
+            data, offset = shells.read_output(shell_id, offset)
+            output += data
+            if text in output:
+                return output
+            time.sleep(0.05)
+        self.fail(f'{text!r} not in {output!r}')
+
+    def wait_closed(self, shell_id):
+        for _ in range(100):
+            if shells.get_shell(shell_id)['status'] != shells.RUNNING:
+                return
+            time.sleep(0.05)
+        self.fail('shell still running')
+
+    def test_session(self):
+        meta = shells.open_shell('admin', 'session-1', self.dir)
+        self.addCleanup(jobs.kill_recorded, meta, jobs.signal.SIGKILL)
+        # Same browser session: the running shell is reattached
+        self.assertEqual(shells.open_shell('admin', 'session-1', self.dir)['id'], meta['id'])
+
+        shells.write_input(meta['id'], 'admin', 'export GREETING=hel; echo "$GREETING"lo\n')
+        self.read_until(meta['id'], b'hello')
+        self.assertPrivate(os.path.join(self.dir, 'shells'))
+
+        with self.assertRaises(shells.ShellError):
+            shells.close_shell(meta['id'], 'someone else')
+        shells.close_shell(meta['id'], 'admin')
+        self.wait_closed(meta['id'])
+
+    def test_reused_pid_is_not_hung_up(self):
+        meta = shells.open_shell('admin', 'session-2', self.dir)
+        self.addCleanup(jobs.kill_recorded, meta, jobs.signal.SIGKILL)
+        stale = dict(meta, created=meta['created'] - 1)
+        with mock.patch.object(shells, 'get_shell', return_value=stale):
+            shells.close_shell(meta['id'], 'admin')
+        time.sleep(0.2)
+        self.assertEqual(shells.get_shell(meta['id'])['status'], shells.RUNNING)
+        shells.close_shell(meta['id'], 'admin')
+        self.wait_closed(meta['id'])
+
+
+class FakeProcesses:
+    """Collector backend with a scripted process table: {pid: (name, cpu_time, rss, start)}."""
+
+    def __init__(self):
+        self.table = {}
+
+    def processes(self):
+        return [ProcSample(pid, name, 'root', 'running', cpu_time, rss, start)
+                for pid, (name, cpu_time, rss, start) in self.table.items()]
+
+    def total_memory(self):
+        return 1000
+
+
+class ProcessSnapshotTests(SimpleTestCase):
+    def setUp(self):
+        self.now = [100.0]
+        self.backend = FakeProcesses()
+        self.snapshotter = ProcessSnapshotter(min_interval=2, clock=lambda: self.now[0], backend=self.backend)
+
+    def test_cpu_is_the_delta_since_the_previous_refresh(self):
+        self.backend.table = {1: ('init', 10.0, 100, 1.0), 2: ('web', 50.0, 250, 2.0)}
+        records = self.snapshotter.snapshot()
+        # First reading of a process: no previous CPU time yet
+        self.assertEqual((records[1].cpu_percent, records[2].cpu_percent), (0.0, 0.0))
+        self.assertEqual(records[2].memory_percent, 25.0)
+
+        self.now[0] += 4
+        self.backend.table = {1: ('init', 10.0, 100, 1.0), 2: ('web', 53.0, 250, 2.0)}
+        records = self.snapshotter.snapshot()
+        self.assertEqual((records[1].cpu_percent, records[2].cpu_percent), (0.0, 75.0))
+        self.assertEqual(self.snapshotter.last_diff, {'new': 0, 'exited': 0, 'changed': 1})
+        # Unchanged rows keep the generation they last changed in
+        self.assertEqual((records[1].version, records[2].version), (1, 2))
+
+    def test_refreshes_are_rate_limited(self):
+        self.backend.table = {1: ('init', 10.0, 100, 1.0)}
+        self.snapshotter.snapshot()
+        self.backend.table = {1: ('init', 11.0, 100, 1.0)}
+        self.now[0] += 1.9
+        self.snapshotter.snapshot()
+        self.assertEqual(self.snapshotter.generation, 1)
+        self.now[0] += 0.1
+        self.snapshotter.snapshot()
+        self.assertEqual(self.snapshotter.generation, 2)
+        self.assertEqual(self.snapshotter.records[1].cpu_percent, 50.0)
+
+    def test_reused_pid_starts_over(self):
+        self.backend.table = {7: ('old', 500.0, 100, 1.0), 8: ('gone', 1.0, 100, 1.0)}
+        self.snapshotter.snapshot()
+        self.now[0] += 2
+        # Same pid, another start time: not a 100% CPU jump of the old process
+        self.backend.table = {7: ('new', 0.5, 100, 99.0)}
+        records = self.snapshotter.snapshot()
+        self.assertEqual((records[7].name, records[7].cpu_percent), ('new', 0.0))
+        self.assertEqual(self.snapshotter.last_diff, {'new': 1, 'exited': 1, 'changed': 0})
+
+    def test_negative_delta_is_clamped(self):
+        self.backend.table = {1: ('init', 10.0, 100, 1.0)}
+        self.snapshotter.snapshot()
+        self.now[0] += 2
+        self.backend.table = {1: ('init', 9.0, 100, 1.0)}
+        self.assertEqual(self.snapshotter.snapshot()[1].cpu_percent, 0.0)
+
+    def test_top(self):
+        self.backend.table = {pid: (f'p{pid}', 0.0, pid * 10, 1.0) for pid in range(1, 21)}
+        top = self.snapshotter.top(3, 'mem')
+        self.assertEqual([p.pid for p in top], [20, 19, 18])
+        self.assertIs(self.snapshotter.top(3, 'mem'), top)
+
+
+class ProcessPageTests(SimpleTestCase):
+    def setUp(self):
+        self.now = [100.0]
+        self.backend = FakeProcesses()
+        # Many ties: 5 memory values, 3 names for 47 processes
+        self.backend.table = {pid: (('nginx', 'Python', 'bash')[pid % 3], 0.0, (pid % 5) * 10, 1.0)
+                              for pid in range(100, 147)}
+        self.snapshotter = ProcessSnapshotter(min_interval=2, clock=lambda: self.now[0], backend=self.backend)
+
+    def walk(self, **kwargs):
+        pids, cursor = [], None
+        while True:
+            page = self.snapshotter.page(cursor=cursor, limit=10, **kwargs)
+            pids.extend(p.pid for p in page.rows)
+            if page.next_cursor is None:
+                return pids, page
+            cursor = page.next_cursor
+
+    def test_every_row_once_in_order(self):
+        for sort in ('cpu', 'mem', 'pid', 'name'):
+            for descending in (False, True):
+                with self.subTest(sort=sort, descending=descending):
+                    pids, page = self.walk(sort=sort, descending=descending)
+                    self.assertEqual(sorted(pids), list(range(100, 147)))
+                    key = lambda pid: PAGE_SORTS[sort][0](self.snapshotter.records[pid])
+                    self.assertEqual(pids, sorted(pids, key=key, reverse=descending))
+                    self.assertEqual(page.total, 47)
+
+    def test_filters(self):
+        pids, _ = self.walk(sort='pid', search=' PYTHON ')
+        self.assertEqual(pids, [pid for pid in range(100, 147) if pid % 3 == 1])
+        self.assertEqual(self.walk(sort='pid', search='123')[0], [123])
+        self.assertEqual(self.walk(sort='pid', username='nobody')[0], [])
+
+    def test_cursor_survives_a_refresh(self):
+        first = self.snapshotter.page(sort='pid', limit=10)
+        self.now[0] += 5
+        # Rows before the cursor exit, one appears before it, one after it
+        for pid in range(100, 105):
+            del self.backend.table[pid]
+        self.backend.table[1] = ('early', 0.0, 0, 5.0)
+        self.backend.table[500] = ('late', 0.0, 0, 5.0)
+        second = self.snapshotter.page(sort='pid', cursor=first.next_cursor, limit=10)
+        self.assertGreater(second.generation, first.generation)
+        self.assertEqual([p.pid for p in second.rows], list(range(110, 120)))
+
+    def test_invalid_cursors(self):
+        page = self.snapshotter.page(sort='mem', limit=10)
+        for cursor, sort in (
+            ('not base64!', 'mem'),
+            ('bm90IGpzb24', 'mem'),  # "not json"
+            (page.next_cursor, 'cpu'),  # Another sort
+            (encode_cursor('mem', True, ['high', 'text']), 'mem'),  # Wrong key shape
+        ):
+            with self.subTest(cursor=cursor), self.assertRaises(CursorError):
+                self.snapshotter.page(sort=sort, cursor=cursor)
+        with self.assertRaises(CursorError):
+            self.snapshotter.page(sort='mem', descending=False, cursor=page.next_cursor)
+        with self.assertRaises(KeyError):
+            self.snapshotter.page(sort='size')
+
+
+@skipUnless(jobs.IS_POSIX, 'signals are POSIX')
+class ProcessActionTests(SimpleTestCase):
+    def start(self):
+        proc = subprocess.Popen(['sleep', '30'])
+        self.addCleanup(proc.wait)
+        self.addCleanup(proc.kill)
+        return proc
+
+    def test_start_times_match_the_snapshot(self):
+        proc = self.start()
+        backends = [PsutilBackend()]
+        if procfs_available():
+            from .procfs import ProcfsBackend
+            backends.append(ProcfsBackend())
+        for backend in backends:
+            with self.subTest(backend.name):
+                sample = next(s for s in backend.processes() if s.pid == proc.pid)
+                self.assertEqual(backend.start_time(proc.pid), sample.start)
+                self.assertIsNone(backend.start_time(2 ** 22 + 1))
+
+    def test_reused_pid_is_not_signalled(self):
+        proc = self.start()
+        targets = process_actions.select_targets([proc.pid])
+        self.assertIsNotNone(targets[proc.pid])
+        # The process the user selected is gone and another one got its PID
+        stale = {proc.pid: targets[proc.pid] - 1}
+        self.assertEqual(process_actions.signal_processes(stale, 'KILL'), {proc.pid: process_actions.GONE})
+        self.assertIsNone(proc.poll())
+
+        with self.assertLogs('monitor', 'INFO'):
+            results = process_actions.signal_processes(targets, 'TERM', timeout=5)
+        self.assertEqual(results, {proc.pid: process_actions.TERMINATED})
+
+    def test_protected_and_missing_pids(self):
+        targets = process_actions.select_targets([os.getpid(), 2 ** 22 + 1])
+        self.assertEqual(process_actions.signal_processes(targets, 'TERM'), {
+            os.getpid(): process_actions.PROTECTED, 2 ** 22 + 1: process_actions.GONE,
+        })
+        with self.assertRaises(process_actions.ActionError):
+            process_actions.select_targets()
+        with self.assertRaises(process_actions.ActionError):
+            process_actions.resolve_signal('SEGV')
+
+
+class IngestApiTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.server = Server.objects.create(name='ingest-test', ip_address='10.0.0.12')
+        self.token = ingest.issue_token(self.server)
+        self.ts = datetime.datetime(2026, 1, 1, 10, tzinfo=datetime.timezone.utc).timestamp()
+
+    def batch(self, rows=1):
+        return {'v': ingest.VERSION, 'system': [[self.ts + i, 10.0, 50.0, 40.0, None] for i in range(rows)]}
+
+    def post(self, body, token=None, encoding='gzip'):
+        headers = {'HTTP_HOST': 'localhost', 'secure': True}
+        if token is not False:
+            headers['HTTP_AUTHORIZATION'] = f'Bearer {token or self.token}'
+        if encoding:
+            headers['HTTP_CONTENT_ENCODING'] = encoding
+        return self.client.post(reverse('agent_ingest'), body, content_type='application/json', **headers)
+
+    def test_batch_is_saved(self):
+        response = self.post(ingest.dumps(self.batch(3)))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'saved': 3, 'active': True})
+        self.assertEqual(SystemMetric.objects.filter(server=self.server).count(), 3)
+
+    def test_plain_json_is_accepted(self):
+        response = self.post(json.dumps(self.batch()), encoding=None)
+        self.assertEqual(response.status_code, 200)
+
+    def test_token_is_required(self):
+        body = ingest.dumps(self.batch())
+        self.assertEqual(self.post(body, token=False).status_code, 401)
+        self.assertEqual(self.post(body, token='not-a-token').status_code, 401)
+        # Only the hash is stored, and revoking it locks the agent out
+        self.assertNotEqual(Server.objects.get(id=self.server.id).agent_token, self.token)
+        ingest.revoke_token(self.server)
+        self.assertEqual(self.post(body).status_code, 401)
+        self.assertFalse(SystemMetric.objects.exists())
+
+    def test_invalid_bodies_are_rejected(self):
+        self.assertEqual(self.post(b'not gzip at all').status_code, 400)
+        self.assertEqual(self.post(gzip.compress(b'{"v": 1')).status_code, 400)
+        self.assertEqual(self.post(gzip.compress(b'{"v": 1, "system": [[0, NaN, 1, 1, 1]]}')).status_code, 400)
+        self.assertEqual(self.post(ingest.dumps({'v': ingest.VERSION + 1})).status_code, 400)
+        self.assertEqual(self.post(ingest.dumps(self.batch()), encoding='br').status_code, 400)
+
+    def test_one_bad_row_rejects_the_whole_batch(self):
+        payload = self.batch(3)
+        payload['system'].append([self.ts, 'high', 50.0, 40.0, None])
+        response = self.post(ingest.dumps(payload))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('system[3]', response.json()['error'])
+        self.assertFalse(SystemMetric.objects.exists())
+
+    def test_batches_over_the_limit_are_refused(self):
+        payload = self.batch(50)
+        size = len(json.dumps(payload, separators=(',', ':')))
+        with override_settings(MONITOR_INGEST_MAX_BYTES=size - 1):
+            # Compressed it is small, inflated it is not
+            self.assertEqual(self.post(ingest.dumps(payload)).status_code, 413)
+            self.assertEqual(self.post(json.dumps(payload), encoding=None).status_code, 413)
+        with override_settings(MONITOR_INGEST_MAX_BYTES=1024):
+            bomb = gzip.compress(b'{"v": 1, "os_info": "' + b' ' * 10 ** 6 + b'"}')
+            self.assertEqual(self.post(bomb).status_code, 413)
+        with override_settings(MONITOR_INGEST_MAX_BYTES=size):
+            self.assertEqual(self.post(ingest.dumps(payload)).status_code, 200)
+
+    def test_disabled_server_drops_the_batch(self):
+        self.server.is_active = False
+        self.server.save()
+        response = self.post(ingest.dumps(self.batch()))
+        self.assertEqual(response.json(), {'saved': 0, 'active': False})
+        self.assertFalse(SystemMetric.objects.exists())
+
+
+class ServeBufferTests(SimpleTestCase):
+    def setUp(self):
+        self.buffer = ServeBuffer(max_pending=100)
+        self.at = datetime.datetime(2026, 1, 1, 10, tzinfo=datetime.timezone.utc)
+
+    def add(self, *cpus):
+        for cpu in cpus:
+            self.buffer.add(SystemMetric(timestamp=self.at, cpu_usage=cpu, ram_usage=50.0, disk_usage=40.0))
+
+    def drain(self, ack=None):
+        payload = self.buffer.drain(ack)
+        return [row[1] for row in payload.get('system', [])], payload['seq']
+
+    def test_batches_are_sent_again_until_acknowledged(self):
+        self.add(1.0, 2.0)
+        cpus, seq = self.drain()
+        self.assertEqual(cpus, [1.0, 2.0])
+        # The pull timed out: the next one (no ack) gets the same batch, same seq
+        self.assertEqual(self.drain(), (cpus, seq))
+
+        self.add(3.0)
+        cpus, next_seq = self.drain(seq)
+        self.assertEqual(cpus, [3.0])
+        self.assertNotEqual(next_seq, seq)
+        self.assertEqual(self.drain(next_seq), ([], next_seq))
+
+    def test_ack_drops_only_the_batches_it_names(self):
+        self.add(1.0)
+        _, first = self.drain()
+        self.add(2.0)
+        cpus, second = self.drain()  # The ack of the first pull was lost
+        self.assertEqual(cpus, [1.0, 2.0])
+        self.add(3.0)
+        self.assertEqual(self.drain(first)[0], [2.0, 3.0])
+        self.assertEqual(self.drain(second)[0], [3.0])
+
+    def test_acks_of_another_run_are_ignored(self):
+        self.add(1.0)
+        _, seq = self.drain()
+        number = seq.partition('.')[2]
+        # Sent to an agent that restarted since, or garbage
+        for ack in (f'{ServeBuffer().run}.{number}', number, f'{self.buffer.run}.x', ''):
+            self.assertEqual(self.drain(ack)[0], [1.0])
+
+    def test_max_pending_drops_the_oldest_batches(self):
+        self.buffer.max_pending = 3
+        self.add(1.0, 2.0)
+        self.drain()
+        self.add(3.0, 4.0)
+        with self.assertLogs('monitor', 'WARNING'):
+            self.assertEqual(self.drain()[0], [3.0, 4.0])
+        self.add(5.0, 6.0, 7.0)
+        with self.assertLogs('monitor', 'WARNING'):
+            self.assertEqual(self.drain()[0], [5.0, 6.0, 7.0])
+        self.assertEqual(len(self.buffer.unacked), 1)
+
+    def test_pull_over_http(self):
+        agent = AgentServer(('127.0.0.1', 0), 'pull-token', self.buffer.drain)
+        agent.start()
+        poller = Poller('pull-token', concurrency=1, timeout=5.0)
+        server = Server(name='agent', ip_address='127.0.0.1', agent_port=agent.server_address[1])
+        try:
+            self.add(1.0)
+            payload = poller.fetch_http(server)
+            self.assertEqual([row[1] for row in payload['system']], [1.0])
+            self.add(2.0)
+            payload = poller.fetch_http(server, payload['seq'])
+            self.assertEqual([row[1] for row in payload['system']], [2.0])
+
+            with self.assertRaisesRegex(PullError, '401'):
+                Poller('wrong-token', concurrency=1).fetch_http(server)
+            # A refused pull does not drain anything
+            self.assertEqual(len(self.buffer.unacked), 1)
+        finally:
+            poller.close()
+            agent.shutdown()
+            agent.server_close()
+
+
+class GorillaTimestampTests(SimpleTestCase):
+    def roundtrip(self, timestamps):
+        decoded, columns = gorilla.decode(gorilla.encode(timestamps))
+        self.assertEqual(decoded, timestamps)
+        self.assertEqual(columns, [])
+
+    def test_regular_tick_costs_one_bit(self):
+        timestamps = [1_700_000_000_000 + 5000 * i for i in range(1001)]
+        self.roundtrip(timestamps)
+        # 64 bits for the first timestamp, '1111' + 64 for the first delta, then 1 bit per sample
+        self.assertEqual(len(gorilla._encode_timestamps(timestamps)), (64 + 68 + 999 + 7) // 8)
+
+    def test_jitter(self):
+        base, timestamps = 1_700_000_000_000, []
+        for i, jitter in enumerate([0, 3, -2, 17, -40, 1, 0, 0, -1]):
+            timestamps.append(base + 5000 * i + jitter)
+        self.roundtrip(timestamps)
+
+    def test_every_delta_of_delta_bucket(self):
+        # Edges of the 7, 9 and 12 bit buckets, then values needing the 64-bit escape
+        dods = [0, -64, 63, -65, 64, -256, 255, -257, 256, -2048, 2047, -2049, 2048,
+                10 ** 12, -(10 ** 12), 2 ** 40, -(2 ** 40)]
+        timestamps, ts, delta = [1_700_000_000_000], 1_700_000_000_000, 5000
+        for dod in dods:
+            delta += dod
+            ts += delta
+            timestamps.append(ts)
+        self.roundtrip(timestamps)
+
+    def test_negative_and_single_timestamps(self):
+        self.roundtrip([-86_400_000, -1, 0, 1])
+        self.roundtrip([1_700_000_000_000])
+        self.roundtrip([])
+
+
+class GorillaValueTests(SimpleTestCase):
+    def roundtrip(self, values):
+        timestamps = list(range(len(values)))
+        _, (decoded,) = gorilla.decode(gorilla.encode(timestamps, values))
+        self.assertEqual(len(decoded), len(values))
+        for original, value in zip(values, decoded):
+            if original is None or (isinstance(original, float) and math.isnan(original)):
+                self.assertIsNone(value)
+            else:
+                # Bit for bit (tells 0.0 from -0.0)
+                self.assertEqual(_words([value]), _words([original]))
+        return decoded
+
+    def test_steady_and_changing_values(self):
+        self.roundtrip([42.0] * 50)
+        self.roundtrip([12.3, 12.4, 99.9, 0.0, 100.0, 35.1, 35.1, 35.2])
+
+    def test_none_and_nan(self):
+        self.roundtrip([None, 1.5, None, None, float('nan'), 2.5, None])
+
+    def test_negative_zero_and_infinities(self):
+        self.roundtrip([0.0, -0.0, 0.0, float('inf'), float('-inf'), -0.0, 1e308, -1e-308])
+
+    def test_reuses_previous_window(self):
+        # 2.0 -> 3.0 and 3.0 -> 2.0 flip the same bits: the second XOR reuses the window
+        values = [2.0, 3.0, 2.0]
+        self.roundtrip(values)
+        reader = gorilla.BitReader(gorilla._encode_values(values))
+        reader.read(64)
+        self.assertEqual((reader.bit(), reader.bit()), (True, True))  # New window
+        lead, width = reader.read(5), reader.read(6) or 64
+        reader.read(width)
+        self.assertEqual((reader.bit(), reader.bit()), (True, False))  # Previous window
+        self.assertEqual(lead, min(64 - (_words([2.0])[0] ^ _words([3.0])[0]).bit_length(), 31))
+
+    def test_window_that_does_not_fit_is_replaced(self):
+        # A wide change after a narrow one, then a narrow one again
+        self.roundtrip([1.0, 1.0000000000000002, 1e300, 1e300 * 1.5, 1.0])
+
+    def test_meaningful_width_of_64_bits(self):
+        # 0.0 -> -5e-324 XORs the sign bit and the lowest bit: no leading or trailing zeros
+        self.assertEqual(_words([-5e-324])[0], (1 << 63) | 1)
+        self.roundtrip([0.0, -5e-324, 0.0, -5e-324])
+
+    def test_leading_zeros_capped_at_31(self):
+        # XOR of 1: 63 leading zeros, stored as 31 (5 bits)
+        self.roundtrip([0.0, 5e-324, 0.0, 1e-323])
+
+
+class GorillaChunkTests(SimpleTestCase):
+    def test_columns_are_decoded_independently(self):
+        timestamps = [1000, 2000, 3005]
+        data = gorilla.encode(timestamps, [1.0, 2.0, 3.0], [None, 5.0, 5.0], [7.0, 7.0, -0.0])
+        self.assertEqual(gorilla.decode(data, (2, 0)), (timestamps, [[7.0, 7.0, -0.0], [1.0, 2.0, 3.0]]))
+        self.assertEqual(gorilla.decode(memoryview(data))[1][1], [None, 5.0, 5.0])
+
+    def test_invalid_chunks(self):
+        with self.assertRaises(gorilla.ChunkError):
+            gorilla.encode([1, 2], [1.0])
+        data = gorilla.encode([1000, 2000, 3000], [1.0, 2.0, 3.0])
+        with self.assertRaises(gorilla.ChunkError):
+            gorilla.decode(data[:5])
+        with self.assertRaises(gorilla.ChunkError):
+            gorilla.decode(data[:-2])
+        with self.assertRaises(gorilla.ChunkError):
+            gorilla.decode(bytes([gorilla.VERSION + 1]) + data[1:])
+
+
+class OrmStoreSealTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.server = Server.objects.create(name='seal-test', ip_address='10.0.0.9')
+        self.store = OrmStore()
+        self.window = datetime.datetime(2026, 1, 1, 10, tzinfo=datetime.timezone.utc)
+
+    def write(self, seconds, cpu, swap=1.0):
+        self.store.write([SystemMetric(
+            server=self.server, timestamp=self.window + datetime.timedelta(seconds=seconds),
+            cpu_usage=cpu, ram_usage=50.0, disk_usage=40.0, swap_usage=swap,
+        )])
+
+    def test_late_rows_are_merged_into_the_existing_chunk(self):
+        for i in range(10):
+            self.write(60 + 300 * i, float(i))
+        # Also a row in the next (still open) window: it stays a row
+        self.write(3600 + 30, 99.0)
+        before = self.window + datetime.timedelta(hours=1, minutes=5)
+
+        self.assertEqual(self.store.seal(self.server.id, before), (10, 1))
+        self.assertEqual(SystemMetric.objects.filter(server=self.server).count(), 1)
+
+        # Late rows for the sealed window, one older than every sealed sample
+        self.write(10.5, 100.0, swap=None)
+        self.write(1234.567, 50.5)
+        self.assertEqual(self.store.seal(self.server.id, before), (2, 1))
+
+        chunk = MetricChunk.objects.get(server=self.server)
+        self.assertEqual(chunk.start, self.window)
+        self.assertEqual(chunk.samples, 12)
+        self.assertEqual(SystemMetric.objects.filter(server=self.server).count(), 1)
+
+        rows = chunk_rows(chunk)
+        timestamps = [row[0] for row in rows]
+        self.assertEqual(timestamps, sorted(timestamps))
+        self.assertEqual(chunk.end, timestamps[-1])
+        self.assertEqual(rows[0], (self.window + datetime.timedelta(seconds=10.5), 100.0, 50.0, 40.0, None))
+        self.assertIn((self.window + datetime.timedelta(seconds=1234.567), 50.5, 50.0, 40.0, 1.0), rows)
+        self.assertEqual(sorted(row[1] for row in rows), [float(i) for i in range(10)] + [50.5, 100.0])
+
+        # Readers see every sample once, sealed or not
+        series = self.store.series(self.server.id, self.window, self.window + datetime.timedelta(hours=2))
+        self.assertEqual(len(series), 13)
+        self.assertEqual(len(self.store.newest([self.server.id], None, 100)), 13)
+
+    def test_timestamps_are_kept_to_the_millisecond(self):
+        self.write(1.0004, 1.0)
+        self.store.seal(self.server.id, self.window + datetime.timedelta(hours=2))
+        (timestamp, *_), = chunk_rows(MetricChunk.objects.get(server=self.server))
+        self.assertEqual(timestamp, self.window + datetime.timedelta(seconds=1))
+        self.assertEqual(timestamp.tzinfo, EPOCH.tzinfo)
+
+
+class MetricCursorTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.server = Server.objects.create(name='cursor-test', ip_address='10.0.0.10')
+        self.other = Server.objects.create(name='cursor-other', ip_address='10.0.0.11')
+        self.at = datetime.datetime(2026, 1, 1, 10, 30, tzinfo=datetime.timezone.utc)
+
+    def write(self, store, server, cpu, seconds=0):
+        store.write([SystemMetric(
+            server=server, timestamp=self.at + datetime.timedelta(seconds=seconds),
+            cpu_usage=cpu, ram_usage=50.0, disk_usage=40.0, swap_usage=None,
+        )])
+
+    def write_ties(self, store):
+        # Three samples share (timestamp, server): ingest does not deduplicate
+        for cpu in (1.0, 2.0, 3.0):
+            self.write(store, self.server, cpu)
+        self.write(store, self.other, 4.0)
+        self.write(store, self.server, 5.0, seconds=-60)
+
+    def walk(self, store):
+        rows, before = [], None
+        while True:
+            page = store.newest(None, before, 2)
+            rows.extend(page[:1])
+            if len(page) < 2:
+                return rows
+            server_id, timestamp, *_, seq = page[0]
+            before = (timestamp, server_id, seq)
+
+    def assertWalksAll(self, store):
+        rows = self.walk(store)
+        self.assertEqual(sorted(row[2] for row in rows), [1.0, 2.0, 3.0, 4.0, 5.0])
+        self.assertEqual(rows, store.newest(None, None, 100))
+
+    def test_orm_rows_that_tie_are_all_paged(self):
+        store = OrmStore()
+        self.write_ties(store)
+        self.assertWalksAll(store)
+
+    def test_sealed_samples_that_tie_are_all_paged(self):
+        store = OrmStore()
+        self.write_ties(store)
+        store.seal(self.server.id, self.at + datetime.timedelta(hours=1))
+        self.assertFalse(SystemMetric.objects.filter(server=self.server).exists())
+        # And one more tie that is still a row
+        self.write(store, self.server, 6.0)
+        rows = self.walk(store)
+        self.assertEqual(sorted(row[2] for row in rows), [1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+
+    def test_tsfile_samples_that_tie_are_all_paged(self):
+        with tempfile.TemporaryDirectory() as root:
+            store = TSFileStore(root)
+            self.write_ties(store)
+            self.assertWalksAll(store)
+
+    def test_api_pages_follow_the_cursor_through_ties(self):
+        self.write_ties(OrmStore())
+        self.client.force_login(User.objects.create_user('cursor-viewer'))
+        url, cpus = '/api/api/metrics/?page_size=1', []
+        while url:
+            response = self.client.get(url, HTTP_HOST='localhost', secure=True)
+            self.assertEqual(response.status_code, 200)
+            cpus.extend(metric['cpu_usage'] for metric in response.json()['results'])
+            url = response.json()['next']
+        self.assertEqual(sorted(cpus), [1.0, 2.0, 3.0, 4.0, 5.0])
+
+    def test_api_rows_keep_their_id_and_detail_route(self):
+        store = OrmStore()
+        self.write_ties(store)
+        self.client.force_login(User.objects.create_user('detail-viewer'))
+        response = self.client.get('/api/api/metrics/', HTTP_HOST='localhost', secure=True)
+        ids = [metric['id'] for metric in response.json()['results']]
+        self.assertEqual(sorted(ids), sorted(SystemMetric.objects.values_list('id', flat=True)))
+
+        metric = SystemMetric.objects.get(cpu_usage=4.0)
+        response = self.client.get(f'/api/api/metrics/{metric.id}/', HTTP_HOST='localhost', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['id'], metric.id)
+        self.assertEqual(response.json()['server_name'], 'cursor-other')
+
+        # Sealed samples are listed without an id and have no detail route
+        sealed = SystemMetric.objects.get(cpu_usage=1.0).id
+        store.seal(self.server.id, self.at + datetime.timedelta(hours=1))
+        response = self.client.get('/api/api/metrics/', HTTP_HOST='localhost', secure=True)
+        self.assertEqual([m['id'] for m in response.json()['results']].count(None), 4)
+        response = self.client.get(f'/api/api/metrics/{sealed}/', HTTP_HOST='localhost', secure=True)
+        self.assertEqual(response.status_code, 404)
+
+        with tempfile.TemporaryDirectory() as root, \
+                mock.patch('monitor.api.get_store', return_value=TSFileStore(root)):
+            response = self.client.get(f'/api/api/metrics/{metric.id}/', HTTP_HOST='localhost', secure=True)
+            self.assertEqual(response.status_code, 404)
@@ -0,0 +1,21 @@
+# monitor/timeutils.py
+"""Parsing of the time parameters shared by the chart, export and API endpoints."""
+import datetime
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+def parse_time(value):
+    """Accepts ISO 8601 ('2026-02-03T20:57:00Z') or epoch seconds. Returns None if invalid."""
+    try:
+        return datetime.datetime.fromtimestamp(float(value), tz=datetime.timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        pass
+    try:
+        parsed = parse_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, datetime.timezone.utc)
+    return parsed
@@ -0,0 +1,317 @@
+# monitor/tsfile.py
+"""
+Append-only time-series files for raw SystemMetric samples (MONITOR_METRIC_STORE=tsfile).
+
+Every server has a directory of segment files, one per UTC day:
+
+    <MONITOR_TSFILE_DIR>/<server id>/<YYYYMMDD>.seg
+
+A segment is a flat array of fixed-width records (RECORD_FIELDS: float64 epoch
+seconds, then cpu / ram / disk / swap as float32, NaN when swap is missing) in
+timestamp order. Writing a batch is one append at the end of the file. Reads
+map the file with numpy.memmap and bisect the timestamp column, so a range is
+a slice of the mapping (no parsing, no per-row objects until the caller
+converts it). Retention deletes whole files.
+
+Timestamps are float64 because float32 cannot hold epoch seconds (2 minute steps).
+Writers of one server (collector, ingest workers) serialize on a lock file
+(flock where available); readers take no lock and only map whole records.
+"""
+import datetime
+import heapq
+import itertools
+import os
+import shutil
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: only the in-process lock applies
+    fcntl = None
+
+from .storage import METRICS
+
+RECORD_FIELDS = [('ts', '<f8'), ('cpu', '<f4'), ('ram', '<f4'), ('disk', '<f4'), ('swap', '<f4')]
+SUFFIX = '.seg'
+DAY = 86400
+UTC = datetime.timezone.utc
+
+
+def _datetimes(ts):
+    fromtimestamp = datetime.datetime.fromtimestamp
+    return [fromtimestamp(t, UTC) for t in ts.tolist()]
+
+
+def _values(column):
+    """float32 column as Python floats (rounded: 12.3 is stored as 12.300000190734863)."""
+    return column.astype(np.float64).round(2).tolist()
+
+
+def _nullable(values):
+    return [None if v != v else v for v in values]  # NaN -> None
+
+
+class TSFileStore:
+    name = 'tsfile'
+
+    def __init__(self, root):
+        if np is None:
+            raise ImproperlyConfigured('MONITOR_METRIC_STORE=tsfile requires numpy (pip install numpy).')
+        self.root = str(root)
+        self.record = np.dtype(RECORD_FIELDS)
+        # flock is per process: threads of one process (ingest workers) also need this
+        self.lock = threading.Lock()
+
+    # Layout
+
+    def server_dir(self, server_id):
+        return os.path.join(self.root, str(int(server_id)))
+
+    def server_ids(self):
+        try:
+            return [int(name) for name in os.listdir(self.root) if name.isdigit()]
+        except FileNotFoundError:
+            return []
+
+    def segments(self, server_id):
+        """(day start in epoch seconds, path) of every segment of a server, oldest first."""
+        directory = self.server_dir(server_id)
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return []
+        segments = []
+        for name in names:
+            if name.endswith(SUFFIX):
+                day = datetime.datetime.strptime(name[:-len(SUFFIX)], '%Y%m%d').replace(tzinfo=UTC)
+                segments.append((day.timestamp(), os.path.join(directory, name)))
+        return sorted(segments)
+
+    def _map(self, path):
+        """Whole records of a segment as a read-only memmap (None if empty or gone)."""
+        try:
+            count = os.path.getsize(path) // self.record.itemsize
+        except FileNotFoundError:  # Pruned meanwhile
+            return None
+        if not count:
+            return None
+        return np.memmap(path, dtype=self.record, mode='r', shape=(count,))
+
+    def _slices(self, server_id, start=None, end=None):
+        """Memmap slices of the records between `start` and `end` (epoch seconds), oldest first."""
+        for day, path in self.segments(server_id):
+            if start is not None and day + DAY <= start:
+                continue
+            if end is not None and day > end:
+                break
+            records = self._map(path)
+            if records is None:
+                continue
+            ts = records['ts']
+            lo = 0 if start is None else int(np.searchsorted(ts, start, 'left'))
+            hi = len(records) if end is None else int(np.searchsorted(ts, end, 'right'))
+            if hi > lo:
+                yield records[lo:hi]
+
+    # Writes
+
+    def write(self, metrics):
+        by_server = defaultdict(list)
+        for m in metrics:
+            swap = np.nan if m.swap_usage is None else m.swap_usage
+            by_server[m.server_id].append((m.timestamp.timestamp(), m.cpu_usage, m.ram_usage, m.disk_usage, swap))
+        for server_id, values in by_server.items():
+            records = np.array(values, dtype=self.record)
+            records.sort(order='ts', kind='stable')
+            self.append(server_id, records)
+
+    @contextmanager
+    def _locked(self, directory):
+        with self.lock, open(os.path.join(directory, 'lock'), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)  # Released on close
+            yield
+
+    def append(self, server_id, records):
+        """Appends records (sorted by timestamp) to the day segments they fall in."""
+        directory = self.server_dir(server_id)
+        os.makedirs(directory, exist_ok=True)
+        days = (records['ts'] // DAY).astype(np.int64)
+        with self._locked(directory):
+            for chunk in np.split(records, np.flatnonzero(np.diff(days)) + 1):
+                day = datetime.datetime.fromtimestamp(float(chunk['ts'][0]), UTC)
+                self._append_segment(os.path.join(directory, day.strftime('%Y%m%d') + SUFFIX), chunk)
+
+    def _append_segment(self, path, chunk):
+        size = self.record.itemsize
+        with open(path, 'a+b') as f:
+            end = f.seek(0, os.SEEK_END)
+            whole = end - end % size
+            if whole != end:
+                # Torn tail of an interrupted write: readers never saw it
+                f.truncate(whole)
+            if whole:
+                f.seek(whole - size)
+                last = np.frombuffer(f.read(size), dtype=self.record)['ts'][0]
+                if chunk['ts'][0] < last:
+                    # Late batch (e.g. an agent catching up): merge instead of appending
+                    f.seek(0)
+                    current = np.frombuffer(f.read(whole), dtype=self.record)
+                    merged = np.concatenate([current, chunk])
+                    merged = merged[np.argsort(merged['ts'], kind='stable')]
+                    tmp = path + '.tmp'
+                    merged.tofile(tmp)
+                    # Readers keep mapping the old file until they reopen it
+                    os.replace(tmp, path)
+                    return
+            f.write(chunk.tobytes())
+
+    # Reads
+
+    def latest(self, server_ids, count):
+        """Last `count` (timestamp, cpu, ram) of the servers, oldest first."""
+        picked = []
+        for server_id in server_ids:
+            need = count
+            for _, path in reversed(self.segments(server_id)):
+                records = self._map(path)
+                if records is None:
+                    continue
+                picked.append(records[-need:])
+                need -= min(need, len(records))
+                if not need:
+                    break
+        if not picked:
+            return []
+        records = np.concatenate(picked)
+        records = records[np.argsort(records['ts'], kind='stable')][-count:]
+        return list(zip(_datetimes(records['ts']), _values(records['cpu']), _values(records['ram'])))
+
+    def series(self, server_id, start, end):
+        """(timestamp, cpu, ram) between `start` and `end`, oldest first."""
+        parts = list(self._slices(server_id, start.timestamp(), end.timestamp()))
+        if not parts:
+            return []
+        records = np.concatenate(parts)
+        return list(zip(_datetimes(records['ts']), _values(records['cpu']), _values(records['ram'])))
+
+    def _server_rows(self, server_id, start, end, chunk_size):
+        for records in self._slices(server_id, start, end):
+            for i in range(0, len(records), chunk_size):
+                chunk = records[i:i + chunk_size]
+                yield from zip(
+                    itertools.repeat(server_id), _datetimes(chunk['ts']), _values(chunk['cpu']),
+                    _values(chunk['ram']), _values(chunk['disk']), _nullable(_values(chunk['swap'])),
+                )
+
+    def rows(self, server_ids=None, start=None, end=None, chunk_size=2000):
+        """Yields (server_id, timestamp, cpu, ram, disk, swap) in chronological order."""
+        if server_ids is None:
+            server_ids = sorted(self.server_ids())
+        start = start.timestamp() if start is not None else None
+        end = end.timestamp() if end is not None else None
+        # Each server is already in order: merge them lazily on the timestamp
+        return heapq.merge(*(self._server_rows(server_id, start, end, chunk_size) for server_id in server_ids),
+                           key=lambda row: row[1])
+
+    def newest(self, server_ids, before, count):
+        """
+        The `count` newest (server_id, timestamp, cpu, ram, disk, swap, seq), newest first,
+        after the (timestamp, server_id, seq) position `before` in that order (None = from the top).
+        `seq` is the index of the record in its day segment: it tells apart samples
+        of one server with the same timestamp.
+        """
+        if server_ids is None:
+            server_ids = self.server_ids()
+        end = before[0].timestamp() if before is not None else None
+        parts = []
+        for server_id in server_ids:
+            # A sample at exactly `end` comes after `before` only for a lower server id
+            side = 'right' if before is None or server_id < before[1] else 'left'
+            need = count
+            for day, path in reversed(self.segments(server_id)):
+                if end is not None and day > end:
+                    continue
+                records = self._map(path)
+                if records is None:
+                    continue
+                hi = len(records) if end is None else int(np.searchsorted(records['ts'], end, side))
+                if end is not None and server_id == before[1] and day <= end < day + DAY:
+                    # Same server and segment as `before`: the records filed before it
+                    hi = min(int(np.searchsorted(records['ts'], end, 'right')), before[2])
+                lo = max(0, hi - need)
+                parts.append((server_id, records[lo:hi], lo))
+                need -= hi - lo
+                if not need:
+                    break
+
+        rows = []
+        for server_id, records, lo in parts:
+            rows.extend(zip(
+                itertools.repeat(server_id), _datetimes(records['ts']), _values(records['cpu']),
+                _values(records['ram']), _values(records['disk']), _nullable(_values(records['swap'])),
+                range(lo, lo + len(records)),
+            ))
+        return heapq.nlargest(count, rows, key=lambda row: (row[1], row[0], row[6]))
+
+    def buckets(self, server_id, resolution, since=None):
+        """
+        Yields (bucket start, aggregates) per `resolution`-seconds bucket, aggregates
+        being samples and {metric}_min / _max / _avg (NaN swap values are skipped).
+        """
+        parts = list(self._slices(server_id, start=since.timestamp() if since else None))
+        if not parts:
+            return
+        records = np.concatenate(parts)
+        # Records are sorted, so each bucket is a contiguous run starting at `first`
+        keys, first = np.unique(records['ts'] // resolution * resolution, return_index=True)
+        samples = np.diff(np.append(first, len(records))).tolist()
+
+        columns = {}
+        for metric in METRICS:
+            # Same values the readers return (float32 error removed) before averaging
+            values = records[metric].astype(np.float64).round(2)
+            present = ~np.isnan(values)
+            counts = np.add.reduceat(present.astype(np.int64), first)
+            totals = np.add.reduceat(np.where(present, values, 0.0), first)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                averages = totals / counts
+            columns[f'{metric}_min'] = _nullable(np.fmin.reduceat(values, first).tolist())
+            columns[f'{metric}_max'] = _nullable(np.fmax.reduceat(values, first).tolist())
+            columns[f'{metric}_avg'] = _nullable(averages.tolist())
+
+        for i, key in enumerate(keys.tolist()):
+            yield (datetime.datetime.fromtimestamp(key, UTC),
+                   {'samples': samples[i], **{name: column[i] for name, column in columns.items()}})
+
+    # Retention
+
+    def prune(self, server_id, cutoff):
+        """Deletes the day segments entirely older than `cutoff`. Returns how many samples they held."""
+        deleted = 0
+        cutoff = cutoff.timestamp()
+        for day, path in self.segments(server_id):
+            if day + DAY > cutoff:
+                break
+            try:
+                deleted += os.path.getsize(path) // self.record.itemsize
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+        return deleted
+
+    def seal(self, server_id, before):
+        # Segments stay fixed-width so reads remain memmap slices (already 24 bytes a sample)
+        return 0, 0
+
+    def drop(self, server_id):
+        shutil.rmtree(self.server_dir(server_id), ignore_errors=True)
@@ -7,26 +7,39 @@ from django.contrib.auth.decorators import login_required
 # API Router Configuration
 router = DefaultRouter()
 router.register(r'servers', api.ServerViewSet)
-router.register(r'metrics', api.MetricViewSet)
+router.register(r'metrics', api.MetricViewSet, basename='systemmetric')
 
 urlpatterns = [
     # ... Standard Views (dashboard, processes, etc.) ...
     path('', views.dashboard, name='dashboard'),
     path('chart-data/', views.chart_data, name='chart_data'),
     path('metrics/', views.system_metrics, name='system_metrics'),
+    path('disks/chart-data/', views.disk_chart_data, name='disk_chart_data'),
+    path('cpu/heatmap/', views.cpu_heatmap, name='cpu_heatmap'),
+    path('stream/', views.stream, name='stream'),
     path('processes/', views.processes, name='processes'),
     path('processes/list/', views.processes_list, name='processes_list'),
     path('processes/kill/<int:pid>/', views.kill_process, name='kill_process'),
+    path('processes/kill/', views.kill_processes, name='kill_processes'),
     
     # Terminal Routes
     path('terminal/', views.terminal, name='terminal'),
     path('terminal/execute/', views.terminal_execute, name='terminal_execute'),
+    path('terminal/jobs/<str:job_id>/output/', views.terminal_job_output, name='terminal_job_output'),
+    path('terminal/jobs/<str:job_id>/cancel/', views.terminal_job_cancel, name='terminal_job_cancel'),
+    path('terminal/shell/', views.terminal_shell, name='terminal_shell'),
+    path('terminal/shell/<str:shell_id>/output/', views.terminal_shell_output, name='terminal_shell_output'),
+    path('terminal/shell/<str:shell_id>/stream/', views.terminal_shell_stream, name='terminal_shell_stream'),
+    path('terminal/shell/<str:shell_id>/input/', views.terminal_shell_input, name='terminal_shell_input'),
+    path('terminal/shell/<str:shell_id>/close/', views.terminal_shell_close, name='terminal_shell_close'),
 
     # ... API Routes ...
     # All API URLs will start with 'api/'
+    path('api/ingest/', api.AgentIngestView.as_view(), name='agent_ingest'),
     path('api/', include(router.urls)), 
     path('network/', views.network_dashboard, name='network_dashboard'),
     path('network/details/', views.network_details, name='network_details'),
+    path('network/chart-data/', views.network_chart_data, name='network_chart_data'),
     # Server CRUD Routes (Using CBVs)
     path('servers/', login_required(views.ServerListView.as_view()), name='server_list'),
     path('servers/add/', login_required(views.ServerCreateView.as_view()), name='server_create'),
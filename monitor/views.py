@@ -1,92 +1,73 @@
 from django.shortcuts import render
 import psutil
-import platform
-import subprocess
 import os
-import subprocess
-import os
-import math
-import time
 from django.conf import settings
-from .models import SystemMetric
 from django.http import HttpResponse
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.views.decorators.http import require_POST
-import os
 import socket
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
 from .forms import ServerForm
+from .sampling import system_snapshot, chart_snapshot, sample_chart_range, MAX_POINTS, MAX_POINTS_LIMIT
 from .models import Server
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.template.loader import render_to_string
+from django.utils import translation
+import json
+from .streams import StreamHub, HEARTBEAT
+from .executors import run_blocking
+from .process_snapshot import snapshotter, PAGE_SORTS, CursorError
+from .connections import connection_snapshotter
+from django.utils import timezone
+from .timeutils import parse_time
+import datetime
+from django.http import Http404
+from django.utils.html import escape
+from . import jobs
+from . import process_actions
+from . import netio
+from . import disks
+from . import cpu
+from . import shells
+import base64
+from django.urls import reverse
+import zlib
 
 # View 1: Loads the full page (skeleton)
 @login_required
 def dashboard(request):
-    # 1. Get the last 20 records for 'Localhost'
-    # Sort by timestamp descending (newest first) to get the latest ones
-    metrics = SystemMetric.objects.filter(server__name='Localhost').order_by('-timestamp')[:20]
-    
-    # 2. Since we fetched them newest to oldest, the chart would look backwards.
-    # We reverse them so time flows from left to right.
-    metrics = reversed(list(metrics))
-    
-    # 3. Prepare lists for Chart.js
-    labels = []  # X Axis (Hours)
-    data_cpu = [] # Y Axis (CPU Value)
-    data_ram = [] # Y Axis (RAM Value - Optional)
-
-    for m in metrics:
-        # Save formatted time (e.g., "14:30:05")
-        labels.append(m.timestamp.strftime("%H:%M:%S"))
-        data_cpu.append(m.cpu_usage)
-        data_ram.append(m.ram_usage)
+    # Reuse the shared chart snapshot (same data the chart polls afterwards)
+    chart = chart_snapshot('Localhost')
 
     context = {
         'page_title': 'General Dashboard',
-        'chart_labels': labels,   # Pass lists to template
-        'chart_data_cpu': data_cpu,
-        'chart_data_ram': data_ram,
+        'chart_labels': chart['labels'],   # Pass lists to template
+        'chart_data_cpu': chart['cpu'],
+        'chart_data_ram': chart['ram'],
     }
     
     return render(request, 'monitor/dashboard.html', context)
 
+def _metrics_context():
+    # All viewers share one snapshot per tick (see monitor/sampling.py)
+    snapshot = system_snapshot()
+
+    return {
+        'cpu_metric': snapshot['cpu'],
+        'ram_metric': snapshot['ram'],
+        'swap_metric': snapshot['swap'],
+        'disk_metric': snapshot['disk'],
+        'mounts': snapshot.get('mounts', []),
+    }
+
 # View 2: Returns ONLY the HTML for metrics (for HTMX)
 @login_required
-def system_metrics(request):
-    if settings.DEMO_MODE:
-        # Simulate organic behavior with sine waves
-        t = time.time()
-        # CPU: 40% base + 20% oscillation (Range: 20-60%)
-        cpu = 40 + 20 * math.sin(t * 0.5)
-        # RAM: 50% base + 5% oscillation
-        ram = 50 + 5 * math.cos(t * 0.2)
-        # Swap: Low usage
-        swap = 10 + 2 * math.sin(t * 0.1)
-        # Disk: Slow filling effect
-        disk = 45 + (t % 100) / 20  # Slowly increases then resets
-        
-        cpu = round(cpu, 1)
-        ram = round(ram, 1)
-        swap = round(swap, 1)
-        disk = round(disk, 1)
-    else:
-        cpu = psutil.cpu_percent(interval=None) # interval=None is vital to avoid blocking the response
-        ram = psutil.virtual_memory().percent
-        
-        # Path logic
-        path = 'C:\\' if platform.system() == 'Windows' else '/'
-        disk_info = psutil.disk_usage(path)
-        disk = disk_info.percent
-        
-        swap = psutil.swap_memory().percent
-    
-    context = {
-        'cpu_metric': cpu,
-        'ram_metric': ram,
-        'swap_metric': swap,
-        'disk_metric': disk,
-    }
+async def system_metrics(request):
+    # psutil runs in the bounded pool (monitor/executors.py), never on the event loop
+    context = await run_blocking(_metrics_context)
     # NOTE: We render a different partial template here
     return render(request, 'monitor/partials/metrics.html', context)
 
@@ -95,30 +76,76 @@ def processes(request):
     # Main view that loads the skeleton
     return render(request, 'monitor/processes.html', {'page_title': 'Process Manager'})
 
+def _process_tick():
+    # Stream frame of the process explorer: the snapshot generation. Pages and
+    # filters are per viewer, so each tab re-reads its own page (only the rows
+    # that changed) when it moves, from the snapshot refreshed here
+    snapshotter.snapshot()
+    return str(snapshotter.generation)
+
+PROCESS_PAGE_SIZE = 50
+PROCESS_PAGE_LIMIT = 200
+
+def _process_page(query):
+    # Returns (context, status). One page of the explorer:
+    # ?sort=cpu|mem|pid|name&order=asc|desc&q=<name or pid>&user=<owner>&limit=50&cursor=<next>
+    # &state=<state of the rows on screen> -> only the rows that changed since then
+    sort = query.get('sort') or 'cpu'
+    if sort not in PAGE_SORTS:
+        return {'error': f"sort must be one of: {', '.join(PAGE_SORTS)}"}, 400
+    order = query.get('order') or ''
+    if order not in ('', 'asc', 'desc'):
+        return {'error': 'order must be asc or desc'}, 400
+    try:
+        limit = int(query.get('limit') or PROCESS_PAGE_SIZE)
+    except ValueError:
+        return {'error': 'limit must be an integer'}, 400
+    limit = max(1, min(limit, PROCESS_PAGE_LIMIT))
+
+    search = query.get('q', '')
+    username = query.get('user', '')
+    try:
+        page = snapshotter.page(
+            sort, (order == 'desc') if order else None, search, username, query.get('cursor') or None, limit,
+        )
+    except CursorError as e:
+        return {'error': str(e)}, 400
+
+    # The layout (worker + PIDs in order) must match what is on screen for a
+    # partial update: generations are per worker and rows cannot move
+    layout = f"{os.getpid()}-{zlib.crc32(','.join(str(p.pid) for p in page.rows).encode()):x}"
+    previous_layout, _, since = query.get('state', '').rpartition('.')
+    rows = page.rows
+    changed_only = previous_layout == layout and since.isdigit() and int(since) <= page.generation
+    if changed_only:
+        rows = [p for p in rows if p.version > int(since)]
+
+    return {
+        'processes': rows,
+        'oob': changed_only,
+        'filtered': bool(search.strip() or username.strip()),
+        'demo_mode': settings.DEMO_MODE,
+        'page': {
+            'state': f'{layout}.{page.generation}',
+            'next': page.next_cursor,
+            'total': page.total,
+        },
+    }, 200
+
 @login_required
-def processes_list(request):
+async def processes_list(request):
     # Partial view that returns table rows (HTMX)
-    data = []
-    
-    # Iterate over running processes
-    # 'attrs' defines which data we want to extract
-    for proc in psutil.process_iter(['pid', 'name', 'username', 'status', 'cpu_percent', 'memory_percent']):
-        try:
-            # Sometimes psutil fails if the process dies while we are reading it
-            info = proc.info
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            continue
-            
-        data.append(info)
+    context, status = await run_blocking(_process_page, request.GET)
+    if status != 200:
+        return HttpResponse(context['error'], status=status)
 
-    # Sort by CPU usage (descending) and take TOP 10
-    # key=lambda x: x['cpu_percent'] or 0  <-- Handles cases where it might be None
-    data_sorted = sorted(data, key=lambda x: x['cpu_percent'] or 0, reverse=True)[:10]
-
-    return render(request, 'monitor/partials/process_table.html', {
-        'processes': data_sorted,
-        'demo_mode': settings.DEMO_MODE
-    })
+    response = render(request, 'monitor/partials/process_table.html', context)
+    # Pager and state for the next poll (see processes.html)
+    response['HX-Trigger'] = json.dumps({'processPage': context['page']})
+    if context['oob']:
+        # Changed rows replace themselves (hx-swap-oob), the rest stays as is
+        response['HX-Reswap'] = 'none'
+    return response
 
 # Decorator: Only superusers can enter here
 @user_passes_test(lambda u: u.is_superuser)
@@ -148,6 +175,57 @@ def kill_process(request, pid):
     except Exception as e:
         return HttpResponse(f'<span class="text-danger">Error: {str(e)}</span>')
 
+def _int_list(values):
+    # ['12', '13,14'] -> [12, 13, 14]
+    return [int(v) for value in values for v in value.split(',') if v.strip()]
+
+def _bulk_kill(query):
+    # Returns (payload, status). Blocks up to the timeout: runs in the bounded pool
+    try:
+        pids = _int_list(query.getlist('pid') + query.getlist('pids'))
+        parent = int(query['parent']) if query.get('parent') else None
+        timeout = float(query.get('timeout') or 3)
+    except ValueError:
+        return {'error': 'pid, parent and timeout must be numbers'}, 400
+    escalate = query.get('escalate', 'true').lower() not in ('0', 'false', 'no')
+
+    try:
+        sig_name, _ = process_actions.resolve_signal(query.get('signal'))
+        targets = process_actions.select_targets(pids, query.get('q', ''), query.get('user', ''), parent)
+        results = process_actions.signal_processes(targets, sig_name, timeout, escalate)
+    except process_actions.ActionError as e:
+        return {'error': str(e)}, 400
+    return {'signal': sig_name, 'summary': process_actions.summarize(results), 'results': results}, 200
+
+@user_passes_test(lambda u: u.is_superuser)
+@require_POST
+async def kill_processes(request):
+    """
+    Bulk version of kill_process: ?pid=1,2,3 or a filter (q, user, parent=<pid> for
+    the whole tree), signal=TERM|KILL|..., timeout=3, escalate=true (SIGKILL the survivors).
+    Returns the per-PID results as JSON (or an alert for HTMX).
+    """
+    is_htmx = request.headers.get('HX-Request') == 'true'
+    if settings.DEMO_MODE:
+        if is_htmx:
+            response = HttpResponse(status=204)
+            response['HX-Trigger'] = '{"showAlert": "🔒 Action Blocked: This feature is disabled in Demo Mode."}'
+            return response
+        return JsonResponse({'error': 'This feature is disabled in Demo Mode.'}, status=403)
+
+    payload, status = await run_blocking(_bulk_kill, request.POST)
+    if not is_htmx:
+        return JsonResponse(payload, status=status)
+
+    if status != 200:
+        message = payload['error']
+    else:
+        counts = ', '.join(f'{count} {result}' for result, count in sorted(payload['summary'].items()))
+        message = f"SIG{payload['signal']}: {counts or 'no processes matched'}"
+    response = HttpResponse(status=204)
+    response['HX-Trigger'] = json.dumps({'showAlert': message, 'proc:refresh': True})
+    return response
+
 @user_passes_test(lambda u: u.is_superuser)
 def terminal(request):
     # Initialize Current Working Directory if not present
@@ -157,14 +235,18 @@ def terminal(request):
     
     return render(request, 'monitor/terminal.html', {
         'page_title': 'Terminal',
-        'cwd': request.session['term_cwd']
+        'cwd': request.session['term_cwd'],
+        # Commands still running (e.g. before a page reload): reattach to their output
+        'running_jobs': reversed(jobs.list_jobs(request.user.pk, jobs.RUNNING)),
+        # Persistent PTY shell (xterm.js) instead of one process per command
+        'pty_enabled': shells.available(),
     })
 
 @user_passes_test(lambda u: u.is_superuser)
 @require_POST
-def terminal_execute(request):
+async def terminal_execute(request):
     command = request.POST.get('command', '').strip()
-    cwd = request.session.get('term_cwd', os.path.expanduser('~'))
+    cwd = await request.session.aget('term_cwd', os.path.expanduser('~'))
     
 
     if not command:
@@ -191,28 +273,22 @@ def terminal_execute(request):
             
             if os.path.isdir(potential_path):
                 new_cwd = potential_path
-                request.session['term_cwd'] = new_cwd
+                await request.session.aset('term_cwd', new_cwd)
                 # We don't print output for success cd, just update prompt
             else:
                 output = f"cd: the directory '{target_dir}' does not exist"
         except Exception as e:
             output = str(e)
     else:
-        # Execute other commands
+        # Other commands run as background jobs: the page polls their output
+        # in chunks, so a slow command never holds a worker
+        user = await request.auser()
         try:
-            # shell=True is dangerous but necessary for a terminal emulator. 
-            # We rely on superuser protection.
-            result = subprocess.run(
-                command, 
-                shell=True, 
-                cwd=cwd, 
-                stdout=subprocess.PIPE, 
-                stderr=subprocess.PIPE, 
-                text=True
-            )
-            output = result.stdout + result.stderr
-        except Exception as e:
+            job = await run_blocking(jobs.start_job, command, cwd, user.pk, pool='terminal')
+        except (jobs.JobError, OSError) as e:
             output = str(e)
+        else:
+            return render(request, 'monitor/partials/terminal_job.html', {'job': job, 'offset': 0})
 
     context = {
         'command': command,
@@ -222,12 +298,187 @@ def terminal_execute(request):
     }
     return render(request, 'monitor/partials/terminal_line.html', context)
 
+def _job_output(job_id, owner, offset):
+    # Metadata first: if the job had already finished, the log read below is complete
+    job = jobs.get_job(job_id)
+    if job is None or job['owner'] != owner:
+        raise Http404
+    text, offset = jobs.read_output(job_id, offset)
+    status = render_to_string('monitor/partials/terminal_job_status.html', {
+        'job': job,
+        'offset': offset,
+        'oob': True,
+        # Keep polling right away while there is a backlog of output
+        'pending': bool(text),
+        'done': job['status'] != jobs.RUNNING and not text,
+        'timeout': settings.MONITOR_COMMAND_TIMEOUT,
+    })
+    return escape(text) + status.strip()
+
+@user_passes_test(lambda u: u.is_superuser)
+async def terminal_job_output(request, job_id):
+    """Output of a job after ?offset=N (bytes), plus the next poller / final status."""
+    try:
+        offset = max(0, int(request.GET.get('offset', 0)))
+    except ValueError:
+        return HttpResponse('Invalid offset', status=400)
+    try:
+        user = await request.auser()
+        html = await run_blocking(_job_output, job_id, user.pk, offset)
+    except jobs.JobError:
+        raise Http404
+    return HttpResponse(html)
+
+@user_passes_test(lambda u: u.is_superuser)
+@require_POST
+async def terminal_job_cancel(request, job_id):
+    # Kills the whole process group; the next poll shows the final status
+    user = await request.auser()
+    try:
+        await run_blocking(jobs.cancel_job, job_id, user.pk)
+    except jobs.JobError:
+        raise Http404
+    return HttpResponse(status=204)
+
+def _terminal_size(query):
+    # (rows, cols) from the request, or None if absent/invalid
+    try:
+        rows, cols = int(query['rows']), int(query['cols'])
+    except (KeyError, ValueError):
+        return None
+    if not (1 <= rows <= 500 and 1 <= cols <= 1000):
+        return None
+    return rows, cols
+
+@user_passes_test(lambda u: u.is_superuser)
+@require_POST
+async def terminal_shell(request):
+    """Opens (or reattaches to) the PTY shell of this browser session."""
+    if not shells.available():
+        return JsonResponse({'error': 'PTY sessions are not available on this server.'}, status=400)
+
+    user = await request.auser()
+    if not request.session.session_key:
+        await request.session.asave()
+    cwd = await request.session.aget('term_cwd', os.path.expanduser('~'))
+    rows, cols = _terminal_size(request.POST) or (32, 120)
+    try:
+        shell = await run_blocking(
+            shells.open_shell, user.pk, request.session.session_key, cwd, rows, cols, pool='terminal'
+        )
+    except (shells.ShellError, OSError) as e:
+        return JsonResponse({'error': str(e)}, status=409)
+
+    shell_id = shell['id']
+    return JsonResponse({
+        'id': shell_id,
+        'output': reverse('terminal_shell_output', args=[shell_id]),
+        'stream': reverse('terminal_shell_stream', args=[shell_id]),
+        'input': reverse('terminal_shell_input', args=[shell_id]),
+        'close': reverse('terminal_shell_close', args=[shell_id]),
+    })
+
+def _shell_output(shell_id, owner, offset):
+    # Metadata first: if the shell had already closed, the read below is complete
+    shell = shells.get_shell(shell_id)
+    if shell is None or shell['owner'] != owner:
+        raise Http404
+    # Reading does not touch the session: only input postpones the idle timeout
+    data, offset = shells.read_output(shell_id, offset)
+    return {'data': base64.b64encode(data).decode(), 'offset': offset, 'status': shell['status']}
+
+@user_passes_test(lambda u: u.is_superuser)
+async def terminal_shell_output(request, shell_id):
+    """Polling fallback (WSGI): raw output after ?offset=N, base64 encoded."""
+    try:
+        offset = max(0, int(request.GET.get('offset', 0)))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid offset'}, status=400)
+    user = await request.auser()
+    try:
+        payload = await run_blocking(_shell_output, shell_id, user.pk, offset)
+    except shells.ShellError:
+        raise Http404
+    return JsonResponse(payload)
+
+async def _shell_events(shell_id, owner, offset):
+    # Output is tailed from the spool files; the event id is the offset, so an
+    # EventSource reconnect (Last-Event-ID) resumes exactly where it stopped
+    yield 'retry: 1000\n\n'
+    while True:
+        payload = await run_blocking(_shell_output, shell_id, owner, offset)
+        offset = payload['offset']
+        if payload['data']:
+            yield f"id: {offset}\ndata: {payload['data']}\n\n"
+            continue
+        if payload['status'] != shells.RUNNING:
+            yield 'event: closed\ndata: \n\n'
+            return
+        # Idle: the watcher thread waits for output, not a pool thread per terminal
+        if not await shells.output_watcher.wait(shell_id, offset, HEARTBEAT):
+            yield ': ping\n\n'
+
+@user_passes_test(lambda u: u.is_superuser)
+async def terminal_shell_stream(request, shell_id):
+    """Server-Sent Events with the shell output (ASGI only)."""
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse('Streaming requires the ASGI server.', status=503)
+    try:
+        offset = max(0, int(request.headers.get('Last-Event-ID') or request.GET.get('offset', 0)))
+    except ValueError:
+        return HttpResponse('Invalid offset', status=400)
+    user = await request.auser()
+    try:
+        shell = await run_blocking(shells.get_shell, shell_id)
+    except shells.ShellError:
+        raise Http404
+    if shell is None or shell['owner'] != user.pk:
+        raise Http404
+
+    response = StreamingHttpResponse(_shell_events(shell_id, user.pk, offset), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@user_passes_test(lambda u: u.is_superuser)
+@require_POST
+async def terminal_shell_input(request, shell_id):
+    # Keystrokes (data=...) or a window resize (rows=..&cols=..)
+    user = await request.auser()
+    size = _terminal_size(request.POST)
+    try:
+        if size:
+            await run_blocking(shells.resize, shell_id, user.pk, *size)
+        else:
+            await run_blocking(shells.write_input, shell_id, user.pk, request.POST.get('data', ''))
+    except shells.ShellError as e:
+        return HttpResponse(str(e), status=410)
+    return HttpResponse(status=204)
+
+@user_passes_test(lambda u: u.is_superuser)
+@require_POST
+async def terminal_shell_close(request, shell_id):
+    user = await request.auser()
+    try:
+        await run_blocking(shells.close_shell, shell_id, user.pk)
+    except shells.ShellError:
+        raise Http404
+    return HttpResponse(status=204)
+
 @login_required
 def network_dashboard(request):
     return render(request, 'monitor/network.html', {'page_title': 'Monitor de Red'})
 
-@login_required
-def network_details(request):
+NETWORK_PAGE_SIZE = 50
+
+def _network_context(query):
+    # ?page=N&state=ESTABLISHED over the cached connection snapshot (monitor/connections.py)
+    try:
+        number = int(query.get('page') or 1)
+    except ValueError:
+        number = 1
+    state = query.get('state', '')
+
     if settings.DEMO_MODE:
         # Mock Data for Demo Mode (Linux-style)
         interfaces = {
@@ -235,17 +486,6 @@ def network_details(request):
             'eth0': [{'ip': '192.168.1.15', 'netmask': '255.255.255.0', 'type': 'IPv4'}],
             'docker0': [{'ip': '172.17.0.1', 'netmask': '255.255.0.0', 'type': 'IPv4'}],
         }
-        
-        connections = [
-            {'fd': 10, 'family': 'IPv4', 'type': 'TCP', 'laddr': '0.0.0.0:80', 'raddr': '-', 'status': 'LISTEN', 'status_color': 'success', 'pid': 850},  # Nginx
-            {'fd': 11, 'family': 'IPv4', 'type': 'TCP', 'laddr': '0.0.0.0:443', 'raddr': '-', 'status': 'LISTEN', 'status_color': 'success', 'pid': 850}, # Nginx
-            {'fd': 25, 'family': 'IPv4', 'type': 'TCP', 'laddr': '127.0.0.1:5432', 'raddr': '-', 'status': 'LISTEN', 'status_color': 'success', 'pid': 1205}, # Postgres
-            {'fd': 30, 'family': 'IPv4', 'type': 'TCP', 'laddr': '127.0.0.1:6379', 'raddr': '-', 'status': 'LISTEN', 'status_color': 'success', 'pid': 1100}, # Redis
-            {'fd': 45, 'family': 'IPv4', 'type': 'TCP', 'laddr': '0.0.0.0:22', 'raddr': '-', 'status': 'LISTEN', 'status_color': 'success', 'pid': 500}, # SSHd
-            {'fd': 88, 'family': 'IPv4', 'type': 'TCP', 'laddr': '192.168.1.15:22', 'raddr': '10.0.0.5:54321', 'status': 'ESTABLISHED', 'status_color': 'primary', 'pid': 502}, # Incoming SSH
-            {'fd': 92, 'family': 'IPv4', 'type': 'TCP', 'laddr': '192.168.1.15:443', 'raddr': '172.217.17.14:58000', 'status': 'ESTABLISHED', 'status_color': 'primary', 'pid': 851}, # Active Web User (You!)
-            {'fd': 99, 'family': 'IPv4', 'type': 'TCP', 'laddr': '127.0.0.1:5432', 'raddr': '127.0.0.1:48200', 'status': 'ESTABLISHED', 'status_color': 'primary', 'pid': 1205}, # DB Connection
-        ]
     else:
         # 1. Real Network Interfaces (IPs, Mac Address)
         interfaces = {}
@@ -260,79 +500,174 @@ def network_details(request):
                         'type': 'IPv4'
                     })
 
-        # 2. Real Active Connections (Netstat style)
-        connections = []
-        # kind='inet' to only see IP connections (excludes unix file sockets)
-        for conn in psutil.net_connections(kind='inet'):
-            # Translate status (LISTEN, ESTABLISHED, etc.)
-            if conn.status == psutil.CONN_LISTEN:
-                status_color = 'success' # Green
-            elif conn.status == psutil.CONN_ESTABLISHED:
-                status_color = 'primary' # Blue
-            elif conn.status == psutil.CONN_TIME_WAIT:
-                status_color = 'warning' # Yellow
-            else:
-                status_color = 'secondary'
-
-            connections.append({
-                'fd': conn.fd,
-                'family': 'IPv4' if conn.family == socket.AF_INET else 'IPv6',
-                'type': 'TCP' if conn.type == socket.SOCK_STREAM else 'UDP',
-                'laddr': f"{conn.laddr.ip}:{conn.laddr.port}",
-                'raddr': f"{conn.raddr.ip}:{conn.raddr.port}" if conn.raddr else "-",
-                'status': conn.status,
-                'status_color': status_color,
-                'pid': conn.pid
-            })
-        
-        # Sort: First those listening (LISTEN), then established
-        connections.sort(key=lambda x: x['status'])
+    # 2. Active Connections (Netstat style): read at most once per refresh interval
+    # per worker, with the aggregates computed at the same time
+    _, aggregates = connection_snapshotter.snapshot()
+    page = connection_snapshotter.page(number, NETWORK_PAGE_SIZE, state)
 
-    context = {
+    # Names of the processes owning most sockets (from the process snapshot, if any)
+    processes = snapshotter.records
+    top_talkers = [
+        (pid, processes[pid].name if pid in processes else '', count)
+        for pid, count in aggregates['top_talkers']
+    ]
+
+    return {
         'interfaces': interfaces,
-        'connections': connections[:50] # Limit to 50 to avoid cluttering the view
+        'connections': page.rows,
+        'page': page,
+        'state': state,
+        'aggregates': aggregates,
+        'top_talkers': top_talkers,
     }
-    
+
+def _network_tick():
+    # Stream frame of the network page: the connection snapshot generation
+    # (pages and state filters are per viewer, like the process explorer)
+    connection_snapshotter.snapshot()
+    return str(connection_snapshotter.generation)
+
+@login_required
+async def network_details(request):
+    context = await run_blocking(_network_context, request.GET)
     return render(request, 'monitor/partials/network_table.html', context)
 
+def _range_params(query, default_points=MAX_POINTS):
+    # (server, start, end, max_points) of a chart request, shared by every chart endpoint:
+    # ?server=<name>&max_points=N and start/end (ISO 8601 or epoch; end defaults to now)
+    # or range=<seconds before end> (default 3600). Raises ValueError with the 400 message
+    server_name = query.get('server', 'Localhost')
+    try:
+        max_points = int(query.get('max_points', default_points))
+        seconds = int(query.get('range', 3600))
+    except ValueError:
+        raise ValueError('max_points and range must be integers')
+    max_points = max(3, min(max_points, MAX_POINTS_LIMIT))
+    if seconds <= 0:
+        raise ValueError('range must be a positive number of seconds')
+
+    end = parse_time(query['end']) if 'end' in query else timezone.now()
+    start = parse_time(query['start']) if 'start' in query else None
+    if end is None or ('start' in query and start is None):
+        raise ValueError('start/end must be ISO 8601 or epoch seconds')
+    if start is None:
+        start = end - datetime.timedelta(seconds=seconds)
+    if start >= end:
+        raise ValueError('start must be before end')
+    return server_name, start, end, max_points
+
+def _chart_payload(query):
+    # Returns (payload, status). Runs in the bounded pool: it queries the DB
+    # ?server=<name>&start=<iso|epoch>&end=<iso|epoch>&max_points=500
+    # or ?range=<seconds> for "the last N seconds" (cached and shared between viewers)
+    try:
+        server_name, start, end, max_points = _range_params(query)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+
+    if 'start' in query or 'end' in query:
+        # Tier picked for the range, then LTTB downsampled to max_points
+        return sample_chart_range(server_name, start, end, max_points), 200
+
+    # Demo data or the DB rows (?range=86400: from the rollup tiers), cached and shared between viewers
+    seconds = int(query['range']) if 'range' in query else None
+    return chart_snapshot(server_name, seconds, max_points), 200
+
 @login_required
-def chart_data(request):
-    labels = []
-    data_cpu = []
-    data_ram = []
+async def chart_data(request):
+    payload, status = await run_blocking(_chart_payload, request.GET)
+    return JsonResponse(payload, status=status)
 
-    if settings.DEMO_MODE:
-        # Generate 20 fake points
-        now = time.time()
-        for i in range(20):
-            t = now - (20 - i) * 5 # 5 seconds intervals
-            # Simulate historical wave
-            cpu = 40 + 20 * math.sin(t * 0.5)
-            ram = 50 + 5 * math.cos(t * 0.2)
-            
-            # Format time HH:MM:SS
-            time_str = time.strftime('%H:%M:%S', time.localtime(t))
-            
-            labels.append(time_str)
-            data_cpu.append(round(cpu, 1))
-            data_ram.append(round(ram, 1))
-            
-    else:
-        # Fetch latest data
-        metrics = SystemMetric.objects.filter(server__name='Localhost').order_by('-timestamp')[:20]
-        # Reverse so the chart goes from left (old) to right (new)
-        metrics = reversed(list(metrics))
-        
-        for m in metrics:
-            labels.append(m.timestamp.strftime("%H:%M:%S"))
-            data_cpu.append(m.cpu_usage)
-            data_ram.append(m.ram_usage)
+def _network_chart_payload(query):
+    # Returns (payload, status). Per-interface rates for a time range:
+    # ?server=<name>&interface=eth0&range=<seconds> or &start=..&end=.. (ISO 8601 or epoch)
+    server_name = query.get('server', 'Localhost')
+    interfaces = netio.list_interfaces(server_name)
+    interface = query.get('interface') or next((i for i in interfaces if i != 'lo'), None)
+    if interface is None:
+        return {'interfaces': interfaces, 'error': 'No network data for this server yet'}, 404
 
-    return JsonResponse({
-        'labels': labels,
-        'cpu': data_cpu,
-        'ram': data_ram
-    })
+    try:
+        server_name, start, end, max_points = _range_params(query)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+
+    payload = netio.series(server_name, interface, start, end, max_points)
+    payload['interfaces'] = interfaces
+    return payload, 200
+
+@login_required
+async def network_chart_data(request):
+    payload, status = await run_blocking(_network_chart_payload, request.GET)
+    return JsonResponse(payload, status=status)
+
+def _disk_chart_payload(query):
+    # Returns (payload, status). ?device=sda (I/O) or ?mount=/data (usage), plus
+    # server, range=<seconds> or start/end, max_points (same as the other charts)
+    server_name = query.get('server', 'Localhost')
+    sources = disks.list_sources(server_name)
+    device = query.get('device') or None
+    mount = query.get('mount') or None
+    if device is None and mount is None:
+        device = sources['devices'][0] if sources['devices'] else None
+    if device is None and mount is None:
+        return {**sources, 'error': 'No disk data for this server yet'}, 404
+
+    try:
+        server_name, start, end, max_points = _range_params(query)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+
+    payload = disks.series(server_name, start, end, max_points, device=device, mount=mount if device is None else None)
+    payload.update(sources)
+    return payload, 200
+
+@login_required
+async def disk_chart_data(request):
+    payload, status = await run_blocking(_disk_chart_payload, request.GET)
+    return JsonResponse(payload, status=status)
+
+def _cpu_heatmap_payload(query):
+    # Returns (payload, status). ?server=<name>&range=<seconds> or start/end, max_points=<buckets>
+    try:
+        server_name, start, end, max_points = _range_params(query, default_points=120)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+
+    return cpu.heatmap(server_name, start, end, max_points), 200
+
+@login_required
+async def cpu_heatmap(request):
+    payload, status = await run_blocking(_cpu_heatmap_payload, request.GET)
+    return JsonResponse(payload, status=status)
+
+# Push stream: one producer per topic and worker, fanned out to every open tab.
+# (topic: (seconds between frames, function rendering the frame))
+stream_hub = StreamHub({
+    'metrics': (2, lambda: render_to_string('monitor/partials/metrics.html', _metrics_context())),
+    'chart': (2, lambda: json.dumps(chart_snapshot('Localhost'), cls=DjangoJSONEncoder)),
+    'processes': (3, _process_tick),
+    'network': (5, _network_tick),
+})
+
+@login_required
+async def stream(request):
+    # Server-Sent Events: ?topics=metrics,chart
+    # Only under ASGI: a WSGI worker would be blocked for the whole connection
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse('Streaming requires the ASGI server.', status=503)
+
+    topics = [t for t in request.GET.get('topics', '').split(',') if t in stream_hub.topics]
+    if not topics:
+        return HttpResponse('Unknown topics.', status=400)
+
+    response = StreamingHttpResponse(
+        stream_hub.stream(topics, translation.get_language()),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Tell nginx not to buffer the stream
+    return response
 
 def custom_page_not_found(request, exception):
     return render(request, 'monitor/404.html', status=404)
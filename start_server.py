@@ -5,8 +5,12 @@ This script handles:
 1. OS Detection (Windows vs Linux).
 2. Database Migrations and Static Files collection.
 3. Background Worker Thread for metrics collection.
-4. Launching the appropriate production WSGI server (Waitress/Gunicorn).
+4. Launching the appropriate production server:
+   - wsgi (default): Waitress on Windows / Gunicorn sync workers elsewhere.
+   - asgi (--mode asgi): core.asgi under Uvicorn (Gunicorn + Uvicorn workers on UNIX).
+     Enables the async views and the SSE push stream.
 """
+import argparse
 import subprocess
 import time
 import sys
@@ -41,8 +45,8 @@ else:
         stdout=subprocess.PIPE
     )
 
-def run_web_server():
-    """Executes the web server depending on the OS."""
+def run_web_server(workers=3):
+    """Executes the WSGI web server depending on the OS."""
     system_os = platform.system()
     
     if system_os == "Windows":
@@ -65,22 +69,70 @@ def run_web_server():
             subprocess.run([
                 "gunicorn", 
                 "--bind", "0.0.0.0:8000", 
-                "--workers", "3",  # Real Multi-threading/Multi-processing
+                "--workers", str(workers),  # Real Multi-threading/Multi-processing
                 "core.wsgi:application"
             ])
         except FileNotFoundError:
             print("❌ Error: Gunicorn is not installed or not in PATH.")
             print("   Run: pip install gunicorn")
 
+def run_asgi_server(workers=3):
+    """Executes the ASGI web server (async views + SSE stream) depending on the OS."""
+    system_os = platform.system()
+    print("🌍 Dashboard available at: http://0.0.0.0:8000")
+
+    if system_os == "Windows":
+        # Gunicorn does not run on Windows: Uvicorn manages its own workers
+        print("🪟 Windows detected. Starting Uvicorn (ASGI)...")
+        subprocess.run([
+            sys.executable, "-m", "uvicorn",
+            "core.asgi:application",
+            "--host", "0.0.0.0",
+            "--port", "8000",
+            "--workers", str(workers),
+        ])
+    else:
+        print(f"🐧 {system_os} detected. Starting Gunicorn with Uvicorn workers (ASGI)...")
+        # Requires: pip install gunicorn uvicorn-worker
+        try:
+            subprocess.run([
+                "gunicorn",
+                "--bind", "0.0.0.0:8000",
+                "--workers", str(workers),
+                "--worker-class", "uvicorn_worker.UvicornWorker",
+                # SSE connections stay open: don't let the arbiter kill "silent" workers
+                "--timeout", "0",
+                "core.asgi:application"
+            ])
+        except FileNotFoundError:
+            print("❌ Error: Gunicorn is not installed or not in PATH.")
+            print("   Run: pip install gunicorn uvicorn-worker")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="ServerAdmin Pro launcher")
+    parser.add_argument(
+        "--mode", choices=["wsgi", "asgi"],
+        default=os.environ.get("SERVER_MODE", "wsgi"),
+        help="wsgi: classic sync workers. asgi: async views + push stream (Uvicorn)",
+    )
+    parser.add_argument("--workers", type=int, default=3, help="Number of worker processes")
+    return parser.parse_args()
+
 if __name__ == "__main__":
     print("--- STARTING SERVER DASHBOARD SYSTEM ---")
     
     # Load environment variables from .env file
     load_dotenv()
+    # The launcher is the deployment: tuned SQLite unless .env picks another profile
+    os.environ.setdefault('DB_PROFILE', 'production')
+    args = parse_args()
     
     # 1. Run Migrations (Database check)
     print("🛠️  Checking database...")
     subprocess.run([sys.executable, "manage.py", "migrate"], stdout=subprocess.DEVNULL)
+    if os.environ.get('METRICS_DB'):
+        # Metrics live in their own SQLite file (see core/sqlite.py)
+        subprocess.run([sys.executable, "manage.py", "migrate", "--database", "metrics"], stdout=subprocess.DEVNULL)
     
     # 2. Compile Translations (i18n)
     # Only attempt to compile if the locale folder exists
@@ -109,6 +161,9 @@ if __name__ == "__main__":
 
     # 5. Start Web Server
     try:
-        run_web_server()
+        if args.mode == "asgi":
+            run_asgi_server(args.workers)
+        else:
+            run_web_server(args.workers)
     except KeyboardInterrupt:
         print("\n🛑 Shutting down server...")